@@ -0,0 +1,75 @@
+"""Price history and listing content hashes
+
+Revision ID: 3b8f1d2a9c6e
+Revises: c85ee716249b
+Create Date: 2026-10-17 12:02:41.508316
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3b8f1d2a9c6e"
+down_revision: Union[str, None] = "c85ee716249b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "rental_listings",
+        sa.Column("content_hash", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "price_history",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("property_id", sa.String(), nullable=False),
+        sa.Column("price_amount", sa.Float(), nullable=True),
+        sa.Column("price_per", sa.String(), nullable=True),
+        sa.Column("price_currency", sa.String(), nullable=True),
+        sa.Column("added_date", sa.Date(), nullable=True),
+        sa.Column("previous_price_amount", sa.Float(), nullable=True),
+        sa.Column("observed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["property_id"], ["rental_listings.property_id"]
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_price_history_observed_at",
+        "price_history",
+        ["observed_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_price_history_property_id_observed_at",
+        "price_history",
+        ["property_id", "observed_at"],
+        unique=False,
+    )
+    # Start the history of existing listings from their current price
+    op.execute(
+        """
+        INSERT INTO price_history (
+            property_id, price_amount, price_per, price_currency,
+            added_date, observed_at
+        )
+        SELECT
+            property_id, price_amount, price_per, price_currency,
+            added_date, COALESCE(created_date, CURRENT_TIMESTAMP)
+        FROM rental_listings
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_price_history_property_id_observed_at",
+        table_name="price_history",
+    )
+    op.drop_index("ix_price_history_observed_at", table_name="price_history")
+    op.drop_table("price_history")
+    op.drop_column("rental_listings", "content_hash")
@@ -0,0 +1,62 @@
+"""Postcode districts and listing search indexes
+
+Revision ID: 7d2e4c1b5a90
+Revises: 3b8f1d2a9c6e
+Create Date: 2026-10-17 12:31:07.912644
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2e4c1b5a90"
+down_revision: Union[str, None] = "3b8f1d2a9c6e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_rental_listings_district_price": [
+        "postcode_district",
+        "price_amount",
+        "property_id",
+    ],
+    "ix_rental_listings_district_added_date": [
+        "postcode_district",
+        "added_date",
+        "property_id",
+    ],
+    "ix_rental_listings_price": ["price_amount", "property_id"],
+    "ix_rental_listings_added_date": ["added_date", "property_id"],
+}
+
+
+def upgrade() -> None:
+    op.add_column(
+        "rental_listings",
+        sa.Column("postcode_district", sa.String(), nullable=True),
+    )
+    # The outward code is everything before the space, see
+    # `rightmove_models.postcode_district`
+    if op.get_bind().dialect.name == "postgresql":
+        outward_code = "split_part(TRIM(postcode), ' ', 1)"
+    else:
+        outward_code = (
+            "CASE WHEN instr(TRIM(postcode), ' ') > 0 "
+            "THEN substr(TRIM(postcode), 1, instr(TRIM(postcode), ' ') - 1) "
+            "ELSE TRIM(postcode) END"
+        )
+    op.execute(
+        f"UPDATE rental_listings SET postcode_district = UPPER({outward_code}) "
+        "WHERE postcode IS NOT NULL AND TRIM(postcode) <> ''"
+    )
+    for name, columns in INDEXES.items():
+        op.create_index(name, "rental_listings", columns, unique=False)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="rental_listings")
+    op.drop_column("rental_listings", "postcode_district")
@@ -0,0 +1,48 @@
+"""
+Compare the memory taken by listings held as pydantic objects and as a
+`ListingBatch`:
+
+    PYTHONPATH=src python benchmarks/bench_listing_batch_memory.py
+"""
+import tracemalloc
+from pathlib import Path
+
+import pyarrow as pa
+from data_vortex.listing_batch import ListingBatch
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.rightmove_processing import JsonModelParser
+
+RESOURCES = Path(__file__).parents[1] / "tests" / "resources"
+PAGE = (RESOURCES / "rightmove_full_rental_query.xml").read_bytes()
+COPIES = 400
+
+
+def main() -> None:
+    # Distinct rows, as loaded back from storage
+    rows = [
+        {
+            **listing.to_orm_dict(),
+            "property_id": f"{copy}{listing.property_id}",
+        }
+        for copy in range(COPIES)
+        for listing in JsonModelParser().parse_listings(PAGE)
+    ]
+
+    tracemalloc.start()
+    listings = [GenericListing.from_orm_dict(row) for row in rows]
+    listings_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    arrow_before = pa.total_allocated_bytes()
+    batch = ListingBatch.from_listings(listings)
+    batch_bytes = pa.total_allocated_bytes() - arrow_before
+
+    count = len(listings)
+    print(f"{count} listings")
+    print(f"GenericListing list {listings_bytes / count:8.0f} bytes/listing")
+    print(f"ListingBatch        {batch_bytes / count:8.0f} bytes/listing")
+    print(f"  of which columns  {batch.nbytes / count:8.0f} bytes/listing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Time listing validation on the test fixtures:
+
+    PYTHONPATH=src python benchmarks/bench_listing_validation.py
+"""
+import timeit
+from pathlib import Path
+
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.rightmove_processing import (
+    JsonModelParser,
+    LxmlParser,
+    validate_listings,
+)
+
+RESOURCES = Path(__file__).parents[1] / "tests" / "resources"
+PAGE = (RESOURCES / "rightmove_full_rental_query.xml").read_bytes()
+REPEAT = 200
+
+
+def _report(name: str, seconds: float, count: int) -> None:
+    per_listing = seconds / (REPEAT * count) * 1e6
+    print(f"{name:<32} {per_listing:8.1f} us/listing")
+
+
+def main() -> None:
+    listings = JsonModelParser().parse_listings(PAGE)
+    # The fields as scraped from search result cards
+    fields = [
+        {
+            **listing.model_dump(exclude={"created_date"}),
+            "price": f"£{listing.price.price:,} pcm",
+            "added_date": f"Added on {listing.added_date:%d/%m/%Y}",
+        }
+        for listing in listings
+    ]
+    rows = [listing.to_orm_dict() for listing in listings]
+    count = len(listings)
+    print(f"{count} listings, {REPEAT} repeats")
+
+    _report(
+        "validate one by one",
+        timeit.timeit(
+            lambda: [GenericListing.model_validate(f) for f in fields],
+            number=REPEAT,
+        ),
+        count,
+    )
+    _report(
+        "validate as a batch",
+        timeit.timeit(lambda: validate_listings(fields), number=REPEAT),
+        count,
+    )
+    _report(
+        "from_orm_dict",
+        timeit.timeit(
+            lambda: [GenericListing.from_orm_dict(r) for r in rows],
+            number=REPEAT,
+        ),
+        count,
+    )
+    _report(
+        "from_orm_dict trusted",
+        timeit.timeit(
+            lambda: [
+                GenericListing.from_orm_dict(r, trusted=True) for r in rows
+            ],
+            number=REPEAT,
+        ),
+        count,
+    )
+    for parser in (LxmlParser(), JsonModelParser()):
+        _report(
+            f"{type(parser).__name__}.parse_listings",
+            timeit.timeit(
+                lambda parser=parser: parser.parse_listings(PAGE),
+                number=REPEAT,
+            ),
+            count,
+        )
+
+
+if __name__ == "__main__":
+    main()
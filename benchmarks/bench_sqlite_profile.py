@@ -0,0 +1,102 @@
+"""
+Bulk insert throughput of the SQLite engine profiles, committing every
+batch like the crawl writer does, alone and while another connection keeps
+reading the table:
+
+    PYTHONPATH=src python benchmarks/bench_sqlite_profile.py
+"""
+import datetime
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Tuple
+
+from data_vortex.database.crud import upsert_listing_rows
+from data_vortex.database.database import make_engine
+from data_vortex.database.models import Base
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+LISTINGS = 20000
+BATCH_SIZE = 100
+
+
+def _rows(start: int, count: int) -> list:
+    return [
+        {
+            "property_id": str(i),
+            "image_url": None,
+            "description": "Two bedroom flat " * 10,
+            "price_amount": 1000 + i % 2000,
+            "price_per": "PER_MONTH",
+            "price_currency": "GBP",
+            "added_date": datetime.date(2024, 3, 1),
+            "address": "1 Fake Street, N1 1AA",
+            "postcode": "N1 1AA",
+            "created_date": datetime.datetime(2024, 3, 1),
+            "bedrooms": 2,
+            "bathrooms": 1,
+            "property_type": "Flat",
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def _read_until(stop: threading.Event, url: str, profile: str, stats: dict):
+    engine = make_engine(url, profile)
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    text("SELECT avg(price_amount) FROM rental_listings")
+                )
+            stats["reads"] += 1
+        except OperationalError:
+            stats["locked"] += 1
+    engine.dispose()
+
+
+def run(profile: str, path: Path, reader: bool) -> Tuple[float, dict]:
+    url = f"sqlite:///{path}"
+    engine = make_engine(url, profile, writer=True)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    stop = threading.Event()
+    stats = {"reads": 0, "locked": 0}
+    thread = threading.Thread(
+        target=_read_until, args=(stop, url, profile, stats)
+    )
+    if reader:
+        thread.start()
+
+    start = time.perf_counter()
+    try:
+        with session_factory() as db:
+            for offset in range(0, LISTINGS, BATCH_SIZE):
+                upsert_listing_rows(db, _rows(offset, BATCH_SIZE))
+    except Exception as e:
+        print(f"  writer failed: {e.__cause__ or e}")
+    elapsed = time.perf_counter() - start
+    stop.set()
+    if reader:
+        thread.join()
+    engine.dispose()
+    return LISTINGS / elapsed, stats
+
+
+def main() -> None:
+    print(f"{LISTINGS} listings, one commit per {BATCH_SIZE}")
+    for reader in (False, True):
+        for profile in ("default", "tuned"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                rate, stats = run(profile, Path(tmp_dir) / "vortex.db", reader)
+            line = f"{profile:<8} {rate:10.0f} listings/s"
+            if reader:
+                line += f", {stats['reads']} reads, {stats['locked']} locked"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
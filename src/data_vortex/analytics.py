@@ -0,0 +1,276 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import ContextManager, Iterable, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from data_vortex.database.models import RentalListing
+from data_vortex.rightmove_models import PriceUnit
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# Factors turning a price of each unit into a monthly one. Listings without
+# a unit are taken to be monthly, like Rightmove rentals by default; one off
+# prices have no monthly equivalent.
+MONTHLY_FACTORS = {
+    PriceUnit.PER_WEEK.value: 52 / 12,
+    PriceUnit.PER_MONTH.value: 1.0,
+    PriceUnit.PER_YEAR.value: 1 / 12,
+}
+# Listings with more bedrooms are counted in this bucket
+MAX_BEDROOM_BUCKET = 4
+RENT_PERCENTILES = {"rent_p25": 0.25, "rent_median": 0.5, "rent_p75": 0.75}
+GROUP_KEYS = ["postcode_district", "bedroom_bucket"]
+
+RENT_COLUMNS = [
+    "property_id",
+    "price_amount",
+    "price_per",
+    "postcode",
+    "bedrooms",
+]
+
+RENT_STATS_SCHEMA = pa.schema(
+    [
+        ("postcode_district", pa.string()),
+        ("bedroom_bucket", pa.int64()),
+        ("listings", pa.int64()),
+        *((name, pa.float64()) for name in RENT_PERCENTILES),
+    ]
+)
+
+
+def load_rent_table(
+    db: Session, districts: Optional[Iterable[str]] = None
+) -> pa.Table:
+    """
+    Load the columns rent statistics need from `rental_listings`, for all
+    listings or only those in the given postcode districts.
+    """
+    query = select(*(RentalListing.__table__.c[c] for c in RENT_COLUMNS))
+    if districts is not None:
+        query = query.where(RentalListing.postcode_district.in_(districts))
+    rows = db.execute(query).all()
+    columns = list(zip(*rows)) or [[] for _ in RENT_COLUMNS]
+    return pa.table(
+        {
+            "property_id": pa.array(columns[0], pa.string()),
+            "price_amount": pa.array(columns[1], pa.float64()),
+            "price_per": pa.array(columns[2], pa.string()),
+            "postcode": pa.array(columns[3], pa.string()),
+            "bedrooms": pa.array(columns[4], pa.int64()),
+        }
+    )
+
+
+def monthly_rent(table: pa.Table) -> pa.ChunkedArray:
+    """Price of every listing per month, null for one off prices."""
+    units = pc.cast(table["price_per"], pa.string())
+    factors = pc.take(
+        pa.array(list(MONTHLY_FACTORS.values()), pa.float64()),
+        pc.index_in(units, value_set=pa.array(list(MONTHLY_FACTORS))),
+    )
+    factors = pc.if_else(pc.is_null(units), 1.0, factors)
+    return pc.multiply(pc.cast(table["price_amount"], pa.float64()), factors)
+
+
+def postcode_district(postcodes: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    The outward code of every postcode, e.g. "N1" for "N1 1AA", like
+    `rightmove_models.postcode_district` does for one.
+    """
+    postcodes = pc.utf8_upper(
+        pc.utf8_trim_whitespace(pc.cast(postcodes, pa.string()))
+    )
+    districts = pc.replace_substring_regex(
+        postcodes, pattern=r"\s.*$", replacement=""
+    )
+    return pc.if_else(pc.equal(districts, ""), None, districts)
+
+
+def bedroom_bucket(bedrooms: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Bedrooms capped at `MAX_BEDROOM_BUCKET`, null where unknown."""
+    return pc.min_element_wise(
+        pc.cast(bedrooms, pa.int64()), MAX_BEDROOM_BUCKET, skip_nulls=False
+    )
+
+
+def rent_stats(table: pa.Table) -> pa.Table:
+    """
+    Count and monthly rent percentiles per postcode district and bedroom
+    bucket. Works on `load_rent_table` output as well as on the table of a
+    `ListingBatch`. Percentiles are exact, interpolated like NumPy's
+    default, and taken straight from the sorted rents without a Python
+    loop over groups.
+    """
+    rents = pa.table(
+        {
+            "postcode_district": postcode_district(table["postcode"]),
+            "bedroom_bucket": bedroom_bucket(table["bedrooms"]),
+            "rent": monthly_rent(table),
+        }
+    )
+    rents = rents.filter(
+        pc.and_(
+            pc.is_valid(rents["postcode_district"]),
+            pc.is_valid(rents["rent"]),
+        )
+    )
+    rents = rents.sort_by(
+        [(key, "ascending") for key in GROUP_KEYS] + [("rent", "ascending")]
+    )
+    # Without threads groups come out in order of first appearance, which
+    # here is the sort order, so every group is one contiguous run of rents
+    groups = rents.group_by(GROUP_KEYS, use_threads=False).aggregate(
+        [("rent", "count")]
+    )
+    counts = groups["rent_count"]
+    starts = pc.subtract(pc.cumulative_sum(counts), counts)
+    sorted_rents = rents["rent"].combine_chunks()
+
+    columns = {
+        "postcode_district": groups["postcode_district"],
+        "bedroom_bucket": groups["bedroom_bucket"],
+        "listings": counts,
+    }
+    for name, percentile in RENT_PERCENTILES.items():
+        position = pc.multiply(
+            pc.cast(pc.subtract(counts, 1), pa.float64()), percentile
+        )
+        lower = pc.floor(position)
+        fraction = pc.subtract(position, lower)
+        lower = pc.add(starts, pc.cast(lower, pa.int64()))
+        upper = pc.add(starts, pc.cast(pc.ceil(position), pa.int64()))
+        columns[name] = pc.add(
+            pc.multiply(
+                pc.take(sorted_rents, lower), pc.subtract(1.0, fraction)
+            ),
+            pc.multiply(pc.take(sorted_rents, upper), fraction),
+        )
+    return pa.table(columns).cast(RENT_STATS_SCHEMA)
+
+
+class RentStatsCache:
+    """
+    Rent statistics kept in a SQLite file, recomputed per postcode district.
+    Writers call `invalidate` with the postcodes of the listings they
+    stored; the next `stats` call reloads and recomputes only the districts
+    that changed. Every call opens its own connection, so writer threads
+    can invalidate concurrently.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path or settings.RENT_STATS_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn, conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS rent_stats (
+                    postcode_district TEXT NOT NULL,
+                    bedroom_bucket INTEGER,
+                    listings INTEGER NOT NULL,
+                    {", ".join(f"{n} REAL" for n in RENT_PERCENTILES)}
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS rent_stats_district "
+                "ON rent_stats (postcode_district)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirty_districts "
+                "(postcode_district TEXT PRIMARY KEY)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)"
+            )
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return closing(sqlite3.connect(str(self.path), timeout=30))
+
+    def invalidate(self, postcodes: Iterable[Optional[str]]) -> None:
+        """Mark the districts of these postcodes as changed."""
+        districts = postcode_district(
+            pa.chunked_array([pa.array(list(postcodes), pa.string())])
+        )
+        with self._connect() as conn, conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO dirty_districts VALUES (?)",
+                [(d,) for d in pc.unique(districts).to_pylist() if d],
+            )
+
+    def stats(self, db: Session, refresh: bool = False) -> pa.Table:
+        """
+        The statistics of all districts, recomputing the ones that changed,
+        or all of them when the cache was never built or on `refresh`.
+        """
+        with self._connect() as conn:
+            built = conn.execute(
+                "SELECT value FROM meta WHERE key = 'built'"
+            ).fetchone()
+        if refresh or built is None:
+            self._rebuild(db)
+        else:
+            self._update(db)
+        return self._read()
+
+    def _rebuild(self, db: Session) -> None:
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM dirty_districts")
+        stats = rent_stats(load_rent_table(db))
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM rent_stats")
+            self._insert(conn, stats)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('built', 1)")
+        log.info(f"Computed rent statistics of {stats.num_rows} groups")
+
+    def _update(self, db: Session) -> None:
+        # Taken off the dirty list before loading, so that districts
+        # invalidated meanwhile are recomputed by the next call
+        with self._connect() as conn, conn:
+            districts = [
+                row[0] for row in conn.execute("SELECT * FROM dirty_districts")
+            ]
+            conn.execute("DELETE FROM dirty_districts")
+        if not districts:
+            return
+        try:
+            stats = rent_stats(load_rent_table(db, districts))
+            with self._connect() as conn, conn:
+                conn.executemany(
+                    "DELETE FROM rent_stats WHERE postcode_district = ?",
+                    [(district,) for district in districts],
+                )
+                self._insert(conn, stats)
+        except Exception:
+            self.invalidate(districts)
+            raise
+        log.info(f"Recomputed rent statistics of {len(districts)} districts")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, stats: pa.Table) -> None:
+        placeholders = ", ".join("?" * len(stats.column_names))
+        conn.executemany(
+            f"INSERT INTO rent_stats VALUES ({placeholders})",
+            [tuple(row.values()) for row in stats.to_pylist()],
+        )
+
+    def _read(self) -> pa.Table:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM rent_stats "
+                "ORDER BY postcode_district, bedroom_bucket"
+            ).fetchall()
+        columns: List[Sequence] = list(zip(*rows)) or [
+            [] for _ in RENT_STATS_SCHEMA
+        ]
+        return pa.table(
+            {
+                field.name: pa.array(column, field.type)
+                for field, column in zip(RENT_STATS_SCHEMA, columns)
+            },
+            schema=RENT_STATS_SCHEMA,
+        )
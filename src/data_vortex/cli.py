@@ -1,52 +1,225 @@
+import multiprocessing
+import time
+from contextlib import ExitStack
 from itertools import product
+from pathlib import Path
+from typing import List, Optional
 
 import click
+from data_vortex.analytics import MAX_BEDROOM_BUCKET, RentStatsCache
+from data_vortex.crawl_checkpoints import CheckpointStore
+from data_vortex.crawl_queue import CrawlQueue, CrawlWorker
+from data_vortex.crawl_watermarks import (
+    Watermark,
+    WatermarkStore,
+    bucket_key,
+    incremental_params,
+)
+from data_vortex.database.database import (
+    SessionLocal,
+    WriterSession,
+    create_database,
+)
+from data_vortex.listing_pipeline import DatabaseListingWriter
+from data_vortex.listing_store import (
+    ListingSink,
+    ListingStore,
+    import_json_listings,
+)
+from data_vortex.raw_listing_ingest import ingest_raw_listings
+from data_vortex.response_cache import get_response_cache
+from data_vortex.rightmove_crawler import crawl_new_listings
 from data_vortex.rightmove_models import RightmoveRentParams
 from data_vortex.rightmove_query import get_new_listings
+from data_vortex.search_planner import SearchPlanner
+from data_vortex.seen_index import open_raw_listing_index
+from data_vortex.utils.config import settings
+from prometheus_client import REGISTRY, start_http_server, write_to_textfile
 
 
 @click.group()
-def cli():
+@click.option(
+    "--metrics_port",
+    default=None,
+    type=int,
+    help="Serve Prometheus metrics on localhost:PORT/metrics while the "
+    "command runs. Defaults to METRICS_PORT.",
+)
+@click.option(
+    "--metrics_textfile",
+    default=None,
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write Prometheus metrics to this file when the command exits, "
+    "for node_exporter's textfile collector. Defaults to METRICS_TEXTFILE.",
+)
+@click.pass_context
+def cli(ctx, metrics_port, metrics_textfile):
     """Rental Properties CLI"""
-    pass
+    metrics_port = metrics_port or settings.METRICS_PORT
+    metrics_textfile = metrics_textfile or settings.METRICS_TEXTFILE
+    if metrics_port:
+        start_http_server(metrics_port, addr="127.0.0.1")
+    if metrics_textfile:
+        ctx.call_on_close(
+            lambda: write_to_textfile(str(metrics_textfile), REGISTRY)
+        )
+
+
+# Options choosing the searches, i.e. regions and bucket ranges
+BUCKET_OPTIONS = [
+    click.option(
+        "--region",
+        "regions",
+        multiple=True,
+        help="Rightmove location identifier to search, e.g. REGION^87490. "
+        "Repeat for several regions, defaults to CRAWL_REGIONS.",
+    ),
+    click.option(
+        "--min_bed", default=None, type=int, help="Minimum number of bedrooms."
+    ),
+    click.option(
+        "--max_bed", default=None, type=int, help="Maximum number of bedrooms."
+    ),
+    click.option("--min_price", default=None, type=int, help="Minimum price."),
+    click.option("--max_price", default=None, type=int, help="Maximum price."),
+    click.option(
+        "--price_increment",
+        default=None,
+        type=int,
+        help="Split the price range into fixed steps of this size. By "
+        "default the price buckets are planned from the result counts.",
+    ),
+]
+
+SEARCH_OPTIONS = [
+    *BUCKET_OPTIONS,
+    click.option(
+        "--continue_search",
+        is_flag=True,
+        default=False,
+        help="Continue searching and saving new listings even "
+        "if all current listings are already saved.",
+    ),
+    click.option(
+        "--download_raw_listings",
+        is_flag=True,
+        default=False,
+        help="Download raw HTML listings to the raw_data directory.",
+    ),
+    click.option(
+        "--wait_time",
+        default=0,
+        type=float,
+        help="Seconds to wait between requests of a crawl without "
+        "--concurrency.",
+    ),
+    click.option(
+        "--concurrency",
+        default=1,
+        type=int,
+        help="Number of requests in flight at once. Values above 1 crawl all "
+        "buckets concurrently under a shared rate limit instead of one by "
+        "one.",
+    ),
+    click.option(
+        "--rate_limit",
+        default=None,
+        type=float,
+        help="Maximum requests per second per host for concurrent crawls.",
+    ),
+    click.option(
+        "--parse_workers",
+        default=None,
+        type=int,
+        help="Number of processes parsing search pages for concurrent "
+        "crawls, 0 parses them in the crawling process.",
+    ),
+    click.option(
+        "--use_cache",
+        is_flag=True,
+        default=False,
+        help="Serve search pages from the persistent response cache, for "
+        "crawls without --concurrency.",
+    ),
+    click.option(
+        "--incremental",
+        is_flag=True,
+        default=False,
+        help="Only fetch listings added since the last run of each bucket, "
+        "newest first, stopping at the first page seen before.",
+    ),
+    click.option(
+        "--full",
+        is_flag=True,
+        default=False,
+        help="Walk every bucket to the end and reset the marks used by "
+        "--incremental. Meant to be scheduled separately, e.g. weekly.",
+    ),
+    click.option(
+        "--resume",
+        is_flag=True,
+        default=False,
+        help="Checkpoint every bucket each CHECKPOINT_PAGES pages and "
+        "continue buckets that an earlier --resume run left unfinished from "
+        "their checkpoints, unless those are older than "
+        "CHECKPOINT_MAX_AGE_HOURS.",
+    ),
+]
+
+
+def search_options(func):
+    """Options shared by the commands that crawl Rightmove searches."""
+    for option in reversed(SEARCH_OPTIONS):
+        func = option(func)
+    return func
+
+
+def bucket_options(func):
+    for option in reversed(BUCKET_OPTIONS):
+        func = option(func)
+    return func
 
 
 @click.command(
     help="Fetch and display rental properties starting from the specified index."
 )
-@click.option(
-    "--continue_search",
-    is_flag=True,
-    default=False,
-    help="Continue searching and saving new listings even "
-    "if all current listings are already saved.",
-)
-@click.option(
-    "--download_raw_listings",
-    is_flag=True,
-    default=False,
-    help="Download raw HTML listings to the raw_data directory.",
-)
-@click.option(
-    "--wait_time",
-    default=0,
-    type=float,
-)
-@click.option(
-    "--min_bed", default=None, type=int, help="Minimum number of bedrooms."
-)
-@click.option(
-    "--max_bed", default=None, type=int, help="Maximum number of bedrooms."
+@search_options
+def get_new_properties(**options):
+    """
+    Fetch and save new rental property listings for all combinations of bedroom numbers and price ranges.
+    If a parameter is set to None, it will not restrict that particular filter in the search.
+    """
+    with ListingStore() as listing_store:
+        crawl(listing_store, **options)
+
+
+@click.command(
+    help="Crawl rental properties straight into the database at "
+    "DATABASE_URL, committing listings in batches while the crawl runs."
 )
-@click.option("--min_price", default=None, type=int, help="Minimum price.")
-@click.option("--max_price", default=None, type=int, help="Maximum price.")
+@search_options
 @click.option(
-    "--price_increment",
-    default=100,
+    "--batch_size",
+    default=None,
     type=int,
-    help="Increment for the price range if using price range search.",
+    help="Number of listings to commit at once.",
 )
-def get_new_properties(
+def crawl_to_db(batch_size, **options):
+    create_database()
+    with DatabaseListingWriter(
+        WriterSession, batch_size=batch_size, stats_cache=RentStatsCache()
+    ) as writer:
+        crawl(writer, **options)
+    click.echo(
+        f"Inserted {writer.result.inserted}, updated "
+        f"{writer.result.updated} and left {writer.result.unchanged} "
+        "unchanged listings."
+    )
+
+
+def crawl(
+    sink: ListingSink,
+    regions,
     continue_search,
     download_raw_listings,
     wait_time,
@@ -55,22 +228,210 @@ def get_new_properties(
     min_price,
     max_price,
     price_increment,
+    concurrency,
+    rate_limit,
+    parse_workers,
+    use_cache,
+    incremental,
+    full,
+    resume,
+):
+    """Crawl every search bucket into `sink`, one by one or concurrently."""
+    # Concurrent crawls are paced by --rate_limit and fetch every page
+    if concurrency > 1 and (use_cache or wait_time):
+        raise click.UsageError(
+            "--use_cache and --wait_time cannot be combined with "
+            "--concurrency above 1, use --rate_limit instead."
+        )
+    params_list = search_params(
+        regions,
+        min_bed,
+        max_bed,
+        min_price,
+        max_price,
+        price_increment,
+        # Incremental runs reuse the saved buckets rather than probing them
+        refresh=not incremental,
+    )
+
+    watermarks = None
+    if incremental or full:
+        watermark_store = WatermarkStore()
+        started_at = time.time()
+        if full:
+            continue_search = True
+            watermarks = [Watermark(bucket_key(p)) for p in params_list]
+        else:
+            watermarks = [watermark_store.get(p) for p in params_list]
+        params_list = [
+            incremental_params(p, watermark)
+            for p, watermark in zip(params_list, watermarks)
+        ]
+
+    _crawl_buckets(
+        sink,
+        params_list,
+        watermarks,
+        continue_search=continue_search,
+        download_raw_listings=download_raw_listings,
+        wait_time=wait_time,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        parse_workers=parse_workers,
+        use_cache=use_cache,
+        checkpoints=CheckpointStore() if resume else None,
+    )
+
+    if watermarks is not None:
+        for watermark in watermarks:
+            watermark_store.save(watermark, started_at, full=full)
+
+
+def _crawl_buckets(
+    sink: ListingSink,
+    params_list: List[RightmoveRentParams],
+    watermarks: Optional[List[Watermark]],
+    continue_search,
+    download_raw_listings,
+    wait_time,
+    concurrency,
+    rate_limit,
+    parse_workers,
+    use_cache,
+    checkpoints: Optional[CheckpointStore],
 ):
+    if concurrency > 1:
+        crawl_new_listings(
+            params_list,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+            continue_search=continue_search,
+            download_raw_listings=download_raw_listings,
+            store=sink,
+            watermarks=watermarks,
+            parse_workers=parse_workers,
+            checkpoints=checkpoints,
+        )
+        return
+
+    with ExitStack() as stack:
+        raw_index = (
+            stack.enter_context(open_raw_listing_index())
+            if download_raw_listings
+            else None
+        )
+        for params, watermark in zip(
+            params_list, watermarks or [None] * len(params_list)
+        ):
+            get_new_listings(
+                baseline_params=params,
+                continue_search=continue_search,
+                download_raw_listings=download_raw_listings,
+                wait_time=wait_time,
+                use_cache=use_cache,
+                store=sink,
+                raw_index=raw_index,
+                watermark=watermark,
+                checkpoints=checkpoints,
+            )
+
+
+def search_params(
+    regions,
+    min_bed,
+    max_bed,
+    min_price,
+    max_price,
+    price_increment,
+    refresh=True,
+) -> List[RightmoveRentParams]:
     """
-    Fetch and save new rental property listings for all combinations of bedroom numbers and price ranges.
-    If a parameter is set to None, it will not restrict that particular filter in the search.
+    The search buckets of every region, planned from the result counts or,
+    with a `price_increment`, in fixed price steps.
     """
-    bed_range = (
+    params_list = []
+    for region in regions or settings.CRAWL_REGIONS:
+        if price_increment is None:
+            params_list.extend(
+                plan_search_params(
+                    min_bed,
+                    max_bed,
+                    min_price,
+                    max_price,
+                    refresh=refresh,
+                    region=region,
+                )
+            )
+        else:
+            params_list.extend(
+                build_search_params(
+                    min_bed,
+                    max_bed,
+                    min_price,
+                    max_price,
+                    price_increment,
+                    region=region,
+                )
+            )
+    return params_list
+
+
+def _bed_range(min_bed, max_bed) -> list:
+    return (
         range(min_bed, max_bed + 1)
         if min_bed is not None and max_bed is not None
         else [None]
     )
+
+
+def plan_search_params(
+    min_bed, max_bed, min_price, max_price, refresh=True, region=None
+) -> List[RightmoveRentParams]:
+    """
+    Plan price buckets for every number of bedrooms from the result counts
+    of the searches, see `SearchPlanner`.
+    """
+    planner = SearchPlanner()
+    params_list = []
+    for beds in _bed_range(min_bed, max_bed):
+        bedrooms = str(beds) if beds is not None else ""
+        baseline_params = RightmoveRentParams(
+            locationIdentifier=region or settings.CRAWL_REGIONS[0],
+            minBedrooms=bedrooms,
+            maxBedrooms=bedrooms,
+            minPrice=str(min_price) if min_price is not None else "",
+            maxPrice=str(max_price) if max_price is not None else "",
+        )
+        buckets = planner.plan(baseline_params, refresh=refresh)
+        click.echo(
+            f"Planned {len(buckets)} price buckets for "
+            f"{beds if beds is not None else 'any'} bedrooms in "
+            f"{baseline_params.locationIdentifier}"
+        )
+        params_list.extend(buckets)
+
+    click.echo(
+        f"Planning took {planner.probes} requests for "
+        f"{len(params_list)} buckets"
+    )
+    return params_list
+
+
+def build_search_params(
+    min_bed, max_bed, min_price, max_price, price_increment, region=None
+) -> List[RightmoveRentParams]:
+    """
+    Build search params for all combinations of bedroom numbers and price
+    ranges.
+    """
+    bed_range = _bed_range(min_bed, max_bed)
     price_range = (
         range(min_price, max_price + 1, price_increment)
         if min_price is not None and max_price is not None
         else [None]
     )
 
+    params_list = []
     for beds, price in product(bed_range, price_range):
         min_bedrooms = str(beds) if beds is not None else None
         max_bedrooms = min_bedrooms
@@ -81,7 +442,7 @@ def get_new_properties(
             elif price >= 5000:
                 price += 2 * price_increment
 
-        min_price = str(price) if price is not None else None
+        min_price_str = str(price) if price is not None else None
         max_price_str = (
             str(price + price_increment - 1)
             if price is not None
@@ -89,9 +450,10 @@ def get_new_properties(
         )
 
         params = RightmoveRentParams(
+            locationIdentifier=region or settings.CRAWL_REGIONS[0],
             minBedrooms=min_bedrooms,
             maxBedrooms=max_bedrooms,
-            minPrice=min_price,
+            minPrice=min_price_str,
             maxPrice=max_price_str,
         )
 
@@ -102,16 +464,257 @@ def get_new_properties(
             f"Fetching listings for {bedrooms_display} and price range {price_range_display}"
         )
         click.echo(f"Params: {params.dict()}")
+        params_list.append(params)
 
-        get_new_listings(
-            baseline_params=params,
-            continue_search=continue_search,
-            download_raw_listings=download_raw_listings,
-            wait_time=wait_time,
+    return params_list
+
+
+@click.command(
+    help="Parse raw listing pages and load them into the database. Files "
+    "that have not changed since the last run are skipped."
+)
+@click.option(
+    "--raw_dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Directory with raw listing pages, defaults to RAW_LISTING_DIR.",
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=int,
+    help="Number of parsing processes, defaults to the number of CPUs.",
+)
+@click.option(
+    "--batch_size",
+    default=None,
+    type=int,
+    help="Number of listings to load per database commit.",
+)
+def ingest_raw(raw_dir, workers, batch_size):
+    create_database()
+    db = WriterSession()
+    try:
+        result = ingest_raw_listings(
+            db,
+            raw_dir=raw_dir,
+            workers=workers,
+            batch_size=batch_size,
+            stats_cache=RentStatsCache(),
+        )
+    finally:
+        db.close()
+    click.echo(
+        f"Scanned {result.scanned} files: {result.ingested} ingested, "
+        f"{result.unchanged} unchanged, {result.failed} failed."
+    )
+
+
+@click.group()
+def cache():
+    """Inspect and prune the HTTP response cache."""
+    pass
+
+
+@cache.command(help="Show the number and size of cached responses.")
+def stats():
+    cache_stats = get_response_cache().stats()
+    click.echo(f"Backend: {settings.RESPONSE_CACHE_BACKEND}")
+    click.echo(f"Location: {settings.RESPONSE_CACHE_PATH}")
+    click.echo(
+        f"Entries: {cache_stats.entries} ({cache_stats.expired} expired)"
+    )
+    click.echo(
+        f"Size: {cache_stats.total_bytes} of {cache_stats.max_bytes} bytes"
+    )
+
+
+@cache.command(help="Remove expired responses and evict down to a size.")
+@click.option(
+    "--max_bytes",
+    default=None,
+    type=int,
+    help="Evict least recently used responses until the cache fits.",
+)
+@click.option(
+    "--all",
+    "clear_all",
+    is_flag=True,
+    default=False,
+    help="Remove everything.",
+)
+def prune(max_bytes, clear_all):
+    response_cache = get_response_cache()
+    if clear_all:
+        removed = response_cache.clear()
+    else:
+        removed = response_cache.prune(max_bytes=max_bytes)
+    click.echo(f"Removed {removed} cached responses.")
+
+
+@click.group()
+def store():
+    """Manage the Parquet listing store."""
+    pass
+
+
+@store.command(
+    "import-json",
+    help="Import property_*.json files written by older versions.",
+)
+@click.option(
+    "--json_dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Directory with the JSON listings, defaults to DATA_DIR.",
+)
+def import_json(json_dir):
+    with ListingStore() as listing_store:
+        imported = import_json_listings(
+            listing_store, json_dir or settings.DATA_DIR
         )
+    click.echo(f"Imported {imported} listings.")
+
+
+@store.command(help="Merge all segments into one, dropping duplicates.")
+def compact():
+    merged = ListingStore().compact()
+    click.echo(f"Merged {merged} segments.")
+
+
+@store.command("stats", help="Show the number of stored listings.")
+def store_stats():
+    listing_store = ListingStore()
+    click.echo(f"Location: {listing_store.root}")
+    click.echo(f"Listings: {len(listing_store)}")
+    click.echo(f"Segments: {len(listing_store.segments())}")
+
+
+@click.command(
+    help="Show monthly rent statistics per postcode district and number of "
+    "bedrooms, recomputing the districts that changed since the last run."
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="Recompute the statistics of every district.",
+)
+def rent_stats(refresh):
+    with SessionLocal() as db:
+        table = RentStatsCache().stats(db, refresh=refresh)
+    for row in table.to_pylist():
+        bedrooms = row["bedroom_bucket"]
+        if bedrooms is None:
+            bedrooms = "?"
+        elif bedrooms == MAX_BEDROOM_BUCKET:
+            bedrooms = f"{bedrooms}+"
+        click.echo(
+            f"{row['postcode_district']:<6} {bedrooms:>3} bed "
+            f"{row['listings']:>6} listings  median {row['rent_median']:>8.0f} "
+            f"(p25 {row['rent_p25']:.0f}, p75 {row['rent_p75']:.0f})"
+        )
+
+
+@click.group("queue")
+def crawl_queue():
+    """
+    Crawl searches through a work queue that worker processes, on this or
+    other hosts, share. Stopped or crashed runs resume where they were.
+    """
+    pass
+
+
+@crawl_queue.command(
+    help="Add the first page of every search bucket to a run of the queue. "
+    "Buckets already queued for the run, done or not, are left alone."
+)
+@bucket_options
+@click.option(
+    "--run",
+    default=None,
+    type=str,
+    help="Run to add the searches to, today's date by default.",
+)
+def enqueue(
+    regions, min_bed, max_bed, min_price, max_price, price_increment, run
+):
+    params_list = search_params(
+        regions, min_bed, max_bed, min_price, max_price, price_increment
+    )
+    added = CrawlQueue().enqueue(params_list, run=run)
+    click.echo(f"Queued {added} of {len(params_list)} searches.")
+
+
+@crawl_queue.command(
+    help="Crawl queued pages into the database until the queue is drained."
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=int,
+    help="Number of worker processes to start on this host.",
+)
+@click.option(
+    "--use_cache",
+    is_flag=True,
+    default=False,
+    help="Serve search pages from the persistent response cache.",
+)
+@click.option(
+    "--wait_time",
+    default=0,
+    type=float,
+    help="Seconds every worker waits after each request.",
+)
+def work(workers, use_cache, wait_time):
+    create_database()
+    processes = [
+        multiprocessing.Process(
+            target=run_queue_worker, args=(use_cache, wait_time)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    counts = CrawlQueue().counts()
+    click.echo(
+        ", ".join(f"{count} {status}" for status, count in counts.items())
+    )
+    if any(process.exitcode for process in processes):
+        raise click.ClickException("A worker failed, see the logs.")
+
+
+def run_queue_worker(use_cache: bool, wait_time: float) -> None:
+    """Entry point of a `queue work` process."""
+    with DatabaseListingWriter(
+        WriterSession, stats_cache=RentStatsCache()
+    ) as writer:
+        CrawlWorker(
+            CrawlQueue(), writer, use_cache=use_cache, wait_time=wait_time
+        ).run()
+
+
+@crawl_queue.command("status", help="Show the number of tasks by status.")
+def queue_status():
+    for status, count in CrawlQueue().counts().items():
+        click.echo(f"{status:<8} {count}")
+
+
+@crawl_queue.command(help="Give failed pages a fresh set of attempts.")
+def retry():
+    click.echo(f"Requeued {CrawlQueue().retry_failed()} pages.")
 
 
 cli.add_command(get_new_properties)
+cli.add_command(crawl_to_db)
+cli.add_command(ingest_raw)
+cli.add_command(cache)
+cli.add_command(store)
+cli.add_command(rent_stats)
+cli.add_command(crawl_queue)
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,189 @@
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from data_vortex.listing_store import ListingSink
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+
+
+@dataclass
+class Checkpoint:
+    """
+    Progress of one search through its pages: the index of the last page
+    whose listings are stored, and the counts so far.
+    """
+
+    search_key: str
+    last_index: Optional[int] = None
+    pages: int = 0
+    listings: int = 0
+    new_listings: int = 0
+    updated_at: Optional[float] = None
+    # Index of the last page of the checkpoint the search resumed from
+    resumed_index: Optional[int] = field(default=None, compare=False)
+
+    def next_index(self, page_size: int) -> int:
+        """Index of the first page not fetched yet."""
+        return 0 if self.last_index is None else self.last_index + page_size
+
+    def record(self, index: int, listings: int, new_listings: int) -> None:
+        self.last_index = index
+        self.pages += 1
+        self.listings += listings
+        self.new_listings += new_listings
+
+    def may_be_stored(self, index: int, page_size: int) -> bool:
+        """
+        Whether the run that saved the checkpoint may have stored the page
+        at `index` already. Listings are stored ahead of the checkpoint,
+        e.g. when the sink is closed at a failed request, though by no more
+        than `CHECKPOINT_PAGES` pages, as the next checkpoint is saved then.
+        """
+        if self.resumed_index is None:
+            return False
+        return index <= (
+            self.resumed_index + settings.CHECKPOINT_PAGES * page_size
+        )
+
+
+def search_key(params: RightmoveRentParams) -> str:
+    """Identify a search exactly, only leaving out the page index."""
+    return params.model_dump_json(exclude={"index"})
+
+
+class CheckpointStore:
+    """
+    Checkpoints of searches in progress, in a SQLite file. Each save is one
+    transaction, so a crash leaves either the previous checkpoint or the
+    new one. Checkpoints older than `max_age_hours` are ignored and
+    removed: new listings push older ones down the pages, so after a while
+    the page a search stopped at no longer follows on from the pages
+    already fetched.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_age_hours: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path or settings.CHECKPOINT_PATH)
+        self.max_age_seconds = 3600 * (
+            max_age_hours or settings.CHECKPOINT_MAX_AGE_HOURS
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                search_key TEXT PRIMARY KEY,
+                last_index INTEGER,
+                pages INTEGER NOT NULL,
+                listings INTEGER NOT NULL,
+                new_listings INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, params: RightmoveRentParams) -> Checkpoint:
+        """The checkpoint of the search, or a new one to start from."""
+        key = search_key(params)
+        row = self._conn.execute(
+            "SELECT last_index, pages, listings, new_listings, updated_at "
+            "FROM checkpoints WHERE search_key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return Checkpoint(key)
+        checkpoint = Checkpoint(key, *row)
+        if checkpoint.updated_at < time.time() - self.max_age_seconds:
+            log.info("Checkpoint of %s has expired, starting over", key)
+            self.clear(checkpoint)
+            return Checkpoint(key)
+        log.info(
+            "Resuming %s after %d pages and %d new listings",
+            key,
+            checkpoint.pages,
+            checkpoint.new_listings,
+        )
+        checkpoint.resumed_index = checkpoint.last_index
+        return checkpoint
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        checkpoint.updated_at = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    checkpoint.search_key,
+                    checkpoint.last_index,
+                    checkpoint.pages,
+                    checkpoint.listings,
+                    checkpoint.new_listings,
+                    checkpoint.updated_at,
+                ),
+            )
+
+    def due(self, checkpoint: Checkpoint) -> bool:
+        """Whether the checkpoint is saved after its last page."""
+        return checkpoint.pages % settings.CHECKPOINT_PAGES == 0
+
+    def commit(self, checkpoint: Checkpoint, sink: ListingSink) -> None:
+        """
+        Save the checkpoint every `CHECKPOINT_PAGES` pages. The sink is
+        flushed first, so that a checkpoint never gets ahead of the stored
+        listings.
+        """
+        if self.due(checkpoint):
+            sink.flush()
+            self.save(checkpoint)
+
+    async def commit_async(
+        self, checkpoint: Checkpoint, sink: ListingSink
+    ) -> None:
+        """`commit` from an event loop, see `ListingSink.flush_async`."""
+        if self.due(checkpoint):
+            await sink.flush_async()
+            self.save(checkpoint)
+
+    def clear(self, checkpoint: Checkpoint) -> None:
+        """Forget a search, e.g. once it ran to its end."""
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE search_key = ?",
+                (checkpoint.search_key,),
+            )
+
+    def prune(self) -> int:
+        """Remove expired checkpoints, return how many."""
+        with self._conn:
+            return self._conn.execute(
+                "DELETE FROM checkpoints WHERE updated_at < ?",
+                (time.time() - self.max_age_seconds,),
+            ).rowcount
+
+
+class NullCheckpointStore(CheckpointStore):
+    """Starts every search from its first page and keeps no checkpoints."""
+
+    def __init__(self) -> None:
+        pass
+
+    def get(self, params: RightmoveRentParams) -> Checkpoint:
+        return Checkpoint(search_key(params))
+
+    def due(self, checkpoint: Checkpoint) -> bool:  # noqa: ARG002
+        return False
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        pass
+
+    def clear(self, checkpoint: Checkpoint) -> None:
+        pass
+
+    def prune(self) -> int:
+        return 0
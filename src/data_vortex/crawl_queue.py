@@ -0,0 +1,428 @@
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from data_vortex.listing_store import ListingSink
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_processing import (
+    check_response,
+    get_parser,
+    parse_search_summary,
+)
+from data_vortex.rightmove_query import (
+    RIGHTMOVE_PAGE_SIZE,
+    search_rental_properties,
+)
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+
+TASK_STATUSES = ("pending", "leased", "done", "failed")
+
+
+@dataclass
+class CrawlTask:
+    """One page of one search bucket, `params` carries the page index."""
+
+    id: int
+    run: str
+    params: RightmoveRentParams
+    attempts: int
+
+    @property
+    def region(self) -> str:
+        return self.params.locationIdentifier
+
+    @property
+    def page_index(self) -> int:
+        return self.params.index or 0
+
+
+@dataclass
+class WorkerResult:
+    pages: int = 0
+    listings: int = 0
+    new_listings: int = 0
+    failed: int = 0
+
+
+def _search_key(params: RightmoveRentParams) -> str:
+    return params.model_dump_json(exclude={"index"})
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def default_run() -> str:
+    """One run a day, so that a daily crawl enqueues its searches anew."""
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+class CrawlQueue:
+    """
+    Durable queue of search result pages to crawl, kept in a SQLite file
+    that any number of worker processes share. A worker leases tasks for
+    `lease_seconds` and keeps the lease with heartbeats while it works;
+    tasks of a worker that died become free again once their lease runs
+    out. Tasks belong to a run, by default the day they were enqueued.
+    Finished pages stay in the queue as done, so enqueueing the same
+    searches for the same run again after a crash only adds what is
+    missing and a resumed run never fetches a finished page twice, while
+    the next run crawls them all again.
+
+    Only the first page of every search is enqueued. Its result count
+    tells how many pages the search has, and the remaining pages are added
+    when it is completed, so that they are spread over all workers.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.path = Path(path or settings.CRAWL_QUEUE_PATH)
+        self.lease_seconds = (
+            lease_seconds or settings.CRAWL_QUEUE_LEASE_SECONDS
+        )
+        self.max_attempts = max_attempts or settings.CRAWL_QUEUE_MAX_ATTEMPTS
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn, conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    run TEXT NOT NULL,
+                    search TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    page_index INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    listings INTEGER,
+                    error TEXT,
+                    UNIQUE (run, search, page_index)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS tasks_status "
+                "ON tasks (status, page_index)"
+            )
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        # A connection per call, so that heartbeats can come from a thread
+        return closing(
+            sqlite3.connect(
+                str(self.path),
+                timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None,
+            )
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # Take the write lock up front, so that two workers never lease
+        # the same task
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(
+        self,
+        params_list: Iterable[RightmoveRentParams],
+        run: Optional[str] = None,
+    ) -> int:
+        """
+        Add the first page of every search to the run, by default today's,
+        return how many were new.
+        """
+        run = run or default_run()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks "
+                "(run, search, region, page_index) VALUES (?, ?, ?, 0)",
+                [
+                    (run, _search_key(p), p.locationIdentifier)
+                    for p in params_list
+                ],
+            )
+            return conn.total_changes - before
+
+    def lease(self, worker: str, limit: int = 1) -> List[CrawlTask]:
+        """
+        Lease up to `limit` free tasks, first pages first. Tasks whose
+        lease ran out are free again, unless they have used up their
+        attempts, which fails them.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', worker = NULL, "
+                "error = 'Lease expired' WHERE status = 'leased' "
+                "AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id, run, search, page_index, attempts FROM tasks "
+                "WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY page_index, id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET status = 'leased', worker = ?, "
+                "lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                [(worker, now + self.lease_seconds, row[0]) for row in rows],
+            )
+        return [
+            CrawlTask(
+                id=task_id,
+                run=run,
+                params=RightmoveRentParams.model_validate_json(
+                    search
+                ).model_copy(update={"index": page_index}),
+                attempts=attempts + 1,
+            )
+            for task_id, run, search, page_index, attempts in rows
+        ]
+
+    def heartbeat(self, worker: str, tasks: Iterable[CrawlTask]) -> int:
+        """Extend the leases the worker still holds, return how many."""
+        expires = time.time() + self.lease_seconds
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE tasks SET lease_expires = ? "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                [(expires, task.id, worker) for task in tasks],
+            )
+            return conn.total_changes - before
+
+    def complete(
+        self,
+        worker: str,
+        task: CrawlTask,
+        listings: int,
+        page_count: Optional[int] = None,
+    ) -> bool:
+        """
+        Mark the task done, in the same transaction adding the other pages
+        of its search when the first page tells there are `page_count`.
+        Return False, changing nothing, when the worker lost the lease.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = 'done', listings = ?, "
+                "lease_expires = NULL, error = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                (listings, task.id, worker),
+            )
+            if cursor.rowcount == 0:
+                log.warning(
+                    "Task %s was leased to another worker before it was "
+                    "completed",
+                    task.id,
+                )
+                return False
+            if page_count:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tasks "
+                    "(run, search, region, page_index) VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            task.run,
+                            _search_key(task.params),
+                            task.region,
+                            page * RIGHTMOVE_PAGE_SIZE,
+                        )
+                        for page in range(1, page_count)
+                    ],
+                )
+        return True
+
+    def fail(self, worker: str, task: CrawlTask, error: str) -> None:
+        """Free the task for a retry, or fail it after its last attempt."""
+        status = "failed" if task.attempts >= self.max_attempts else "pending"
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker = NULL, "
+                "lease_expires = NULL, error = ? WHERE id = ? AND worker = ?",
+                (status, error, task.id, worker),
+            )
+
+    def retry_failed(self) -> int:
+        """Give failed tasks a fresh set of attempts."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0 "
+                "WHERE status = 'failed'"
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks by status."""
+        with self._connect() as conn:
+            counts = dict(
+                conn.execute(
+                    "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+                ).fetchall()
+            )
+        return {status: counts.get(status, 0) for status in TASK_STATUSES}
+
+    def unfinished(self) -> int:
+        counts = self.counts()
+        return counts["pending"] + counts["leased"]
+
+
+class _Heartbeat:
+    """Keeps the leases of the tasks in hand from a background thread."""
+
+    def __init__(
+        self,
+        queue: CrawlQueue,
+        worker: str,
+        tasks: List[CrawlTask],
+        interval: float,
+    ) -> None:
+        self._queue = queue
+        self._worker = worker
+        self._tasks = tasks
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="crawl-queue-heartbeat", daemon=True
+        )
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                self._queue.heartbeat(self._worker, self._tasks)
+            except sqlite3.Error as e:
+                log.warning(f"Heartbeat failed: {e}")
+
+
+class CrawlWorker:
+    """
+    Takes pages off a `CrawlQueue` until the queue is drained and stores
+    their listings in `sink`. Tasks are leased `lease_batch` at a time and
+    only marked done once the sink has flushed their listings, so a crash
+    loses at most the pages in hand, which another worker then redoes.
+    Any number of workers, in processes or on hosts sharing the queue
+    file, can work on the same queue.
+    """
+
+    def __init__(
+        self,
+        queue: CrawlQueue,
+        sink: ListingSink,
+        worker_id: Optional[str] = None,
+        lease_batch: Optional[int] = None,
+        use_cache: bool = False,
+        wait_time: float = 0,
+    ) -> None:
+        self.queue = queue
+        self.sink = sink
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_batch = lease_batch or settings.CRAWL_QUEUE_LEASE_BATCH
+        self.use_cache = use_cache
+        self.wait_time = wait_time
+        self.result = WorkerResult()
+        self._parser = get_parser()
+
+    def run(self) -> WorkerResult:
+        while True:
+            tasks = self.queue.lease(self.worker_id, self.lease_batch)
+            if not tasks:
+                # Pages leased by others may still add pages to the queue
+                if not self.queue.unfinished():
+                    break
+                time.sleep(settings.CRAWL_QUEUE_POLL_INTERVAL)
+                continue
+            with _Heartbeat(
+                self.queue,
+                self.worker_id,
+                tasks,
+                settings.CRAWL_QUEUE_HEARTBEAT_INTERVAL,
+            ):
+                self._work(tasks)
+        log.info(
+            f"Worker {self.worker_id} crawled {self.result.pages} pages "
+            f"with {self.result.listings} listings, "
+            f"{self.result.new_listings} new, {self.result.failed} failed"
+        )
+        return self.result
+
+    def _work(self, tasks: List[CrawlTask]) -> None:
+        fetched = []
+        for task in tasks:
+            try:
+                fetched.append((task, *self._fetch(task)))
+            except Exception as e:
+                log.error(f"Could not crawl page {task.params.dict()}: {e}")
+                self.queue.fail(self.worker_id, task, repr(e))
+                self.result.failed += 1
+            time.sleep(self.wait_time)
+
+        # Listings first, so that a page is never done without them
+        self.sink.flush()
+        for task, listings, page_count in fetched:
+            if self.queue.complete(self.worker_id, task, listings, page_count):
+                self.result.pages += 1
+                self.result.listings += listings
+
+    def _fetch(self, task: CrawlTask) -> Tuple[int, Optional[int]]:
+        """Store the listings of the page, return how many and pages."""
+        response = search_rental_properties(
+            task.params, use_cache=self.use_cache
+        )
+        check_response(response)
+        listings = self._parser.parse_listings(response.content)
+        self.result.new_listings += self.sink.add(listings)
+
+        page_count = None
+        if task.page_index == 0:
+            summary = parse_search_summary(response.content)
+            if summary is None:
+                log.warning(
+                    "Search page has no result count, only the first page "
+                    "of %s is crawled",
+                    task.params,
+                )
+            else:
+                results = min(
+                    summary.result_count, settings.PLANNER_RESULT_CAP
+                )
+                page_count = math.ceil(results / RIGHTMOVE_PAGE_SIZE)
+        return len(listings), page_count
@@ -0,0 +1,167 @@
+import datetime
+import json
+import math
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from data_vortex.rightmove_models import GenericListing, RightmoveRentParams
+from data_vortex.utils.config import settings
+
+# Values Rightmove accepts for maxDaysSinceAdded
+MAX_DAYS_SINCE_ADDED_OPTIONS = (1, 3, 7, 14)
+# sortType of "Newest listed"
+SORT_NEWEST_FIRST = "6"
+
+
+@dataclass
+class Watermark:
+    """
+    High-water mark of one search bucket: the newest added date seen and
+    when the bucket was last crawled, incrementally or in full.
+    """
+
+    bucket_key: str
+    newest_added_date: Optional[datetime.date] = None
+    last_run_at: Optional[float] = None
+    last_full_run_at: Optional[float] = None
+    # Newest added date seen by the current run, and whether it failed
+    seen_newest: Optional[datetime.date] = None
+    failed: bool = False
+
+    def reached(self, listings: Iterable[GenericListing]) -> bool:
+        """
+        Record a page of newest first results and tell whether all of it is
+        older than the mark, i.e. the rest of the search was seen before.
+        Listings added on the day of the mark may still be new.
+        """
+        added_dates = [
+            listing.added_date
+            for listing in listings
+            if isinstance(listing.added_date, datetime.date)
+        ]
+        if not added_dates:
+            return False
+        newest = max(added_dates)
+        if self.seen_newest is None or newest > self.seen_newest:
+            self.seen_newest = newest
+        if self.newest_added_date is None:
+            return False
+        # Featured listings are pinned to the top whatever their date, so
+        # the whole page has to be older rather than just its first listing
+        return newest < self.newest_added_date
+
+
+def bucket_key(params: RightmoveRentParams) -> str:
+    """Identify a search independently of paging, sorting and recency."""
+    return json.dumps(
+        params.model_dump(exclude={"index", "maxDaysSinceAdded", "sortType"}),
+        sort_keys=True,
+    )
+
+
+def max_days_since_added(
+    last_run_at: Optional[float], now: float
+) -> Optional[int]:
+    """
+    The smallest maxDaysSinceAdded that covers everything added since the
+    last run, or None when the last run is older than the largest option.
+    Added dates are whole days, so one day of slack is added.
+    """
+    if last_run_at is None:
+        return None
+    days = math.ceil((now - last_run_at) / 86400) + 1
+    for option in MAX_DAYS_SINCE_ADDED_OPTIONS:
+        if days <= option:
+            return option
+    return None
+
+
+class WatermarkStore:
+    """Watermarks of all search buckets in a SQLite file."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path or settings.WATERMARK_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                bucket_key TEXT PRIMARY KEY,
+                newest_added_date TEXT,
+                last_run_at REAL,
+                last_full_run_at REAL
+            )
+            """
+        )
+
+    def get(self, params: RightmoveRentParams) -> Watermark:
+        key = bucket_key(params)
+        row = self._conn.execute(
+            "SELECT newest_added_date, last_run_at, last_full_run_at "
+            "FROM watermarks WHERE bucket_key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return Watermark(key)
+        newest, last_run_at, last_full_run_at = row
+        return Watermark(
+            key,
+            newest_added_date=datetime.date.fromisoformat(newest)
+            if newest
+            else None,
+            last_run_at=last_run_at,
+            last_full_run_at=last_full_run_at,
+        )
+
+    def save(
+        self, watermark: Watermark, started_at: float, full: bool = False
+    ) -> None:
+        """Move the mark forward, unless the crawl of the bucket failed."""
+        if watermark.failed:
+            return
+        newest = max(
+            (
+                date
+                for date in (
+                    watermark.newest_added_date,
+                    watermark.seen_newest,
+                )
+                if date is not None
+            ),
+            default=None,
+        )
+        watermark.newest_added_date = newest
+        watermark.last_run_at = started_at
+        if full:
+            watermark.last_full_run_at = started_at
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?)",
+                (
+                    watermark.bucket_key,
+                    newest.isoformat() if newest else None,
+                    watermark.last_run_at,
+                    watermark.last_full_run_at,
+                ),
+            )
+
+
+def incremental_params(
+    params: RightmoveRentParams,
+    watermark: Watermark,
+    now: Optional[float] = None,
+) -> RightmoveRentParams:
+    """
+    Sort the search newest first and, when the last run is recent enough,
+    restrict it to listings added since then.
+    """
+    days = max_days_since_added(watermark.last_run_at, now or time.time())
+    return params.model_copy(
+        update={
+            "sortType": SORT_NEWEST_FIRST,
+            "maxDaysSinceAdded": str(days) if days is not None else "",
+        }
+    )
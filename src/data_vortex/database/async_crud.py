@@ -0,0 +1,76 @@
+"""
+Async counterparts of the `crud` functions, for `AsyncSession`s. Queries
+are shared with `crud`; bulk writes run the sync implementation on the
+session's connection through `run_sync`, so both take the same path.
+"""
+import datetime
+from typing import Iterable, List, Optional
+
+from data_vortex.database import crud
+from data_vortex.database.crud import (
+    ListingCursor,
+    ListingFilter,
+    ListingPage,
+    ListingSort,
+    UpsertResult,
+)
+from data_vortex.database.models import PriceHistory, RentalListing
+from data_vortex.rightmove_models import GenericListing
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def upsert_listing_rows(
+    db: AsyncSession, rows: Iterable[dict], chunk_size: Optional[int] = None
+) -> UpsertResult:
+    """Upsert `GenericListing.to_orm_dict()` rows and commit."""
+    rows = list(rows)
+    return await db.run_sync(
+        lambda session: crud.upsert_listing_rows(session, rows, chunk_size)
+    )
+
+
+async def bulk_upsert_listings(
+    db: AsyncSession,
+    new_listings: Iterable[GenericListing],
+    chunk_size: Optional[int] = None,
+) -> UpsertResult:
+    return await upsert_listing_rows(
+        db,
+        [listing.to_orm_dict() for listing in new_listings],
+        chunk_size=chunk_size,
+    )
+
+
+async def get_listing(
+    db: AsyncSession, property_id: str
+) -> Optional[RentalListing]:
+    return await db.get(RentalListing, property_id)
+
+
+async def search_listings(
+    db: AsyncSession,
+    filters: Optional[ListingFilter] = None,
+    sort: ListingSort = ListingSort.PRICE,
+    limit: int = 50,
+    after: Optional[ListingCursor] = None,
+) -> ListingPage:
+    """See `crud.search_listings`."""
+    query = crud.listing_search_query(
+        filters or ListingFilter(), sort, limit, after
+    )
+    listings = list((await db.execute(query)).scalars())
+    return crud.listing_page(listings, sort, limit)
+
+
+async def get_price_changes(
+    db: AsyncSession, since: datetime.datetime, limit: Optional[int] = None
+) -> List[PriceHistory]:
+    return list(
+        (await db.execute(crud.price_changes_query(since, limit))).scalars()
+    )
+
+
+async def count_listings(db: AsyncSession) -> int:
+    query = select(func.count()).select_from(RentalListing)
+    return (await db.execute(query)).scalar_one()
@@ -0,0 +1,114 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+
+from data_vortex.database.database import apply_sqlite_profile, check_profile
+from data_vortex.database.models import Base
+from data_vortex.utils.config import settings
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+# Async drivers of the databases we run on
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_url(url: str) -> str:
+    """`url` with the async driver of its database, e.g. aiosqlite."""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {dialect}")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+def make_async_engine(
+    url: str,
+    profile: str = "default",
+    writer: bool = False,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+) -> AsyncEngine:
+    """
+    Async counterpart of `database.make_engine`. SQLite connections get the
+    same profile, and a SQLite `writer` engine the same single connection,
+    whatever the pool sizing.
+    """
+    check_profile(profile)
+    url = async_url(url)
+    tuned = profile == "tuned" and url.startswith("sqlite")
+    if tuned and writer:
+        pool_size, max_overflow = 1, 0
+    kwargs = {
+        "pool_size": pool_size or settings.ASYNC_POOL_SIZE,
+        "max_overflow": settings.ASYNC_MAX_OVERFLOW
+        if max_overflow is None
+        else max_overflow,
+    }
+    if ":memory:" in url or url.endswith("://"):
+        # In memory databases live in one connection, without a pool to size
+        kwargs = {}
+    engine = create_async_engine(url, **kwargs)
+    if tuned:
+        apply_sqlite_profile(engine.sync_engine, writer)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_async_engine(writer: bool = False) -> AsyncEngine:
+    """
+    The engine of the configured database, or of its single writer
+    connection. Created on first use, so that importing this module does
+    not need the async driver.
+    """
+    return make_async_engine(
+        settings.ASYNC_DATABASE_URL or settings.DATABASE_URL,
+        settings.SQLITE_PROFILE,
+        writer=writer,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_sessionmaker(writer: bool = False) -> async_sessionmaker:
+    # Loaded attributes stay readable after a commit, so listings can be
+    # returned from a task after its session is gone
+    return async_sessionmaker(
+        get_async_engine(writer=writer), expire_on_commit=False
+    )
+
+
+@asynccontextmanager
+async def session_scope(
+    session_factory: Optional[async_sessionmaker] = None,
+) -> AsyncIterator[AsyncSession]:
+    """
+    One session per task: commits when the block succeeds, rolls back when
+    it raises and always closes. Sessions must not be shared between
+    concurrently running tasks. Uses the reader sessions by default.
+    """
+    session_factory = session_factory or get_async_sessionmaker()
+    async with session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Session dependency for async request handlers."""
+    async with session_scope() as session:
+        yield session
+
+
+async def create_database_async(engine: Optional[AsyncEngine] = None):
+    engine = engine or get_async_engine(writer=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
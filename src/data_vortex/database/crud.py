@@ -1,28 +1,251 @@
+import datetime
+import hashlib
+import json
+from dataclasses import dataclass
+from enum import Enum
 from sqlite3 import DatabaseError, IntegrityError
-from typing import List
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
 
-from data_vortex.database.models import RentalListing
-from data_vortex.rightmove_models import RightmoveRentalListing
-from sqlalchemy import insert, update
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.models import PriceHistory, RentalListing
+from data_vortex.listing_batch import ListingBatch
+from data_vortex.metrics import DB_COMMIT_SECONDS, DB_ROWS
+from data_vortex.rightmove_models import (
+    RightmoveRentalListing,
+    postcode_district,
+)
+from data_vortex.utils.config import settings
+from sqlalchemy import Select, Table, func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
+# Columns that keep the value of the first insert when a row is upserted
+UPSERT_PRESERVED_COLUMNS = ("created_date",)
+# A change of any of these adds a row to the price history
+PRICE_HISTORY_COLUMNS = (
+    "price_amount",
+    "price_per",
+    "price_currency",
+    "added_date",
+)
 
-def create_listing(db: Session, rental_listing: RightmoveRentalListing):
-    listing_dict = rental_listing.dict()
-    try:
-        existing_listing = (
-            db.query(RentalListing)
-            .filter(RentalListing.property_id == rental_listing.property_id)
-            .first()
-        )
-        if existing_listing:
-            # return RightmoveRentalListing(**existing_listing.dict())
-            pass
-        else:
-            db.execute(
-                insert(RentalListing),
-                listing_dict,
+
+@dataclass
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    # Rows identical to the stored ones, which are not written at all
+    unchanged: int = 0
+
+
+def _dialect_insert(db: Session, table: Table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    raise ValueError(f"Upserts are not supported on {dialect}")
+
+
+def _chunks(rows: Sequence[dict], chunk_size: int) -> Iterable[List[dict]]:
+    for start in range(0, len(rows), chunk_size):
+        yield list(rows[start : start + chunk_size])
+
+
+def upsert_rows(
+    db: Session,
+    table: Table,
+    rows: Iterable[dict],
+    key: str,
+    preserved_columns: Sequence[str] = (),
+    chunk_size: Optional[int] = None,
+) -> UpsertResult:
+    """
+    Insert `rows` into `table`, updating the rows whose `key` already exists
+    with one `INSERT ... ON CONFLICT DO UPDATE` executemany per chunk. Rows
+    must all have the same columns. Does not commit.
+    """
+    chunk_size = chunk_size or settings.UPSERT_CHUNK_SIZE
+    # Within one executemany a repeated key would be counted as an insert
+    # and an update, so only the last row for every key is kept
+    unique_rows: Dict[str, dict] = {row[key]: row for row in rows}
+    result = UpsertResult()
+    if not unique_rows:
+        return result
+
+    stmt = _upsert_statement(
+        db,
+        table,
+        next(iter(unique_rows.values())).keys(),
+        key,
+        preserved_columns,
+    )
+    key_column = table.c[key]
+    for chunk in _chunks(list(unique_rows.values()), chunk_size):
+        existing = db.execute(
+            select(func.count())
+            .select_from(table)
+            .where(key_column.in_([row[key] for row in chunk]))
+        ).scalar_one()
+        db.execute(stmt, chunk)
+        result.updated += existing
+        result.inserted += len(chunk) - existing
+    return result
+
+
+def _upsert_statement(
+    db: Session,
+    table: Table,
+    columns: Iterable[str],
+    key: str,
+    preserved_columns: Sequence[str],
+):
+    stmt = _dialect_insert(db, table)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            column: stmt.excluded[column]
+            for column in columns
+            if column != key and column not in preserved_columns
+        },
+    )
+
+
+def listing_content_hash(row: dict) -> str:
+    """Hash of everything in a listing row that an upsert would update."""
+    content = {
+        column: value
+        for column, value in row.items()
+        if column not in UPSERT_PRESERVED_COLUMNS and column != "content_hash"
+    }
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _price_key(row) -> tuple:
+    price = tuple(row[column] for column in PRICE_HISTORY_COLUMNS)
+    # Stored amounts are floats, incoming ones usually ints
+    return (float(price[0]) if price[0] is not None else None, *price[1:])
+
+
+def write_listing_rows(
+    db: Session,
+    rows: Iterable[dict],
+    chunk_size: Optional[int] = None,
+    observed_at: Optional[datetime.datetime] = None,
+) -> UpsertResult:
+    """
+    Upsert `GenericListing.to_orm_dict()` rows, diffing them against the
+    stored listings by content hash first. Unchanged listings are skipped,
+    and new listings and price changes are appended to the price history,
+    so that both grow with the number of changes rather than with the
+    number of listings crawled. Does not commit.
+    """
+    chunk_size = chunk_size or settings.UPSERT_CHUNK_SIZE
+    observed_at = observed_at or datetime.datetime.now()
+    unique_rows: Dict[str, dict] = {}
+    for row in rows:
+        row = {**row, "postcode_district": postcode_district(row["postcode"])}
+        row["content_hash"] = listing_content_hash(row)
+        unique_rows[row["property_id"]] = row
+    result = UpsertResult()
+    if not unique_rows:
+        return result
+
+    table = RentalListing.__table__
+    stmt = _upsert_statement(
+        db,
+        table,
+        next(iter(unique_rows.values())).keys(),
+        "property_id",
+        UPSERT_PRESERVED_COLUMNS,
+    )
+    stored_columns = [
+        table.c.property_id,
+        table.c.content_hash,
+        *(table.c[column] for column in PRICE_HISTORY_COLUMNS),
+    ]
+    for chunk in _chunks(list(unique_rows.values()), chunk_size):
+        stored_rows = {
+            stored.property_id: stored._mapping
+            for stored in db.execute(
+                select(*stored_columns).where(
+                    table.c.property_id.in_(
+                        [row["property_id"] for row in chunk]
+                    )
+                )
             )
+        }
+        changed: List[dict] = []
+        history: List[dict] = []
+        for row in chunk:
+            stored = stored_rows.get(row["property_id"])
+            if (
+                stored is not None
+                and stored["content_hash"] == row["content_hash"]
+            ):
+                result.unchanged += 1
+                continue
+            changed.append(row)
+            if stored is None:
+                result.inserted += 1
+            else:
+                result.updated += 1
+            if stored is None or _price_key(stored) != _price_key(row):
+                history.append(
+                    {
+                        "property_id": row["property_id"],
+                        **{c: row[c] for c in PRICE_HISTORY_COLUMNS},
+                        "previous_price_amount": stored["price_amount"]
+                        if stored is not None
+                        else None,
+                        "observed_at": observed_at,
+                    }
+                )
+        if changed:
+            db.execute(stmt, changed)
+        if history:
+            db.execute(insert(PriceHistory.__table__), history)
+    return result
+
+
+def upsert_listing_rows(
+    db: Session, rows: Iterable[dict], chunk_size: Optional[int] = None
+) -> UpsertResult:
+    """Upsert `GenericListing.to_orm_dict()` rows and commit."""
+    try:
+        with DB_COMMIT_SECONDS.time():
+            result = write_listing_rows(db, rows, chunk_size=chunk_size)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        raise Exception(f"Database error during bulk upsert: {e}") from e
+    DB_ROWS.labels("inserted").inc(result.inserted)
+    DB_ROWS.labels("updated").inc(result.updated)
+    DB_ROWS.labels("unchanged").inc(result.unchanged)
+    return result
+
+
+def create_listing(
+    db: Session,
+    rental_listing: RightmoveRentalListing,
+    stats_cache: Optional[RentStatsCache] = None,
+) -> RentalListing:
+    """
+    Insert the listing unless one with its property_id already exists,
+    return the stored listing. New listings go through `write_listing_rows`
+    like every other write, so they get their content hash and first price
+    history row, and their district is invalidated in `stats_cache`, if
+    given. Does not commit.
+    """
+    try:
+        stored = db.get(RentalListing, rental_listing.property_id)
+        if stored is None:
+            write_listing_rows(db, [rental_listing.to_orm_dict()])
+            stored = db.get(RentalListing, rental_listing.property_id)
+            if stats_cache is not None:
+                stats_cache.invalidate([stored.postcode])
+        return stored
     except IntegrityError as e:
         db.rollback()
         raise ValueError(f"Integrity error: {e!s}")
@@ -44,49 +267,164 @@ def upsert_listing(db: Session, rental_listing: RightmoveRentalListing):
 def bulk_upsert_listings(
     db: Session,
     new_listings: List[RightmoveRentalListing],
-    unique_attr="property_id",
-):
-    try:
-        unique_ids = [
-            getattr(listing, unique_attr) for listing in new_listings
-        ]
-
-        existing_listings = (
-            db.query(RentalListing)
-            .filter(getattr(RentalListing, unique_attr).in_(unique_ids))
-            .all()
+    chunk_size: Optional[int] = None,
+) -> UpsertResult:
+    return upsert_listing_rows(
+        db,
+        (listing.to_orm_dict() for listing in new_listings),
+        chunk_size=chunk_size,
+    )
+
+
+def upsert_listing_batch(
+    db: Session, batch: ListingBatch, chunk_size: Optional[int] = None
+) -> UpsertResult:
+    return upsert_listing_rows(db, batch.iter_rows(), chunk_size=chunk_size)
+
+
+def get_price_changes(
+    db: Session, since: datetime.datetime, limit: Optional[int] = None
+) -> List[PriceHistory]:
+    """
+    Price changes observed since `since`, oldest first. First prices of new
+    listings are not changes and are left out.
+    """
+    return list(db.execute(price_changes_query(since, limit)).scalars())
+
+
+def price_changes_query(
+    since: datetime.datetime, limit: Optional[int] = None
+) -> Select:
+    return (
+        select(PriceHistory)
+        .where(
+            PriceHistory.observed_at >= since,
+            PriceHistory.previous_price_amount.is_not(None),
         )
-        existing_listings_dict = {
-            getattr(listing, unique_attr): listing
-            for listing in existing_listings
-        }
+        .order_by(PriceHistory.observed_at, PriceHistory.id)
+        .limit(limit)
+    )
 
-        to_update = []
-        to_insert = []
 
-        for new_listing in new_listings:
-            existing_listing = existing_listings_dict.get(
-                getattr(new_listing, unique_attr)
-            )
-            if existing_listing:
-                for attr, value in vars(new_listing).items():
-                    setattr(existing_listing, attr, value)
-                to_update.append(existing_listing)
-            else:
-                to_insert.append(new_listing)
+def get_price_history(db: Session, property_id: str) -> List[PriceHistory]:
+    query = (
+        select(PriceHistory)
+        .where(PriceHistory.property_id == property_id)
+        .order_by(PriceHistory.observed_at, PriceHistory.id)
+    )
+    return list(db.execute(query).scalars())
 
-        if to_update:
-            db.execute(
-                update(RentalListing),
-                to_update,
-            )
-        if to_insert:
-            db.bulk_save_objects(to_insert)
 
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise Exception(f"Database error during bulk upsert: {e}") from e
+class ListingSort(Enum):
+    PRICE = "price"  # cheapest first
+    NEWEST = "newest"  # most recently added first
+
+
+@dataclass
+class ListingFilter:
+    """Criteria of a listing search, None meaning any."""
+
+    postcode_district: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    added_since: Optional[datetime.date] = None
+    added_until: Optional[datetime.date] = None
+
+
+class ListingCursor(NamedTuple):
+    """Position after the last listing of a page."""
+
+    sort_value: Any
+    property_id: str
+
+
+@dataclass
+class ListingPage:
+    listings: List[RentalListing]
+    # None on the last page
+    next_cursor: Optional[ListingCursor]
+
+
+def listing_search_query(
+    filters: ListingFilter,
+    sort: ListingSort = ListingSort.PRICE,
+    limit: int = 50,
+    after: Optional[ListingCursor] = None,
+) -> Select:
+    """
+    The query of one page of a listing search. Pages are found by keyset:
+    rather than skipping `OFFSET` rows, the query starts right after the
+    sort key of the last listing seen, so every page is a range read of one
+    of the `rental_listings` indexes however deep it is.
+    """
+    sort_column = (
+        RentalListing.price_amount
+        if sort is ListingSort.PRICE
+        else RentalListing.added_date
+    )
+    # Listings without a sort value cannot be paged through by it
+    conditions = [sort_column.is_not(None)]
+    if filters.postcode_district is not None:
+        conditions.append(
+            RentalListing.postcode_district
+            == postcode_district(filters.postcode_district)
+        )
+    if filters.min_price is not None:
+        conditions.append(RentalListing.price_amount >= filters.min_price)
+    if filters.max_price is not None:
+        conditions.append(RentalListing.price_amount <= filters.max_price)
+    if filters.added_since is not None:
+        conditions.append(RentalListing.added_date >= filters.added_since)
+    if filters.added_until is not None:
+        conditions.append(RentalListing.added_date <= filters.added_until)
+
+    key = tuple_(sort_column, RentalListing.property_id)
+    if sort is ListingSort.PRICE:
+        order_by = [sort_column.asc(), RentalListing.property_id.asc()]
+        if after is not None:
+            conditions.append(key > tuple_(*after))
+    else:
+        order_by = [sort_column.desc(), RentalListing.property_id.desc()]
+        if after is not None:
+            conditions.append(key < tuple_(*after))
+
+    return (
+        select(RentalListing)
+        .where(*conditions)
+        .order_by(*order_by)
+        .limit(limit)
+    )
+
+
+def search_listings(
+    db: Session,
+    filters: Optional[ListingFilter] = None,
+    sort: ListingSort = ListingSort.PRICE,
+    limit: int = 50,
+    after: Optional[ListingCursor] = None,
+) -> ListingPage:
+    """
+    Return up to `limit` listings matching `filters`, starting after the
+    cursor of the previous page.
+    """
+    query = listing_search_query(
+        filters or ListingFilter(), sort, limit, after
+    )
+    return listing_page(list(db.execute(query).scalars()), sort, limit)
+
+
+def listing_page(
+    listings: List[RentalListing], sort: ListingSort, limit: int
+) -> ListingPage:
+    """A page of search results, with a cursor unless it is the last."""
+    next_cursor = None
+    if len(listings) == limit:
+        last = listings[-1]
+        sort_value = (
+            last.price_amount if sort is ListingSort.PRICE else last.added_date
+        )
+        next_cursor = ListingCursor(sort_value, last.property_id)
+    return ListingPage(listings, next_cursor)
 
 
 def get_listing(db: Session, property_id: str):
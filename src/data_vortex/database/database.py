@@ -1,11 +1,91 @@
 from data_vortex.database.models import Base
 from data_vortex.utils.config import settings
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
-engine = create_engine(settings.DATABASE_URL)
+SQLITE_PROFILES = ("default", "tuned")
+
+
+def _sqlite_pragmas() -> dict:
+    return {
+        # Readers see the last commit while a write is in progress, and
+        # commits append to the log instead of rewriting pages
+        "journal_mode": "WAL",
+        # With WAL only a power loss, not a crash, can lose the last commits
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        # Negative sizes are in KiB
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        # Wait for a lock held by another process rather than failing with
+        # "database is locked"
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "temp_store": "MEMORY",
+    }
+
+
+def apply_sqlite_profile(engine: Engine, writer: bool) -> None:
+    """Set up the connections of a SQLite engine, sync or async."""
+    pragmas = _sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+        if writer:
+            # Let SQLAlchemy issue BEGIN itself, see below
+            dbapi_connection.isolation_level = None
+
+    if writer:
+        # Take the write lock when the transaction starts. A deferred
+        # transaction that reads first and writes later cannot wait for the
+        # lock once another process holds it, and fails straight away.
+        @event.listens_for(engine, "begin")
+        def begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def check_profile(profile: str) -> None:
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(
+            f"Unknown SQLite profile {profile!r}, "
+            f"expected one of {', '.join(SQLITE_PROFILES)}"
+        )
+
+
+def make_engine(
+    url: str, profile: str = "default", writer: bool = False
+) -> Engine:
+    """
+    Create an engine for `url`. With the "tuned" profile SQLite connections
+    are set up for concurrent use, see `_sqlite_pragmas`, and a `writer`
+    engine holds a single connection, so that all writes of the process go
+    through one connection one transaction at a time while reads use a
+    pool of their own. Other databases ignore the profile.
+    """
+    check_profile(profile)
+    tuned = profile == "tuned" and url.startswith("sqlite")
+    kwargs = {}
+    if tuned and writer:
+        kwargs = {"pool_size": 1, "max_overflow": 0}
+    engine = create_engine(url, **kwargs)
+    if tuned:
+        apply_sqlite_profile(engine, writer)
+    return engine
+
+
+engine = make_engine(settings.DATABASE_URL, settings.SQLITE_PROFILE)
+writer_engine = make_engine(
+    settings.DATABASE_URL, settings.SQLITE_PROFILE, writer=True
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions of long running writers, e.g. crawls and ingestion
+WriterSession = sessionmaker(
+    autocommit=False, autoflush=False, bind=writer_engine
+)
 
 
 def create_database():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=writer_engine)
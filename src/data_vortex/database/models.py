@@ -1,6 +1,15 @@
 import datetime
 
-from sqlalchemy import Column, Date, DateTime, Float, String
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -17,4 +26,70 @@ class RentalListing(Base):
     added_date = Column(Date)
     address = Column(String, nullable=True)
     postcode = Column(String, nullable=True)
+    # Outward code of the postcode, e.g. "N1", kept for filtering
+    postcode_district = Column(String, nullable=True)
     created_date = Column(DateTime, default=datetime.datetime.now)
+    bedrooms = Column(Integer, nullable=True)
+    bathrooms = Column(Integer, nullable=True)
+    property_type = Column(String, nullable=True)
+    # Hash of the listing content, to skip rewriting unchanged listings
+    content_hash = Column(String, nullable=True)
+
+    # Every search sorts by price or added date with the property id as a
+    # tie breaker, optionally within one district, see `search_listings`
+    __table_args__ = (
+        Index(
+            "ix_rental_listings_district_price",
+            "postcode_district",
+            "price_amount",
+            "property_id",
+        ),
+        Index(
+            "ix_rental_listings_district_added_date",
+            "postcode_district",
+            "added_date",
+            "property_id",
+        ),
+        Index("ix_rental_listings_price", "price_amount", "property_id"),
+        Index("ix_rental_listings_added_date", "added_date", "property_id"),
+    )
+
+
+class PriceHistory(Base):
+    """
+    Every price a listing was seen with: one row when it is first stored and
+    one for every later change of its price or of its added/reduced date.
+    """
+
+    __tablename__ = "price_history"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    property_id = Column(
+        String, ForeignKey("rental_listings.property_id"), nullable=False
+    )
+    price_amount = Column(Float)
+    price_per = Column(String, nullable=True)
+    price_currency = Column(String, nullable=True)
+    added_date = Column(Date)
+    # Null for the first price seen
+    previous_price_amount = Column(Float, nullable=True)
+    observed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_price_history_observed_at", "observed_at"),
+        Index(
+            "ix_price_history_property_id_observed_at",
+            "property_id",
+            "observed_at",
+        ),
+    )
+
+
+class RawListingIngest(Base):
+    """Raw listing files already loaded, used to make ingestion incremental."""
+
+    __tablename__ = "raw_listing_ingests"
+    path = Column(String, primary_key=True)
+    mtime = Column(Float, nullable=False)
+    sha256 = Column(String, nullable=False)
+    property_id = Column(String, nullable=True)
+    ingested_at = Column(DateTime, default=datetime.datetime.now)
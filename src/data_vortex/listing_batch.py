@@ -0,0 +1,108 @@
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_vortex.rightmove_models import GenericListing
+
+# Flat `GenericListing.to_orm_dict()` rows, as stored in Parquet
+LISTING_SCHEMA = pa.schema(
+    [
+        ("property_id", pa.string()),
+        ("image_url", pa.string()),
+        ("description", pa.string()),
+        ("price_amount", pa.int64()),
+        ("price_per", pa.string()),
+        ("price_currency", pa.string()),
+        ("added_date", pa.date32()),
+        ("address", pa.string()),
+        ("postcode", pa.string()),
+        ("created_date", pa.timestamp("us")),
+        ("bedrooms", pa.int32()),
+        ("bathrooms", pa.int32()),
+        ("property_type", pa.string()),
+    ]
+)
+
+_CODES = pa.dictionary(pa.int32(), pa.string())
+
+# The same columns held in memory: low cardinality strings become codes
+# into one shared copy of every distinct value and numbers are narrowed
+COMPACT_LISTING_SCHEMA = pa.schema(
+    [
+        ("property_id", pa.string()),
+        ("image_url", pa.string()),
+        ("description", pa.string()),
+        ("price_amount", pa.int32()),
+        ("price_per", _CODES),
+        ("price_currency", _CODES),
+        ("added_date", pa.date32()),
+        ("address", pa.string()),
+        ("postcode", _CODES),
+        ("created_date", pa.timestamp("us")),
+        ("bedrooms", pa.int8()),
+        ("bathrooms", pa.int8()),
+        ("property_type", _CODES),
+    ]
+)
+
+
+class ListingBatch:
+    """
+    Columnar container for many listings, e.g. a whole region snapshot.
+    Listings are held as Arrow arrays rather than as pydantic objects, which
+    takes a fraction of the memory, can be analysed with `pyarrow.compute`
+    and is written to Parquet or the database without any per listing
+    objects.
+    """
+
+    def __init__(self, table: pa.Table) -> None:
+        self.table = table.cast(COMPACT_LISTING_SCHEMA)
+
+    @classmethod
+    def from_listings(
+        cls, listings: Iterable[GenericListing]
+    ) -> "ListingBatch":
+        return cls.from_rows(listing.to_orm_dict() for listing in listings)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "ListingBatch":
+        return cls(pa.Table.from_pylist(list(rows), schema=LISTING_SCHEMA))
+
+    @classmethod
+    def read_parquet(cls, path: Path) -> "ListingBatch":
+        return cls(pq.read_table(path, schema=LISTING_SCHEMA))
+
+    @classmethod
+    def concat(cls, batches: Iterable["ListingBatch"]) -> "ListingBatch":
+        tables = [batch.table for batch in batches]
+        if not tables:
+            return cls(LISTING_SCHEMA.empty_table())
+        return cls(pa.concat_tables(tables).unify_dictionaries())
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def to_table(self) -> pa.Table:
+        """The listings with the plain column types of `LISTING_SCHEMA`."""
+        return self.table.cast(LISTING_SCHEMA)
+
+    def iter_rows(self, chunk_size: int = 1000) -> Iterator[Dict]:
+        """
+        Yield `GenericListing.to_orm_dict()` rows, decoding `chunk_size`
+        listings at a time.
+        """
+        for record_batch in self.to_table().to_batches(chunk_size):
+            yield from record_batch.to_pylist()
+
+    def to_listings(self) -> List[GenericListing]:
+        return GenericListing.from_orm_dicts(self.iter_rows())
+
+    def write_parquet(
+        self, path: Path, compression: Optional[str] = "zstd"
+    ) -> None:
+        pq.write_table(self.to_table(), path, compression=compression)
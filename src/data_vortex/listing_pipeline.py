@@ -0,0 +1,166 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Set
+
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.crud import UpsertResult, upsert_listing_rows
+from data_vortex.database.models import RentalListing
+from data_vortex.listing_store import ListingSink
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+_FLUSH = object()
+_STOP = object()
+
+
+class DatabaseListingWriter(ListingSink):
+    """
+    Streams crawled listings into the database. `add` only puts listings on
+    a bounded queue; a writer thread takes them off in batches of
+    `batch_size`, or whatever arrived within `flush_interval` seconds, and
+    upserts each batch through one long lived session, opened from
+    `session_factory` in that thread. Every listing is written, so that
+    price changes of stored listings reach the database and its price
+    history; only those not stored yet count as new. When the database
+    falls behind the
+    queue fills up and `add` blocks until there is room, `add_async` waits
+    for it in a thread instead. The districts of committed listings are
+    invalidated in `stats_cache`, if given.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        stats_cache: Optional[RentStatsCache] = None,
+    ) -> None:
+        self.batch_size = batch_size or settings.PIPELINE_BATCH_SIZE
+        self.flush_interval = (
+            flush_interval or settings.PIPELINE_FLUSH_INTERVAL
+        )
+        self.result = UpsertResult()
+        self.stats_cache = stats_cache
+        self._session_factory = session_factory
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=queue_size or settings.PIPELINE_QUEUE_SIZE
+        )
+        self._error: Optional[Exception] = None
+        # The crawl stops at the first page without new listings, so the
+        # stored ids are loaded once to count new listings instead of
+        # querying them for every page
+        with session_factory() as db:
+            self._property_ids: Set[str] = set(
+                db.execute(select(RentalListing.property_id)).scalars()
+            )
+        self._thread = threading.Thread(
+            target=self._run, name="listing-writer", daemon=True
+        )
+        self._thread.start()
+
+    def add(self, listings: Iterable[GenericListing]) -> int:
+        self._raise_error()
+        listings = list(listings)
+        num_new = self._count_new(listings)
+        self._put(listings)
+        return num_new
+
+    async def add_async(self, listings: Iterable[GenericListing]) -> int:
+        # New listings are counted on the loop, so that only the thread
+        # waiting for room on the queue runs concurrently with others
+        self._raise_error()
+        listings = list(listings)
+        num_new = self._count_new(listings)
+        await asyncio.to_thread(self._put, listings)
+        return num_new
+
+    def _count_new(self, listings: List[GenericListing]) -> int:
+        num_new = 0
+        for listing in listings:
+            if listing.property_id not in self._property_ids:
+                self._property_ids.add(listing.property_id)
+                num_new += 1
+        return num_new
+
+    def _put(self, listings: List[GenericListing]) -> None:
+        for listing in listings:
+            self._queue.put(listing)
+
+    def flush(self) -> None:
+        """Block until every listing added so far is committed."""
+        self._queue.put(_FLUSH)
+        self._queue.join()
+        self._raise_error()
+
+    async def flush_async(self) -> None:
+        await asyncio.to_thread(self.flush)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Listing writer failed") from self._error
+
+    def _run(self) -> None:
+        with self._session_factory() as db:
+            self._consume(db)
+
+    def _consume(self, db: Session) -> None:
+        batch: List[GenericListing] = []
+        deadline = 0.0
+        while True:
+            timeout = max(deadline - time.monotonic(), 0) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                batch = self._write(db, batch)
+                continue
+
+            if item is _FLUSH or item is _STOP:
+                batch = self._write(db, batch)
+                self._queue.task_done()
+                if item is _STOP:
+                    return
+                continue
+
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                batch = self._write(db, batch)
+
+    def _write(
+        self, db: Session, batch: List[GenericListing]
+    ) -> List[GenericListing]:
+        try:
+            # After a failure the queue is still drained, so that producers
+            # blocked on a full queue get to see the error
+            if batch and self._error is None:
+                result = upsert_listing_rows(
+                    db, [listing.to_orm_dict() for listing in batch]
+                )
+                self.result.inserted += result.inserted
+                self.result.updated += result.updated
+                self.result.unchanged += result.unchanged
+                log.info("Committed %d listings", len(batch))
+                if self.stats_cache is not None:
+                    self.stats_cache.invalidate(
+                        listing.postcode for listing in batch
+                    )
+        except Exception as e:
+            log.error("Could not write %d listings: %s", len(batch), e)
+            self._error = e
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+        return []
@@ -0,0 +1,186 @@
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from data_vortex.listing_batch import LISTING_SCHEMA, ListingBatch
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.seen_index import SeenIdIndex
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+
+SEGMENT_GLOB = "segment-*.parquet"
+
+
+class ListingSink(ABC):
+    """Destination of crawled listings."""
+
+    def __enter__(self) -> "ListingSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @abstractmethod
+    def add(self, listings: Iterable[GenericListing]) -> int:
+        """Take the listings that were not seen before, return how many."""
+
+    async def add_async(self, listings: Iterable[GenericListing]) -> int:
+        """`add` from an event loop, see `flush_async`."""
+        return self.add(listings)
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Make everything added so far durable."""
+
+    async def flush_async(self) -> None:
+        """
+        `flush` from an event loop. Sinks whose flush waits on another
+        thread run it in a thread of their own instead of blocking the loop.
+        """
+        self.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class ListingStore(ListingSink):
+    """
+    Append-only listing storage made of Parquet segments in one directory.
+    Listings are buffered and written as a new segment every `flush_size`
+    listings. The property ids of all segments are kept in a `SeenIdIndex`
+    next to the segments and used to skip listings that are already stored.
+    """
+
+    def __init__(
+        self, root: Optional[Path] = None, flush_size: Optional[int] = None
+    ) -> None:
+        self.root = Path(root or settings.LISTING_STORE_DIR)
+        self.flush_size = flush_size or settings.LISTING_STORE_FLUSH_SIZE
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._buffer: List[dict] = []
+        self._index = SeenIdIndex(self.root / "seen_ids.db")
+        if not len(self._index):
+            self._rebuild_index()
+
+    def __contains__(self, property_id: str) -> bool:
+        return property_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def segments(self) -> List[Path]:
+        return sorted(self.root.glob(SEGMENT_GLOB))
+
+    def _rebuild_index(self) -> None:
+        """Index stores written before the index existed."""
+        for segment in self.segments():
+            column = pq.read_table(segment, columns=["property_id"])
+            self._index.update(column["property_id"].to_pylist())
+        self._index.flush()
+
+    def add(self, listings: Iterable[GenericListing]) -> int:
+        """Buffer the listings that are not stored yet, return how many."""
+        num_new = 0
+        for listing in listings:
+            if not self._index.add(listing.property_id):
+                continue
+            self._buffer.append(listing.to_orm_dict())
+            num_new += 1
+
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+        return num_new
+
+    def flush(self) -> Optional[Path]:
+        """Write buffered listings as a new segment."""
+        if not self._buffer:
+            return None
+        table = pa.Table.from_pylist(self._buffer, schema=LISTING_SCHEMA)
+        segment = self._write_segment(table)
+        # Only after the segment is in place, so that a failed write does
+        # not leave ids in the index without their listings
+        self._index.flush()
+        log.info("Wrote %d listings to %s", len(self._buffer), segment)
+        self._buffer = []
+        return segment
+
+    def _write_segment(self, table: pa.Table) -> Path:
+        name = f"segment-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        segment = self.root / name
+        # Write under a temporary name first so readers never see a partial
+        # segment
+        tmp_path = segment.with_suffix(".tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        tmp_path.replace(segment)
+        return segment
+
+    def read_table(self, columns: Optional[List[str]] = None) -> pa.Table:
+        segments = self.segments()
+        if not segments:
+            return LISTING_SCHEMA.empty_table().select(
+                columns or LISTING_SCHEMA.names
+            )
+        return pa.concat_tables(
+            pq.read_table(segment, columns=columns, schema=LISTING_SCHEMA)
+            for segment in segments
+        )
+
+    def read_batch(self) -> ListingBatch:
+        """All stored listings, compactly, one segment at a time."""
+        return ListingBatch.concat(
+            ListingBatch.read_parquet(segment) for segment in self.segments()
+        )
+
+    def iter_listings(self) -> Iterator[GenericListing]:
+        for segment in self.segments():
+            yield from GenericListing.from_orm_dicts(
+                pq.read_table(segment, schema=LISTING_SCHEMA).to_pylist()
+            )
+
+    def compact(self) -> int:
+        """
+        Merge all segments into one, keeping the newest row of every
+        property. Returns the number of segments that were merged.
+        """
+        self.flush()
+        segments = self.segments()
+        if len(segments) < 2:
+            return 0
+
+        table = self.read_table()
+        table = table.append_column(
+            "_row", pa.array(range(table.num_rows), pa.int64())
+        )
+        latest = table.group_by("property_id").aggregate([("_row", "max")])
+        rows = latest["_row_max"]
+        rows = rows.take(pc.sort_indices(rows))
+        table = table.take(rows).drop_columns(["_row"])
+
+        self._write_segment(table)
+        for segment in segments:
+            segment.unlink()
+        return len(segments)
+
+
+def import_json_listings(store: ListingStore, json_dir: Path) -> int:
+    """
+    Import the `property_{id}.json` files written by earlier versions into
+    the store. Returns the number of listings imported.
+    """
+    imported = 0
+    for path in sorted(Path(json_dir).glob("property_*.json")):
+        content = json.loads(path.read_text())
+        # Older files were double encoded: a JSON string holding the JSON
+        if isinstance(content, str):
+            listing = GenericListing.model_validate_json(content)
+        else:
+            listing = GenericListing.model_validate(content)
+        imported += store.add([listing])
+    store.flush()
+    return imported
@@ -0,0 +1,59 @@
+from prometheus_client import Counter, Histogram
+
+# Seconds, from a cached page to a slow database commit or retried request
+DURATION_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "data_vortex_http_request_duration_seconds",
+    "Duration of HTTP requests by status code.",
+    ["status"],
+    buckets=DURATION_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Counter(
+    "data_vortex_http_response_bytes",
+    "Bytes of HTTP response bodies, after decompression.",
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "data_vortex_response_cache_requests",
+    "Lookups in the response cache: hit, revalidated or miss.",
+    ["result"],
+)
+PARSE_SECONDS = Histogram(
+    "data_vortex_parse_duration_seconds",
+    "Time to parse one search results page, by parser backend.",
+    ["backend"],
+    buckets=DURATION_BUCKETS,
+)
+LISTINGS_PARSED = Counter(
+    "data_vortex_listings_parsed",
+    "Listings parsed from search results pages.",
+)
+VALIDATION_FAILURES = Counter(
+    "data_vortex_validation_failures",
+    "Listing fields that failed validation, by field.",
+    ["field"],
+)
+DB_COMMIT_SECONDS = Histogram(
+    "data_vortex_db_commit_duration_seconds",
+    "Time to write and commit one batch of listings.",
+    buckets=DURATION_BUCKETS,
+)
+DB_ROWS = Counter(
+    "data_vortex_db_rows",
+    "Listings written to the database: inserted, updated or unchanged.",
+    ["result"],
+)
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.rightmove_processing import ListingParser, get_parser
+from data_vortex.utils.config import settings
+
+_worker_parser: Optional[ListingParser] = None
+
+
+def _init_worker(backend: str) -> None:
+    global _worker_parser
+    _worker_parser = get_parser(backend)
+
+
+def _parse_page(content: bytes) -> List[GenericListing]:
+    """Runs in a worker process, the listings are pickled back."""
+    return _worker_parser.parse_listings(content)
+
+
+class ParsePool:
+    """
+    Parses search result pages in worker processes, so that parsing runs on
+    every core and the event loop doing the fetching is never blocked by it.
+    The backend is resolved once in the parent and every worker builds its
+    parser once on start.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        backend: Optional[str] = None,
+    ) -> None:
+        # None makes the executor use one worker per CPU
+        self.workers = workers or settings.PARSE_WORKERS or None
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(backend or settings.PARSER_BACKEND,),
+        )
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    async def parse(self, content: bytes) -> List[GenericListing]:
+        """Parse one page without blocking the running event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _parse_page, content)
+
+    def close(self) -> None:
+        self._executor.shutdown()
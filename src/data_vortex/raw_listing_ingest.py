@@ -0,0 +1,165 @@
+import datetime
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.crud import upsert_rows, write_listing_rows
+from data_vortex.database.models import RawListingIngest
+from data_vortex.metrics import DB_COMMIT_SECONDS, DB_ROWS
+from data_vortex.rightmove_processing import parse_detailed_listing
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+RAW_LISTING_GLOB = "raw_property_*.html"
+
+
+@dataclass
+class IngestResult:
+    scanned: int = 0
+    unchanged: int = 0
+    ingested: int = 0
+    failed: int = 0
+
+
+class _ParseTask(NamedTuple):
+    path: str
+    mtime: float
+    known_sha256: Optional[str]
+
+
+class _ParseOutcome(NamedTuple):
+    path: str
+    mtime: float
+    sha256: str
+    row: Optional[dict] = None
+    error: Optional[str] = None
+
+    @property
+    def unchanged(self) -> bool:
+        return self.row is None and self.error is None
+
+
+def _parse_raw_listing(task: _ParseTask) -> _ParseOutcome:
+    """Runs in a worker process: hash the file and parse it if it changed."""
+    content = Path(task.path).read_bytes()
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 == task.known_sha256:
+        return _ParseOutcome(task.path, task.mtime, sha256)
+
+    # Relative dates on the page are relative to when it was downloaded
+    reference_date = datetime.date.fromtimestamp(task.mtime)
+    try:
+        listing = parse_detailed_listing(content, reference_date)
+    except (ValueError, ValidationError) as e:
+        return _ParseOutcome(task.path, task.mtime, sha256, error=str(e))
+    return _ParseOutcome(
+        task.path, task.mtime, sha256, row=listing.to_orm_dict()
+    )
+
+
+def _find_changed_files(
+    db: Session, raw_dir: Path, result: IngestResult
+) -> List[_ParseTask]:
+    known: Dict[str, RawListingIngest] = {
+        ingest.path: ingest for ingest in db.query(RawListingIngest)
+    }
+    tasks = []
+    for path in sorted(raw_dir.glob(RAW_LISTING_GLOB)):
+        result.scanned += 1
+        mtime = path.stat().st_mtime
+        ingest = known.get(str(path))
+        if ingest is not None and ingest.mtime == mtime:
+            result.unchanged += 1
+            continue
+        tasks.append(
+            _ParseTask(str(path), mtime, ingest.sha256 if ingest else None)
+        )
+    return tasks
+
+
+def _load_batch(
+    db: Session,
+    outcomes: List[_ParseOutcome],
+    stats_cache: Optional[RentStatsCache] = None,
+) -> None:
+    rows = [outcome.row for outcome in outcomes if outcome.row is not None]
+    with DB_COMMIT_SECONDS.time():
+        result = write_listing_rows(db, rows)
+        # Files that failed to parse are not recorded, so that they are
+        # parsed again by the next run, e.g. after a parser fix
+        upsert_rows(
+            db,
+            RawListingIngest.__table__,
+            (
+                {
+                    "path": outcome.path,
+                    "mtime": outcome.mtime,
+                    "sha256": outcome.sha256,
+                    "property_id": outcome.row["property_id"]
+                    if outcome.row
+                    else None,
+                }
+                for outcome in outcomes
+                if outcome.error is None
+            ),
+            key="path",
+        )
+        db.commit()
+    DB_ROWS.labels("inserted").inc(result.inserted)
+    DB_ROWS.labels("updated").inc(result.updated)
+    DB_ROWS.labels("unchanged").inc(result.unchanged)
+    if stats_cache is not None:
+        stats_cache.invalidate(row["postcode"] for row in rows)
+
+
+def ingest_raw_listings(
+    db: Session,
+    raw_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    chunksize: int = 16,
+    stats_cache: Optional[RentStatsCache] = None,
+) -> IngestResult:
+    """
+    Parse every raw listing page in `raw_dir` across a process pool and load
+    the listings into `rental_listings`. Files whose mtime, or failing that
+    content hash, matches the last ingest are skipped; files that failed to
+    parse are tried again. The districts of
+    loaded listings are invalidated in `stats_cache`, if given.
+    """
+    raw_dir = Path(raw_dir or settings.RAW_LISTING_DIR)
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    result = IngestResult()
+
+    tasks = _find_changed_files(db, raw_dir, result)
+    if not tasks:
+        return result
+
+    batch: List[_ParseOutcome] = []
+    with ProcessPoolExecutor(
+        max_workers=workers or settings.INGEST_WORKERS
+    ) as pool:
+        for outcome in pool.map(
+            _parse_raw_listing, tasks, chunksize=chunksize
+        ):
+            if outcome.unchanged:
+                result.unchanged += 1
+            elif outcome.error is not None:
+                result.failed += 1
+                log.error(f"Could not parse {outcome.path}: {outcome.error}")
+            else:
+                result.ingested += 1
+            batch.append(outcome)
+
+            if len(batch) >= batch_size:
+                _load_batch(db, batch, stats_cache)
+                batch = []
+
+    if batch:
+        _load_batch(db, batch, stats_cache)
+    return result
@@ -0,0 +1,293 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from data_vortex.utils.config import settings
+from requests.structures import CaseInsensitiveDict
+
+# Headers describing the transfer rather than the content, the cached body
+# is stored decoded so these would be wrong on the way back out.
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+    expires_at: float = 0.0
+
+    @classmethod
+    def from_response(
+        cls, response: requests.Response, ttl_seconds: float
+    ) -> "CacheEntry":
+        now = time.time()
+        headers = {
+            k: v
+            for k, v in response.headers.items()
+            if k.lower() not in _HOP_HEADERS
+        }
+        return cls(
+            url=str(response.url),
+            status_code=response.status_code,
+            body=response.content,
+            headers=headers,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            stored_at=now,
+            expires_at=now + ttl_seconds,
+        )
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status_code
+        response._content = self.body
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response.encoding = requests.utils.get_encoding_from_headers(
+            response.headers
+        )
+        return response
+
+
+@dataclass
+class CacheStats:
+    entries: int
+    expired: int
+    total_bytes: int
+    max_bytes: int
+
+
+class ResponseCache(ABC):
+    """Interface of the HTTP response cache backends."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry) -> None:
+        ...
+
+    @abstractmethod
+    def refresh(self, key: str, ttl_seconds: float) -> None:
+        """Extend the expiry of an entry that was successfully revalidated."""
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        ...
+
+    @abstractmethod
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Drop expired entries and evict down to `max_bytes`."""
+
+    @abstractmethod
+    def clear(self) -> int:
+        ...
+
+
+class NullResponseCache(ResponseCache):
+    def get(self, key: str) -> Optional[CacheEntry]:  # noqa: ARG002
+        return None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        pass
+
+    def refresh(self, key: str, ttl_seconds: float) -> None:
+        pass
+
+    def stats(self) -> CacheStats:
+        return CacheStats(entries=0, expired=0, total_bytes=0, max_bytes=0)
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:  # noqa: ARG002
+        return 0
+
+    def clear(self) -> int:
+        return 0
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Response cache in a single SQLite file. Bodies are stored zlib
+    compressed and the least recently used entries are evicted once the
+    compressed size goes over `max_bytes`. Expired entries are kept until
+    pruned, so that they can still be revalidated with ETag/Last-Modified.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status_code, headers, body, etag, last_modified, "
+                "stored_at, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        url, status, headers, body, etag, modified, stored, expires = row
+        return CacheEntry(
+            url=url,
+            status_code=status,
+            body=zlib.decompress(body),
+            headers=json.loads(headers),
+            etag=etag,
+            last_modified=modified,
+            stored_at=stored,
+            expires_at=expires,
+        )
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        body = zlib.compress(entry.body)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    entry.url,
+                    entry.status_code,
+                    json.dumps(entry.headers),
+                    body,
+                    len(body),
+                    entry.etag,
+                    entry.last_modified,
+                    entry.stored_at,
+                    entry.expires_at,
+                    time.time(),
+                ),
+            )
+            self._evict(self.max_bytes)
+
+    def refresh(self, key: str, ttl_seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ? "
+                "WHERE key = ?",
+                (now + ttl_seconds, now, key),
+            )
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            entries, total_bytes, expired = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), "
+                "COALESCE(SUM(expires_at <= ?), 0) FROM responses",
+                (time.time(),),
+            ).fetchone()
+        return CacheStats(
+            entries=entries,
+            expired=expired,
+            total_bytes=total_bytes,
+            max_bytes=self.max_bytes,
+        )
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+            removed += self._evict(
+                self.max_bytes if max_bytes is None else max_bytes
+            )
+        return removed
+
+    def clear(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses").rowcount
+
+    def _evict(self, max_bytes: int) -> int:
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= max_bytes:
+            return 0
+
+        to_delete = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            if total <= max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany(
+            "DELETE FROM responses WHERE key = ?", to_delete
+        )
+        return len(to_delete)
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the response cache backend selected in the settings."""
+    global _response_cache
+    if _response_cache is None:
+        if settings.RESPONSE_CACHE_BACKEND == "sqlite":
+            _response_cache = SQLiteResponseCache(
+                settings.RESPONSE_CACHE_PATH,
+                settings.RESPONSE_CACHE_MAX_BYTES,
+            )
+        elif settings.RESPONSE_CACHE_BACKEND == "none":
+            _response_cache = NullResponseCache()
+        else:
+            raise ValueError(
+                f"Unknown response cache backend: {settings.RESPONSE_CACHE_BACKEND}"
+            )
+    return _response_cache
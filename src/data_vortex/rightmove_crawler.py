@@ -0,0 +1,277 @@
+import asyncio
+import copy
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from data_vortex.crawl_checkpoints import CheckpointStore, NullCheckpointStore
+from data_vortex.crawl_watermarks import Watermark
+from data_vortex.listing_store import ListingSink, ListingStore
+from data_vortex.parse_pool import ParsePool
+from data_vortex.rightmove_models import GenericListing, RightmoveRentParams
+from data_vortex.rightmove_processing import (
+    check_response,
+    parse_search_response,
+)
+from data_vortex.rightmove_query import (
+    RIGHTMOVE_BASE_RENT_ID,
+    RIGHTMOVE_HEADER,
+    RIGHTMOVE_PAGE_SIZE,
+    RIGHTMOVE_RENT_SEARCH_URL,
+)
+from data_vortex.seen_index import SeenIdIndex, open_raw_listing_index
+from data_vortex.transport import async_http_get, build_async_client
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import PageLog, log
+from data_vortex.utils.rate_limiting import HostRateLimiter
+
+
+class AsyncCrawler:
+    """
+    Crawls many Rightmove searches (buckets) at once. All buckets share one
+    keep-alive connection pool, a per-host token bucket rate limit and a cap
+    on the number of requests in flight. Pages within a bucket are still fetched in
+    order, as the early stop depends on the previous page. With
+    `parse_workers` pages are parsed in a process pool, so parsing one
+    bucket's page does not hold up fetching for the others. With
+    `checkpoints` buckets resume from and save checkpoints like
+    `get_new_listings` does.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[int] = None,
+        continue_search: bool = False,
+        download_raw_listings: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        store: Optional[ListingSink] = None,
+        raw_index: Optional[SeenIdIndex] = None,
+        parse_workers: Optional[int] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+    ) -> None:
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+        self.rate_limit = rate_limit or settings.CRAWL_RATE_LIMIT
+        self.rate_burst = rate_burst or settings.CRAWL_RATE_BURST
+        self.continue_search = continue_search
+        self.download_raw_listings = download_raw_listings
+        self.transport = transport
+        self.store = store
+        self.raw_index = raw_index
+        self.parse_workers = (
+            settings.PARSE_WORKERS if parse_workers is None else parse_workers
+        )
+        self.checkpoints = checkpoints or NullCheckpointStore()
+
+    async def crawl(
+        self,
+        params_list: List[RightmoveRentParams],
+        watermarks: Optional[List[Watermark]] = None,
+    ) -> int:
+        """
+        Crawl all buckets and return the total number of new listings. The
+        listing store and raw listing index are shared by all buckets and
+        flushed at the end. `watermarks`, one per bucket, stop each bucket
+        at the first page older than its mark.
+        """
+        if self.store is None:
+            self.store = ListingStore()
+        if self.download_raw_listings and self.raw_index is None:
+            self.raw_index = open_raw_listing_index()
+        # Created here so that they are bound to the running event loop.
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._limiter = HostRateLimiter(self.rate_limit, self.rate_burst)
+
+        async with AsyncExitStack() as stack:
+            self._parse_pool = (
+                stack.enter_context(ParsePool(workers=self.parse_workers))
+                if self.parse_workers > 0
+                else None
+            )
+            client = await stack.enter_async_context(
+                build_async_client(
+                    max_connections=self.concurrency,
+                    headers=RIGHTMOVE_HEADER,
+                    transport=self.transport,
+                )
+            )
+            try:
+                results = await asyncio.gather(
+                    *(
+                        self._crawl_bucket(client, params, watermark)
+                        for params, watermark in zip(
+                            params_list,
+                            watermarks or [None] * len(params_list),
+                        )
+                    )
+                )
+            finally:
+                self.store.flush()
+                if self.raw_index is not None:
+                    self.raw_index.flush()
+        return sum(results)
+
+    async def _get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        async with self._semaphore:
+            await self._limiter.acquire(url)
+            return await async_http_get(client, url, params=params)
+
+    async def _crawl_bucket(
+        self,
+        client: httpx.AsyncClient,
+        baseline_params: RightmoveRentParams,
+        watermark: Optional[Watermark] = None,
+    ) -> int:
+        checkpoint = self.checkpoints.get(baseline_params)
+        index = checkpoint.next_index(RIGHTMOVE_PAGE_SIZE)
+        page_log = PageLog(checkpoint.search_key)
+
+        while True:
+            params = copy.deepcopy(baseline_params)
+            params.index = index
+            query = {
+                k: v for k, v in params.model_dump().items() if v is not None
+            }
+            response = await self._get(
+                client, RIGHTMOVE_RENT_SEARCH_URL, params=query
+            )
+
+            if response.status_code != 200:
+                log.error(
+                    "Received non-200 response: %s", response.status_code
+                )
+                if watermark is not None:
+                    watermark.failed = True
+                # The checkpoint is kept for the next run to resume from
+                page_log.close("Stopped at a failed request")
+                return page_log.new_listings
+
+            listings = await self._parse(response)
+
+            if not listings:
+                page_log.close("No more listings retrieved, stopped")
+                break
+
+            num_new_properties = await self.store.add_async(listings)
+
+            downloads = 0
+            if self.download_raw_listings:
+                downloads = await self._download_listings(client, listings)
+
+            page_log.page(index, len(listings), num_new_properties, downloads)
+            checkpoint.record(index, len(listings), num_new_properties)
+            await self.checkpoints.commit_async(checkpoint, self.store)
+
+            # A resumed search goes on past the pages it may have stored
+            if (
+                num_new_properties == 0
+                and not self.continue_search
+                and not checkpoint.may_be_stored(index, RIGHTMOVE_PAGE_SIZE)
+            ):
+                page_log.close("All listings are already stored, stopped")
+                break
+
+            if watermark is not None and watermark.reached(listings):
+                page_log.close(
+                    "Reached listings seen by the last run, stopped"
+                )
+                break
+
+            index += RIGHTMOVE_PAGE_SIZE
+
+        self.checkpoints.clear(checkpoint)
+        return page_log.new_listings
+
+    async def _parse(self, response: httpx.Response) -> List[GenericListing]:
+        if self._parse_pool is None:
+            return parse_search_response(response)
+        check_response(response)
+        return await self._parse_pool.parse(response.content)
+
+    async def _download_listings(
+        self, client: httpx.AsyncClient, listings: List[GenericListing]
+    ) -> int:
+        """Download the raw listings, return how many were new."""
+        # Every download runs to its end before a failure is raised, so
+        # that none is left marked as seen without its file
+        results = await asyncio.gather(
+            *(
+                self._download_listing(client, listing.property_id)
+                for listing in listings
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return sum(results)
+
+    async def _download_listing(
+        self, client: httpx.AsyncClient, listing_id: str
+    ) -> bool:
+        filename = (
+            Path(settings.RAW_LISTING_DIR) / f"raw_property_{listing_id}.html"
+        )
+        # Marked as seen before the request, so that buckets returning the
+        # same listing do not download it twice
+        if not self.raw_index.add(listing_id):
+            log.debug(
+                "Listing with ID %s already exists. Skipping download.",
+                listing_id,
+            )
+            return False
+
+        try:
+            response = await self._get(
+                client, f"{RIGHTMOVE_BASE_RENT_ID}/{listing_id}"
+            )
+            if response.status_code != 200:
+                log.error(
+                    "Failed to download listing with ID %s. "
+                    "Received status code: %s",
+                    listing_id,
+                    response.status_code,
+                )
+                self.raw_index.discard(listing_id)
+                return False
+            filename.write_bytes(response.content)
+        except BaseException:
+            # Not downloaded after all, so a later crawl tries again
+            self.raw_index.discard(listing_id)
+            raise
+        log.debug("Listing with ID %s downloaded to %s", listing_id, filename)
+        return True
+
+
+def crawl_new_listings(
+    params_list: List[RightmoveRentParams],
+    concurrency: Optional[int] = None,
+    rate_limit: Optional[float] = None,
+    continue_search: bool = False,
+    download_raw_listings: bool = False,
+    store: Optional[ListingSink] = None,
+    watermarks: Optional[List[Watermark]] = None,
+    parse_workers: Optional[int] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+) -> int:
+    """
+    Concurrent counterpart of `get_new_listings` that crawls every bucket in
+    `params_list` and saves new listings to the listing store.
+    """
+    crawler = AsyncCrawler(
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        continue_search=continue_search,
+        download_raw_listings=download_raw_listings,
+        store=store,
+        parse_workers=parse_workers,
+        checkpoints=checkpoints,
+    )
+    return asyncio.run(crawler.crawl(params_list, watermarks=watermarks))
@@ -1,13 +1,18 @@
 import datetime
+import hashlib
+import json
+import re
 from enum import Enum
+from functools import lru_cache
 from types import MappingProxyType
-from typing import Any, Mapping, Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Type
 
 from pydantic import (
     BaseModel,
     ConfigDict,
     Field,
     HttpUrl,
+    TypeAdapter,
     field_validator,
     model_validator,
 )
@@ -32,6 +37,42 @@ class Price(BaseModel):
     per: Optional[PriceUnit]
 
 
+_CURRENCY_BY_SYMBOL = {currency.value: currency for currency in Currency}
+_CURRENCY_PATTERN = re.compile(
+    "|".join(re.escape(symbol) for symbol in _CURRENCY_BY_SYMBOL)
+)
+_ADDED_DATE_PREFIX = re.compile(
+    r"(?:Added|Reduced) (?:on (?P<date>.*)|(?P<relative>today|yesterday))",
+    re.DOTALL,
+)
+# The formats accepted for added dates: %Y-%m-%d, %Y/%m/%d, %d-%m-%Y and
+# %d/%m/%Y
+_YEAR_FIRST_DATE = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})")
+_DAY_FIRST_DATE = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})")
+
+
+def _parse_date(date_str: str) -> datetime.date:
+    match = _YEAR_FIRST_DATE.fullmatch(date_str)
+    if match:
+        year, _, month, day = match.groups()
+    else:
+        match = _DAY_FIRST_DATE.fullmatch(date_str)
+        if not match:
+            raise ValueError("Invalid date format")
+        day, _, month, year = match.groups()
+    try:
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError as e:
+        raise ValueError("Invalid date format") from e
+
+
+def postcode_district(postcode: Optional[str]) -> Optional[str]:
+    """The outward code of a postcode, e.g. "N1" for "N1 1AA"."""
+    if not postcode or not postcode.strip():
+        return None
+    return postcode.split()[0].upper()
+
+
 # noinspection PyNestedDecorators
 class GenericListing(BaseModel):
     model_config = ConfigDict(extra="forbid", from_attributes=True)
@@ -45,41 +86,86 @@ class GenericListing(BaseModel):
     created_date: datetime.datetime = Field(
         default_factory=datetime.datetime.now
     )
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    property_type: Optional[str] = None
     _default_currency: Optional[Currency] = None
     _default_price_unit: Optional[PriceUnit] = None
 
     def to_orm_dict(self):
         return {
             "property_id": self.property_id,
-            "image_url": str(self.image_url),
+            "image_url": str(self.image_url) if self.image_url else None,
             "description": self.description,
             "price_amount": self.price.price,
-            "price_per": self.price.per.value,
-            "price_currency": self.price.currency.name,
+            "price_per": self.price.per.value if self.price.per else None,
+            "price_currency": (
+                self.price.currency.name if self.price.currency else None
+            ),
             "added_date": self.added_date,
             "address": self.address,
             "postcode": self.postcode,
             "created_date": self.created_date,
+            "bedrooms": self.bedrooms,
+            "bathrooms": self.bathrooms,
+            "property_type": self.property_type,
         }
 
     @classmethod
     def from_orm(cls, obj: Any):
-        obj_dict = obj.__dict__
-        return cls(
-            property_id=obj_dict["property_id"],
-            image_url=obj_dict["image_url"],
-            description=obj_dict["description"],
-            price=Price(
-                price=obj_dict["price_amount"],
-                currency=Currency[obj_dict["price_currency"]],
-                per=PriceUnit[obj_dict["price_per"]],
-            ),
-            added_date=obj_dict["added_date"],
-            address=obj_dict["address"],
-            postcode=obj_dict["postcode"],
-            created_date=obj_dict["created_date"],
+        return cls.from_orm_dict(obj.__dict__)
+
+    @classmethod
+    def from_orm_dict(cls, obj_dict: Mapping[str, Any]):
+        """Inverse of `to_orm_dict`, for flat rows from any storage."""
+        return cls(**cls._fields_from_orm_dict(obj_dict))
+
+    @classmethod
+    def from_orm_dicts(
+        cls, obj_dicts: Iterable[Mapping[str, Any]]
+    ) -> List["GenericListing"]:
+        """
+        `from_orm_dict` for many rows, validated in a single call, which is
+        faster per row than validating them one by one.
+        """
+        return cls.validate_many(
+            [cls._fields_from_orm_dict(obj_dict) for obj_dict in obj_dicts]
         )
 
+    @staticmethod
+    def _fields_from_orm_dict(obj_dict: Mapping[str, Any]) -> Dict[str, Any]:
+        return {
+            "property_id": obj_dict["property_id"],
+            "image_url": obj_dict["image_url"],
+            "description": obj_dict["description"],
+            "price": {
+                "price": obj_dict["price_amount"],
+                "currency": Currency[obj_dict["price_currency"]]
+                if obj_dict["price_currency"]
+                else None,
+                "per": PriceUnit[obj_dict["price_per"]]
+                if obj_dict["price_per"]
+                else None,
+            },
+            "added_date": obj_dict["added_date"],
+            "address": obj_dict["address"],
+            "postcode": obj_dict["postcode"],
+            "created_date": obj_dict["created_date"],
+            "bedrooms": obj_dict.get("bedrooms"),
+            "bathrooms": obj_dict.get("bathrooms"),
+            "property_type": obj_dict.get("property_type"),
+        }
+
+    @classmethod
+    def validate_many(
+        cls, items: List[Mapping[str, Any]]
+    ) -> List["GenericListing"]:
+        """
+        Validate many listings in a single call, raising a ValidationError
+        if any of them is invalid.
+        """
+        return _list_adapter(cls).validate_python(items)
+
     @field_validator("property_id")
     @classmethod
     def property_id_is_not_zero(cls, v: str) -> str:
@@ -97,25 +183,15 @@ class GenericListing(BaseModel):
             return v.date()
         elif not isinstance(v, str):
             raise ValueError("Invalid date format")
-        elif v.startswith("Added on "):
-            date_str = v.replace("Added on ", "")
-        elif v.startswith("Reduced on "):
-            date_str = v.replace("Reduced on ", "")
-        elif v.startswith("Added today") or v.startswith("Reduced today"):
+
+        match = _ADDED_DATE_PREFIX.match(v)
+        if match is None:
+            return _parse_date(v)
+        elif match.group("relative") == "today":
             return datetime.date.today()
-        elif v.startswith("Added yesterday") or v.startswith(
-            "Reduced yesterday"
-        ):
+        elif match.group("relative") == "yesterday":
             return datetime.date.today() - datetime.timedelta(days=1)
-        else:
-            date_str = v
-
-        for date_format in ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"]:
-            try:
-                return datetime.datetime.strptime(date_str, date_format).date()
-            except ValueError:
-                pass
-        raise ValueError("Invalid date format")
+        return _parse_date(match.group("date"))
 
     @field_validator("price", mode="before")
     @classmethod
@@ -129,11 +205,10 @@ class GenericListing(BaseModel):
             return Price(**v)
 
         # Check for currency and remove it from the string
-        for cur in Currency:
-            if cur.value in v:
-                currency = cur
-                v = v.replace(cur.value, "")
-                break
+        match = _CURRENCY_PATTERN.search(v)
+        if match:
+            currency = _CURRENCY_BY_SYMBOL[match.group(0)]
+            v = v.replace(match.group(0), "")
 
         # Check for pricing frequency
         if "pcm" in v:
@@ -150,7 +225,6 @@ class GenericListing(BaseModel):
             raise ValueError(
                 f"Listing must have a price! Raw price found: {v}"
             ) from e
-        # Return a Price instance
         return Price(price=amount, currency=currency, per=per)
 
     @model_validator(mode="after")
@@ -164,6 +238,11 @@ class GenericListing(BaseModel):
         return self
 
 
+@lru_cache
+def _list_adapter(model: Type[GenericListing]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
 class RightmoveRentalListing(GenericListing):
     _default_currency: Currency = Currency.GBP
     _default_price_unit: PriceUnit = PriceUnit.PER_MONTH
@@ -187,6 +266,7 @@ class RightmoveRentParams(BaseModel):
     displayPropertyType: str = ""  # noqa: N815
     maxDaysSinceAdded: str = ""  # noqa: N815
     sortByPriceDescending: str = ""  # noqa: N815
+    sortType: str = ""  # noqa: N815
     _includeLetAgreed: str = "on"  # noqa: N815
     primaryDisplayPropertyType: str = ""  # noqa: N815
     secondaryDisplayPropertyType: str = ""  # noqa: N815
@@ -241,6 +321,28 @@ class RequestData(BaseModel):
             )
         )
 
+    def cache_key(self) -> str:
+        """
+        Key with the same semantics as `__hash__`, but stable between
+        processes so that it can be used by persistent caches.
+        """
+        payload = json.dumps(
+            [
+                self.url,
+                sorted(self.params.items()) if self.params else None,
+                sorted(self.headers.items()),
+            ],
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def with_headers(self, headers: Mapping[str, str]) -> "RequestData":
+        return RequestData(
+            url=self.url,
+            params=dict(self.params) if self.params else None,
+            headers={**self.headers, **headers},
+        )
+
     def __eq__(self, other):
         if not isinstance(other, RequestData):
             return NotImplemented
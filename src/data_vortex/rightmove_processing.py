@@ -1,114 +1,467 @@
+import datetime
+import json
 import re
-from typing import List
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Type,
+    Union,
+)
 
 from bs4 import BeautifulSoup
+from data_vortex.metrics import (
+    LISTINGS_PARSED,
+    PARSE_SECONDS,
+    VALIDATION_FAILURES,
+)
 from data_vortex.rightmove_models import (
+    Currency,
     GenericListing,
+    Price,
+    PriceUnit,
     RightmoveRentalListing,
 )
+from data_vortex.utils.config import settings
 from data_vortex.utils.logging import log
 from pydantic import HttpUrl, ValidationError
 from requests import Response
 
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # pragma: no cover
+    etree = None
+    lxml_html = None
 
-def process_response(response: Response) -> BeautifulSoup:
+
+def check_response(response: Response) -> None:
     if response.status_code != 200:
         raise ValueError(
             f"Invalid response status code: {response.status_code} on response: {response.url}"
         )
 
+
+def process_response(response: Response) -> BeautifulSoup:
+    check_response(response)
     return BeautifulSoup(response.content, "html.parser")
 
 
+POSTCODE_PATTERN = re.compile(r"[A-Z]{1,2}[0-9R][0-9A-Z]?(?: [0-9][A-Z]{2})?")
+
+
+def _first_valid_url(candidates: Iterable[str]) -> Optional[HttpUrl]:
+    for candidate in candidates:
+        try:
+            # Attempt to create an HttpUrl instance to validate the URL
+            return HttpUrl(candidate)
+        except ValidationError:
+            # If the URL is not valid, try the next one
+            pass
+    return None
+
+
+ListingFields = Dict[str, Any]
+
+
+def validate_listings(items: List[ListingFields]) -> List[GenericListing]:
+    """
+    Validate the listings of a page in one call. If any of them is invalid,
+    the page is validated again one listing at a time to skip just those.
+    """
+    try:
+        return GenericListing.validate_many(items)
+    except ValidationError:
+        pass
+
+    listings = []
+    for item in items:
+        try:
+            listings.append(GenericListing.model_validate(item))
+        except ValidationError as e:
+            log.error(f"Error processing listing: {e}")
+            for error in e.errors():
+                field = error["loc"][0] if error["loc"] else "__root__"
+                VALIDATION_FAILURES.labels(field).inc()
+    return listings
+
+
+def _build_listing(
+    property_id: Optional[str],
+    image_urls: Iterable[str],
+    description: str,
+    price: str,
+    added_date: str,
+    address: str,
+) -> Optional[ListingFields]:
+    """Collect the fields scraped from one search result card."""
+    if property_id == "0" or property_id is None:
+        log.warning("Found empty property!")
+        return None
+
+    match = POSTCODE_PATTERN.search(address)
+    postcode = match.group(0) if match else None
+    return {
+        "property_id": property_id,
+        "image_url": _first_valid_url(image_urls),
+        "description": description,
+        "price": price,
+        "added_date": added_date,
+        "address": address,
+        "postcode": postcode,
+    }
+
+
+def _text(element) -> str:
+    return element.text.strip() if element else ""
+
+
 def get_listings(soup: BeautifulSoup) -> List[GenericListing]:
     listings = soup.find_all("div", class_="l-searchResult")
     listings_result = []
 
     for listing in listings:
-        property_id = listing.get("id", None).split("-")[-1]
-
-        if property_id == "0" or property_id is None:
-            log.warn("Found empty property!")
-            continue
-
-        image_urls = []
-        for img in listing.find_all("img"):
-            if "src" in img.attrs:
-                try:
-                    # Attempt to create an HttpUrl instance to validate the URL
-                    validated_url = HttpUrl(img["src"])
-                    image_urls.append(validated_url)
-                except ValidationError:
-                    # If the URL is not valid, it will not be added to the list
-                    pass
-        if len(image_urls) > 1:
-            log.warn(f"Found multiple images for property {property_id}")
-        image_url = image_urls[0] if image_urls else None
-
-        # Extract the description
-        description_elem = listing.find("span", {"itemprop": "description"})
-        description = description_elem.text.strip() if description_elem else ""
-
-        # Extract the price
-        price_elem = listing.find("span", class_="propertyCard-priceValue")
-        price = price_elem.text.strip() if price_elem else ""
-
-        # Extract the added date
-        added_date_elem = listing.find(
-            "span", class_="propertyCard-branchSummary-addedOrReduced"
-        )
-        added_date = added_date_elem.text.strip() if added_date_elem else ""
-
         address_span = listing.find(
             "address", class_="propertyCard-address"
         ).find("span")
 
-        address = address_span.text.strip()
-        pattern = r"[A-Z]{1,2}[0-9R][0-9A-Z]?(?: [0-9][A-Z]{2})?"
-        match = re.search(pattern, address)
+        listing_info = _build_listing(
+            property_id=listing.get("id", None).split("-")[-1],
+            image_urls=(
+                img["src"]
+                for img in listing.find_all("img")
+                if "src" in img.attrs
+            ),
+            description=_text(
+                listing.find("span", {"itemprop": "description"})
+            ),
+            price=_text(
+                listing.find("span", class_="propertyCard-priceValue")
+            ),
+            added_date=_text(
+                listing.find(
+                    "span", class_="propertyCard-branchSummary-addedOrReduced"
+                )
+            ),
+            address=address_span.text.strip(),
+        )
+        if listing_info is not None:
+            listings_result.append(listing_info)
 
-        if match:
-            postcode = match.group(0)
-        else:
-            postcode = None
-        try:
-            listing_info = GenericListing(
-                property_id=property_id,
-                image_url=image_url,
-                description=description,
-                price=price,
-                added_date=added_date,
-                address=address,
-                postcode=postcode,
+    return validate_listings(listings_result)
+
+
+class ListingParser(ABC):
+    """Turns the body of a search results page into listings."""
+
+    backend: ClassVar[str]
+
+    def parse_listings(self, content: bytes) -> List[GenericListing]:
+        with PARSE_SECONDS.labels(self.backend).time():
+            listings = self._parse_listings(content)
+        LISTINGS_PARSED.inc(len(listings))
+        return listings
+
+    @abstractmethod
+    def _parse_listings(self, content: bytes) -> List[GenericListing]:
+        ...
+
+
+class BeautifulSoupParser(ListingParser):
+    backend = "bs4"
+
+    def _parse_listings(self, content: bytes) -> List[GenericListing]:
+        return get_listings(BeautifulSoup(content, "html.parser"))
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser(ListingParser):
+    """
+    Fast path using lxml with XPath expressions compiled once. Returns the
+    same listings as `BeautifulSoupParser`.
+    """
+
+    backend = "lxml"
+
+    if etree is not None:
+        _cards = etree.XPath(f"//div[{_has_class('l-searchResult')}]")
+        _image_urls = etree.XPath(".//img/@src")
+        _description = etree.XPath(".//span[@itemprop='description']")
+        _price = etree.XPath(
+            f".//span[{_has_class('propertyCard-priceValue')}]"
+        )
+        _added_date = etree.XPath(
+            ".//span"
+            f"[{_has_class('propertyCard-branchSummary-addedOrReduced')}]"
+        )
+        _address = etree.XPath(
+            f".//address[{_has_class('propertyCard-address')}]//span"
+        )
+
+    @staticmethod
+    def _first_text(elements: list) -> str:
+        return elements[0].text_content().strip() if elements else ""
+
+    def _parse_listings(self, content: bytes) -> List[GenericListing]:
+        tree = lxml_html.fromstring(content)
+        listings_result = []
+
+        for card in self._cards(tree):
+            listing_info = _build_listing(
+                property_id=card.get("id").split("-")[-1],
+                image_urls=self._image_urls(card),
+                description=self._first_text(self._description(card)),
+                price=self._first_text(self._price(card)),
+                added_date=self._first_text(self._added_date(card)),
+                address=self._first_text(self._address(card)),
             )
-            listings_result.append(listing_info)
-        except ValidationError as e:
+            if listing_info is not None:
+                listings_result.append(listing_info)
+
+        return validate_listings(listings_result)
+
+
+JSON_MODEL_MARKER = b"window.jsonModel = "
+PAGE_MODEL_MARKER = b"window.PAGE_MODEL = "
+_json_decoder = json.JSONDecoder()
+
+PRICE_FREQUENCIES = {
+    "weekly": PriceUnit.PER_WEEK,
+    "monthly": PriceUnit.PER_MONTH,
+    "yearly": PriceUnit.PER_YEAR,
+}
+
+
+def extract_embedded_json(
+    content: bytes, marker: bytes = JSON_MODEL_MARKER
+) -> Optional[dict]:
+    """
+    Decode the JSON object assigned right after `marker` in a page, or return
+    None if the page does not have one. Decoding starts at the marker and
+    stops at the end of the object, so the rest of the page is never scanned
+    or copied.
+    """
+    start = content.find(marker)
+    if start == -1:
+        return None
+    start += len(marker)
+    end = content.find(b"</script>", start)
+    blob = content[start : end if end != -1 else len(content)]
+    try:
+        json_model, _ = _json_decoder.raw_decode(blob.decode("utf-8"))
+    except ValueError as e:
+        log.error(f"Could not decode embedded JSON model: {e}")
+        return None
+    return json_model
+
+
+def extract_json_model(content: bytes) -> Optional[dict]:
+    """Decode the `window.jsonModel` blob embedded in search result pages."""
+    return extract_embedded_json(content, JSON_MODEL_MARKER)
+
+
+def _price_from_json(price: dict) -> Price:
+    currency_code = price.get("currencyCode")
+    return Price(
+        price=price["amount"],
+        currency=Currency.__members__.get(currency_code),
+        per=PRICE_FREQUENCIES.get(price.get("frequency")),
+    )
+
+
+def _added_date_from_json(listing: dict) -> Union[datetime.date, str]:
+    update_date = (listing.get("listingUpdate") or {}).get("listingUpdateDate")
+    if update_date:
+        return datetime.date.fromisoformat(update_date[:10])
+    # Fall back to the human readable "Added on ..." text
+    return listing.get("addedOrReduced") or ""
+
+
+class JsonModelParser(ListingParser):
+    """
+    Maps the JSON model that search pages embed in a `<script>` tag straight
+    into listings, without any DOM lookups or price string parsing. Prices
+    are taken as listed (e.g. per week) rather than as the monthly display
+    price, and the added date is the exact date of the last listing update.
+    Falls back to the DOM parser when the page has no JSON model.
+    """
+
+    backend = "json"
+
+    def _parse_listings(self, content: bytes) -> List[GenericListing]:
+        json_model = extract_json_model(content)
+        if json_model is None or "properties" not in json_model:
+            log.warning("No JSON model found, falling back to DOM parsing.")
+            return get_parser("lxml")._parse_listings(content)
+
+        listings_result = []
+        for listing in json_model["properties"]:
+            listing_info = self._to_listing(listing)
+            if listing_info is not None:
+                listings_result.append(listing_info)
+        return validate_listings(listings_result)
+
+    @staticmethod
+    def _to_listing(listing: dict) -> Optional[ListingFields]:
+        property_id = str(listing.get("id", "0"))
+        if property_id == "0":
+            log.warning("Found empty property!")
+            return None
+
+        address = (listing.get("displayAddress") or "").strip()
+        match = POSTCODE_PATTERN.search(address)
+        images = listing.get("propertyImages") or {}
+        try:
+            return {
+                "property_id": property_id,
+                "image_url": _first_valid_url(
+                    filter(None, [images.get("mainImageSrc")])
+                ),
+                "description": (listing.get("summary") or "").strip(),
+                "price": _price_from_json(listing["price"]),
+                "added_date": _added_date_from_json(listing),
+                "address": address,
+                "postcode": match.group(0) if match else None,
+                "bedrooms": listing.get("bedrooms"),
+                "bathrooms": listing.get("bathrooms"),
+                "property_type": listing.get("propertySubType"),
+            }
+        except (KeyError, TypeError, ValueError) as e:
             log.error(f"Error processing listing: {e}")
-            continue
+            return None
 
-    return listings_result
 
+PARSER_BACKENDS: Dict[str, Type[ListingParser]] = {
+    "bs4": BeautifulSoupParser,
+    "lxml": LxmlParser,
+    "json": JsonModelParser,
+}
 
-def get_detailed_listing(soup: BeautifulSoup) -> RightmoveRentalListing:
-    # TODO(mateusz.wasilewski): this function parser individual listing soup into a detailed listing
-    # Find meta tag with property='og:url'
-    meta_tag = soup.find("meta", property="og:url")
 
-    # Extract URL from content attribute
-    property_url = meta_tag["content"]
+def get_parser(backend: Optional[str] = None) -> ListingParser:
+    """
+    Return the parser for `backend`, defaulting to the one in the settings.
+    Falls back to BeautifulSoup when lxml is not installed.
+    """
+    backend = backend or settings.PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    if backend == "lxml" and etree is None:
+        log.warning("lxml is not installed, falling back to BeautifulSoup.")
+        backend = "bs4"
+    return PARSER_BACKENDS[backend]()
+
+
+def parse_search_response(
+    response: Response, backend: Optional[str] = None
+) -> List[GenericListing]:
+    """Parse the listings on a search results page with the chosen backend."""
+    check_response(response)
+    return get_parser(backend).parse_listings(response.content)
+
+
+class SearchSummary(NamedTuple):
+    result_count: int
+    price_options: List[int]
+
+
+def parse_search_summary(content: bytes) -> Optional[SearchSummary]:
+    """
+    Read the total number of results of a search, and the prices its price
+    filter accepts, from the JSON model of any of its pages.
+    """
+    json_model = extract_json_model(content)
+    if json_model is None or "resultCount" not in json_model:
+        return None
+    return SearchSummary(
+        result_count=int(str(json_model["resultCount"]).replace(",", "")),
+        price_options=[
+            int(option["value"])
+            for option in json_model.get("priceOptions", [])
+            if option.get("value")
+        ],
+    )
+
+
+def _html_to_text(fragment: str) -> str:
+    return BeautifulSoup(fragment, "html.parser").get_text(" ", strip=True)
+
 
-    property_id_match = re.search(r"/properties/(\d+)", property_url)
+def _resolve_relative_date(
+    text: Optional[str], reference_date: datetime.date
+) -> Union[datetime.date, str]:
+    """
+    Resolve "Added today"/"Reduced yesterday" against the date the page was
+    downloaded rather than the date it is parsed on.
+    """
+    if not text:
+        return reference_date
+    if text.endswith("today"):
+        return reference_date
+    if text.endswith("yesterday"):
+        return reference_date - datetime.timedelta(days=1)
+    return text
 
-    if property_id_match:
-        property_id = property_id_match.group(1)
-    else:
-        raise ValueError("Property ID not found in the URL.")
+
+def listing_from_page_model(
+    page_model: dict, reference_date: Optional[datetime.date] = None
+) -> RightmoveRentalListing:
+    """Map the `window.PAGE_MODEL` of a listing page into a listing."""
+    property_data = page_model.get("propertyData")
+    if not property_data or not property_data.get("id"):
+        raise ValueError("Property data not found in the page model.")
+
+    reference_date = reference_date or datetime.date.today()
+    address = property_data.get("address") or {}
+    outcode, incode = address.get("outcode"), address.get("incode")
+    images = property_data.get("images") or []
+    listing_history = property_data.get("listingHistory") or {}
 
     return RightmoveRentalListing(
-        property_id=property_id,
-        description="Lorem iősifk",
-        price="5000",
-        added_date="2020-10-07",
-        address="Lorem impsum EC1Y 0RJ",
-        postcode="EC1Y 0RJ",
+        property_id=str(property_data["id"]),
+        image_url=_first_valid_url(
+            image["url"] for image in images if image.get("url")
+        ),
+        description=_html_to_text(
+            (property_data.get("text") or {}).get("description") or ""
+        ),
+        price=(property_data.get("prices") or {}).get("primaryPrice") or "",
+        added_date=_resolve_relative_date(
+            listing_history.get("listingUpdateReason"), reference_date
+        ),
+        address=address.get("displayAddress"),
+        postcode=f"{outcode} {incode}" if outcode and incode else outcode,
+        bedrooms=property_data.get("bedrooms"),
+        bathrooms=property_data.get("bathrooms"),
+        property_type=property_data.get("propertySubType"),
+    )
+
+
+def parse_detailed_listing(
+    content: bytes, reference_date: Optional[datetime.date] = None
+) -> RightmoveRentalListing:
+    """
+    Parse the raw HTML of a listing page. `reference_date` is the day the
+    page was downloaded, used to resolve relative dates like "Added today".
+    """
+    page_model = extract_embedded_json(content, PAGE_MODEL_MARKER)
+    if page_model is None:
+        raise ValueError("Page model not found in the listing page.")
+    return listing_from_page_model(page_model, reference_date)
+
+
+def get_detailed_listing(soup: BeautifulSoup) -> RightmoveRentalListing:
+    script = soup.find(
+        "script", string=lambda text: text and "window.PAGE_MODEL" in text
     )
+    if script is None:
+        raise ValueError("Page model not found in the listing page.")
+    return parse_detailed_listing(script.string.encode("utf-8"))
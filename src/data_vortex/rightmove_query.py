@@ -1,65 +1,79 @@
 import copy
-import json
 import time
-from functools import lru_cache, wraps
+from contextlib import ExitStack
+from functools import wraps
 from pathlib import Path
+from typing import Optional
 
 import requests
-from cachetools import TTLCache
+from data_vortex.crawl_checkpoints import CheckpointStore, NullCheckpointStore
+from data_vortex.crawl_watermarks import Watermark
+from data_vortex.listing_store import ListingSink, ListingStore
+from data_vortex.metrics import RESPONSE_CACHE_REQUESTS
+from data_vortex.response_cache import CacheEntry, get_response_cache
 from data_vortex.rightmove_models import RequestData, RightmoveRentParams
-from data_vortex.rightmove_processing import get_listings, process_response
+from data_vortex.rightmove_processing import parse_search_response
+from data_vortex.seen_index import SeenIdIndex, open_raw_listing_index
+from data_vortex.transport import http_get
 from data_vortex.utils.config import settings
-from data_vortex.utils.logging import log
+from data_vortex.utils.logging import PageLog, log
 
 RIGHTMOVE_RENT_SEARCH_URL = (
     "https://www.rightmove.co.uk/property-to-rent/find.html"
 )
 RIGHTMOVE_BASE_RENT_ID = "https://www.rightmove.co.uk/properties"
 
+# Number of listings Rightmove moves forward by for every page of results
+RIGHTMOVE_PAGE_SIZE = 24
+
 RIGHTMOVE_HEADER = {
     "User-Agent": "curl/7.64.1",  # Example User-Agent header from curl
 }
 
-# Define the cache with a maximum size of 100 items and items expire after 3600 seconds (1 hour)
-cache = TTLCache(maxsize=1000, ttl=3600)
-
 
 def cache_with_ttl(
     expiration_hours=1,
 ):  # Default expiration time set to 1 hour
-    def decorator(fn):
-        cached_fn = lru_cache(maxsize=None)(fn)
+    """
+    Serve responses from the persistent response cache when `use_cache=True`
+    is passed. Stale entries with an ETag or Last-Modified are revalidated
+    with a conditional request instead of being downloaded again.
+    """
+    ttl_seconds = expiration_hours * 3600
 
+    def decorator(fn):
         @wraps(fn)
-        def wrapper(*args, **kwargs):
-            use_cache = kwargs.pop("use_cache", False)
-
-            if (
-                settings.USE_CACHE_FOR_SEARCH and use_cache
-            ):  # Check if caching is enabled and requested
-                now = time.time()
-                ttl_seconds = (
-                    expiration_hours * 3600
-                )  # Convert hours to seconds
-
-                # Create a hashable key from args and kwargs
-                key = (args, tuple(sorted(kwargs.items())))
-
-                # Check if we have a cached result and if it is still valid
-                if key in cache and cache[key][1] > now:
-                    return cache[key][0]
-
-                # Call the function and cache the result along with the current time and TTL
-                result = cached_fn(*args, **kwargs)
-                cache[key] = (
-                    result,
-                    now + ttl_seconds,
-                )  # Cache result with the new expiry time
-
-                return result
+        def wrapper(
+            request_data: RequestData, use_cache: bool = False
+        ) -> requests.Response:
+            if not (settings.USE_CACHE_FOR_SEARCH and use_cache):
+                return fn(request_data)
+
+            response_cache = get_response_cache()
+            key = request_data.cache_key()
+            entry = response_cache.get(key)
+
+            if entry is not None and entry.is_fresh():
+                RESPONSE_CACHE_REQUESTS.labels("hit").inc()
+                return entry.to_response()
+
+            if entry is not None and entry.conditional_headers():
+                response = fn(
+                    request_data.with_headers(entry.conditional_headers())
+                )
+                if response.status_code == 304:
+                    RESPONSE_CACHE_REQUESTS.labels("revalidated").inc()
+                    response_cache.refresh(key, ttl_seconds)
+                    return entry.to_response()
             else:
-                # If caching is not used or not requested, call the function directly without caching
-                return fn(*args, **kwargs)
+                response = fn(request_data)
+            RESPONSE_CACHE_REQUESTS.labels("miss").inc()
+
+            if response.status_code == 200:
+                response_cache.set(
+                    key, CacheEntry.from_response(response, ttl_seconds)
+                )
+            return response
 
         return wrapper
 
@@ -68,65 +82,83 @@ def cache_with_ttl(
 
 def search_rental_properties(
     rightmove_params: RightmoveRentParams,
+    use_cache: bool = False,
 ) -> requests.Response:
     request_data = RequestData(
         url=RIGHTMOVE_RENT_SEARCH_URL,
         headers=RIGHTMOVE_HEADER,
         params=rightmove_params.dict(),
     )
-    return _search_rightmove(request_data)
+    return _search_rightmove(request_data, use_cache=use_cache)
 
 
 @cache_with_ttl(expiration_hours=1)
 def _search_rightmove(request_data: RequestData) -> requests.Response:
-    response = requests.get(
-        request_data.url, params=request_data.params, headers=RIGHTMOVE_HEADER
+    return http_get(
+        request_data.url,
+        params=request_data.params,
+        headers=request_data.headers,
     )
-    return response
 
 
 def get_listing_from_rightmove(
     listing_id: int,
+    use_cache: bool = False,
 ) -> requests.Response:
     request_data = RequestData(
         url=f"{RIGHTMOVE_BASE_RENT_ID}/{listing_id}",
         headers=RIGHTMOVE_HEADER,
     )
-    return _get_listing_from_rightmove(request_data)
+    return _get_listing_from_rightmove(request_data, use_cache=use_cache)
 
 
 @cache_with_ttl(expiration_hours=24)
 def _get_listing_from_rightmove(
     request_data: RequestData,
 ) -> requests.Response:
-    response = requests.get(
-        request_data.url, params=request_data.params, headers=RIGHTMOVE_HEADER
+    return http_get(
+        request_data.url,
+        params=request_data.params,
+        headers=request_data.headers,
     )
-    return response
 
 
-def download_listing(listing_id: str) -> bool:
+def download_listing(
+    listing_id: str, raw_index: Optional[SeenIdIndex] = None
+) -> bool:
+    """
+    Download the listing page to the raw listing directory. When a
+    `raw_index` is passed it is used instead of checking for the file.
+    """
     filename = (
         Path(settings.RAW_LISTING_DIR) / f"raw_property_{listing_id}.html"
     )
 
-    if filename.exists():
-        log.info(
-            f"Listing with ID {listing_id} already exists. Skipping download."
+    if raw_index is not None:
+        exists = listing_id in raw_index
+    else:
+        exists = filename.exists()
+    if exists:
+        log.debug(
+            "Listing with ID %s already exists. Skipping download.", listing_id
         )
         return False
 
     response = get_listing_from_rightmove(int(listing_id))
     if response.status_code != 200:
         log.error(
-            f"Failed to download listing with ID {listing_id}. "
-            f"Received status code: {response.status_code}"
+            "Failed to download listing with ID %s. "
+            "Received status code: %s",
+            listing_id,
+            response.status_code,
         )
         return False
 
     with filename.open("wb") as f:
         f.write(response.content)
-    log.info(f"Listing with ID {listing_id} downloaded to {filename}")
+    if raw_index is not None:
+        raw_index.add(listing_id)
+    log.debug("Listing with ID %s downloaded to %s", listing_id, filename)
     return True
 
 
@@ -135,62 +167,104 @@ def get_new_listings(
     continue_search: bool = False,
     download_raw_listings: bool = False,
     wait_time: float = 0,
+    use_cache: bool = False,
+    store: Optional[ListingSink] = None,
+    raw_index: Optional[SeenIdIndex] = None,
+    watermark: Optional[Watermark] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+) -> None:
+    """
+    Page through a search and save new listings to the listing store. Stops
+    at the first page without new listings unless `continue_search` is set,
+    and with a `watermark`, at the first page older than the mark.
+    The store and raw listing index are opened, and flushed before
+    returning, when they are not passed in. With `checkpoints` the search
+    continues after the last page of its checkpoint, and its progress is
+    checkpointed as it goes until it runs to its end.
+    """
+    with ExitStack() as stack:
+        if store is None:
+            store = stack.enter_context(ListingStore())
+        if download_raw_listings and raw_index is None:
+            raw_index = stack.enter_context(open_raw_listing_index())
+        _get_new_listings(
+            baseline_params,
+            store,
+            raw_index if download_raw_listings else None,
+            continue_search=continue_search,
+            wait_time=wait_time,
+            use_cache=use_cache,
+            watermark=watermark,
+            checkpoints=checkpoints,
+        )
+
+
+def _get_new_listings(
+    baseline_params: RightmoveRentParams,
+    store: ListingSink,
+    raw_index: Optional[SeenIdIndex],
+    continue_search: bool,
+    wait_time: float,
+    use_cache: bool,
+    watermark: Optional[Watermark],
+    checkpoints: Optional[CheckpointStore] = None,
 ) -> None:
-    dir_path = Path(
-        settings.DATA_DIR
-    )  # Ensure the path is a Path object for easier manipulation
-    index = 0  # Start index
+    checkpoints = checkpoints or NullCheckpointStore()
+    checkpoint = checkpoints.get(baseline_params)
+    index = checkpoint.next_index(RIGHTMOVE_PAGE_SIZE)  # Start index
+    page_log = PageLog(checkpoint.search_key)
 
     while True:
         params = copy.deepcopy(baseline_params)
         params.index = index
-        log.info(f"Starting new download with params: {params.dict()}")
-        log.info(f"Sending new query with index: {index}")
-        response = search_rental_properties(rightmove_params=params)
+        response = search_rental_properties(
+            rightmove_params=params, use_cache=use_cache
+        )
 
         # Check for non-200 response and handle it
         if response.status_code != 200:
-            log.error(f"Received non-200 response: {response.status_code}")
-            break  # or handle it differently based on your requirements
+            log.error("Received non-200 response: %s", response.status_code)
+            if watermark is not None:
+                watermark.failed = True
+            # The checkpoint is kept for the next run to resume from
+            page_log.close("Stopped at a failed request")
+            return
 
-        soup = process_response(response)
-        listings = get_listings(soup)
-        num_new_properties = 0  # Counter for new properties
+        listings = parse_search_response(response)
 
         if not listings:
-            log.info("No more listings retrieved, stopping...")
+            page_log.close("No more listings retrieved, stopped")
             break
 
-        all_files_exist = True
-        for listing in listings:
-            filename = dir_path / f"property_{listing.property_id}.json"
-
-            if not filename.exists():
-                all_files_exist = False
-                num_new_properties += 1
-                listing_json = listing.model_dump_json(
-                    indent=2
-                )  # Assuming this method returns the JSON representation
-                with filename.open("w") as f:
-                    json.dump(listing_json, f, indent=2)
-                log.info(f"New listing saved: {filename}")
-
-            if download_raw_listings:
-                log.info(
-                    f"Saving raw listing: {listing.property_id} to raw_data directory..."
-                )
-                if download_listing(listing.property_id):
+        num_new_properties = store.add(listings)
+
+        downloads = 0
+        if raw_index is not None:
+            for listing in listings:
+                if download_listing(listing.property_id, raw_index):
+                    downloads += 1
                     time.sleep(
                         wait_time
                     )  # Wait only if a new listing was downloaded
 
-        log.info(
-            f"Query outcome: {len(listings)} properties retrieved, {num_new_properties} new."
-        )
+        page_log.page(index, len(listings), num_new_properties, downloads)
+        checkpoint.record(index, len(listings), num_new_properties)
+        checkpoints.commit(checkpoint, store)
+
+        # A resumed search goes on past the pages it may have stored
+        if (
+            num_new_properties == 0
+            and not continue_search
+            and not checkpoint.may_be_stored(index, RIGHTMOVE_PAGE_SIZE)
+        ):
+            page_log.close("All listings are already stored, stopped")
+            break
 
-        if all_files_exist and not continue_search:
-            log.info("All listings already have files, stopping...")
+        if watermark is not None and watermark.reached(listings):
+            page_log.close("Reached listings seen by the last run, stopped")
             break
 
-        index += 24  # Increment index for the next batch of listings
+        index += RIGHTMOVE_PAGE_SIZE  # Move on to the next batch of listings
         time.sleep(wait_time)
+
+    checkpoints.clear(checkpoint)
@@ -0,0 +1,182 @@
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_processing import (
+    SearchSummary,
+    check_response,
+    parse_search_summary,
+)
+from data_vortex.rightmove_query import search_rental_properties
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+
+
+@dataclass
+class PriceBucket:
+    """Price range of a search, None meaning no lower or upper limit."""
+
+    min_price: Optional[int]
+    max_price: Optional[int]
+    result_count: Optional[int] = None
+
+    def contains(self, price: int) -> bool:
+        return (self.min_price is None or self.min_price < price) and (
+            self.max_price is None or price < self.max_price
+        )
+
+    def to_params(
+        self, baseline_params: RightmoveRentParams
+    ) -> RightmoveRentParams:
+        return baseline_params.model_copy(
+            update={
+                "minPrice": _price_param(self.min_price),
+                "maxPrice": _price_param(self.max_price),
+            }
+        )
+
+
+def _price_param(price: Optional[int]) -> str:
+    return "" if price is None else str(price)
+
+
+def _parse_price(price: str) -> Optional[int]:
+    return int(price) if price else None
+
+
+def probe_search(params: RightmoveRentParams) -> SearchSummary:
+    """
+    Fetch the first page of a search. It goes through the response cache, so
+    a crawl run with `use_cache` gets the page it starts on for free.
+    """
+    params = params.model_copy(update={"index": 0})
+    response = search_rental_properties(params, use_cache=True)
+    check_response(response)
+    summary = parse_search_summary(response.content)
+    if summary is None:
+        raise ValueError("Search page has no result count.")
+    return summary
+
+
+class SearchPlanner:
+    """
+    Splits a search into price buckets that each fit under the number of
+    results Rightmove paginates through, using the result counts of the
+    searches themselves. Buckets over the cap are split in two at a price
+    the site's price filter accepts, and neighbouring buckets are merged for
+    as long as they still fit. The resulting partition is saved, so the next
+    plan of the same search starts from it and usually takes one probe per
+    bucket, which is also the first page the crawl needs anyway.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[RightmoveRentParams], SearchSummary] = probe_search,
+        result_cap: Optional[int] = None,
+        map_path: Optional[Path] = None,
+    ) -> None:
+        self.probe = probe
+        self.result_cap = result_cap or settings.PLANNER_RESULT_CAP
+        self.map_path = Path(map_path or settings.PLANNER_MAP_PATH)
+        self.probes = 0
+
+    def plan(
+        self, baseline_params: RightmoveRentParams, refresh: bool = True
+    ) -> List[RightmoveRentParams]:
+        """
+        Return the searches that together cover `baseline_params`. Without
+        `refresh` a saved partition is used as is, without any probes.
+        """
+        key = self._map_key(baseline_params)
+        partition_map = self._load_map()
+        saved = [
+            PriceBucket(**bucket) for bucket in partition_map.get(key, [])
+        ]
+        if saved and not refresh:
+            return self._to_params(baseline_params, saved)
+        buckets = saved or [
+            PriceBucket(
+                _parse_price(baseline_params.minPrice),
+                _parse_price(baseline_params.maxPrice),
+            )
+        ]
+
+        planned: List[PriceBucket] = []
+        for bucket in buckets:
+            planned.extend(self._split(baseline_params, bucket))
+        planned = self._merge(planned)
+
+        partition_map[key] = [asdict(bucket) for bucket in planned]
+        self._save_map(partition_map)
+        return self._to_params(baseline_params, planned)
+
+    @staticmethod
+    def _to_params(
+        baseline_params: RightmoveRentParams, buckets: List[PriceBucket]
+    ) -> List[RightmoveRentParams]:
+        return [
+            bucket.to_params(baseline_params)
+            for bucket in buckets
+            if bucket.result_count
+        ]
+
+    def _split(
+        self, baseline_params: RightmoveRentParams, bucket: PriceBucket
+    ) -> List[PriceBucket]:
+        summary = self.probe(bucket.to_params(baseline_params))
+        self.probes += 1
+        bucket.result_count = summary.result_count
+        if bucket.result_count <= self.result_cap:
+            return [bucket]
+
+        prices = [p for p in summary.price_options if bucket.contains(p)]
+        if not prices:
+            log.warning(
+                f"Price range {bucket.min_price}-{bucket.max_price} has "
+                f"{bucket.result_count} results and cannot be split further, "
+                f"only the first {self.result_cap} will be crawled."
+            )
+            return [bucket]
+
+        # Both halves include listings priced exactly at the split, those few
+        # are fetched twice rather than missed
+        middle = prices[len(prices) // 2]
+        return self._split(
+            baseline_params, PriceBucket(bucket.min_price, middle)
+        ) + self._split(baseline_params, PriceBucket(middle, bucket.max_price))
+
+    def _merge(self, buckets: List[PriceBucket]) -> List[PriceBucket]:
+        merged: List[PriceBucket] = []
+        for bucket in buckets:
+            previous = merged[-1] if merged else None
+            if (
+                previous is not None
+                and previous.max_price == bucket.min_price
+                and previous.result_count + bucket.result_count
+                <= self.result_cap
+            ):
+                # The sum overcounts listings priced at the shared bound, so
+                # a merged bucket never ends up over the cap
+                previous.max_price = bucket.max_price
+                previous.result_count += bucket.result_count
+            else:
+                merged.append(bucket)
+        return merged
+
+    @staticmethod
+    def _map_key(baseline_params: RightmoveRentParams) -> str:
+        params = baseline_params.model_dump(exclude={"index"})
+        return json.dumps(params, sort_keys=True)
+
+    def _load_map(self) -> Dict[str, List[dict]]:
+        if not self.map_path.exists():
+            return {}
+        return json.loads(self.map_path.read_text())
+
+    def _save_map(self, partition_map: Dict[str, List[dict]]) -> None:
+        self.map_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.map_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(partition_map, indent=2))
+        tmp_path.replace(self.map_path)
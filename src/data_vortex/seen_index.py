@@ -0,0 +1,92 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+from data_vortex.utils.config import settings
+
+RAW_LISTING_PREFIX = "raw_property_"
+
+
+class SeenIdIndex:
+    """
+    Set of property ids persisted in a SQLite file. All ids are loaded into
+    memory when the index is opened, so membership checks never touch the
+    disk. Ids added during a run are written in a single transaction on
+    `flush`, so a crashed run leaves the index as it was at the last flush.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_ids "
+            "(property_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._ids: Set[str] = {
+            property_id
+            for (property_id,) in self._conn.execute(
+                "SELECT property_id FROM seen_ids"
+            )
+        }
+        self._pending: Set[str] = set()
+
+    def __enter__(self) -> "SeenIdIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def __contains__(self, property_id: str) -> bool:
+        return property_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, property_id: str) -> bool:
+        """Mark the id as seen, return False if it already was."""
+        if property_id in self._ids:
+            return False
+        self._ids.add(property_id)
+        self._pending.add(property_id)
+        return True
+
+    def update(self, property_ids: Iterable[str]) -> int:
+        return sum(self.add(property_id) for property_id in property_ids)
+
+    def discard(self, property_id: str) -> None:
+        """Forget an id added in this run, e.g. after a failed download."""
+        if property_id in self._pending:
+            self._pending.discard(property_id)
+            self._ids.discard(property_id)
+
+    def flush(self) -> int:
+        """Persist the ids added since the last flush in one transaction."""
+        if not self._pending:
+            return 0
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_ids VALUES (?, ?)",
+                ((property_id, now) for property_id in self._pending),
+            )
+        flushed = len(self._pending)
+        self._pending = set()
+        return flushed
+
+
+def open_raw_listing_index(raw_dir: Optional[Path] = None) -> SeenIdIndex:
+    """
+    Open the index of downloaded raw listing pages. A new index is seeded
+    from a single listing of the directory instead of a stat per listing.
+    """
+    raw_dir = Path(raw_dir or settings.RAW_LISTING_DIR)
+    index = SeenIdIndex(raw_dir / "seen_ids.db")
+    if not len(index):
+        index.update(
+            path.stem[len(RAW_LISTING_PREFIX) :]
+            for path in raw_dir.glob(f"{RAW_LISTING_PREFIX}*.html")
+        )
+        index.flush()
+    return index
@@ -0,0 +1,221 @@
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+import httpx
+import requests
+from data_vortex.metrics import HTTP_REQUEST_SECONDS, HTTP_RESPONSE_BYTES
+from data_vortex.utils.config import settings
+from data_vortex.utils.logging import log
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+# gzip and deflate are always supported, br only if brotli is installed
+DEFAULT_HEADERS = {"Accept-Encoding": ACCEPT_ENCODING}
+
+
+class LatencyStats:
+    """Thread-safe running totals of request latency, by status code."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.count = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+            self.status_codes: Counter = Counter()
+
+    def observe(self, status_code: int, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.status_codes[status_code] += 1
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+latency_stats = LatencyStats()
+
+
+def _observe(status_code: int, seconds: float, size: int) -> None:
+    latency_stats.observe(status_code, seconds)
+    HTTP_REQUEST_SECONDS.labels(status_code).observe(seconds)
+    HTTP_RESPONSE_BYTES.inc(size)
+
+
+def _record_latency(
+    response: requests.Response,
+    *args,  # noqa: ARG001
+    **kwargs,  # noqa: ARG001
+) -> None:
+    seconds = response.elapsed.total_seconds()
+    # Reads the body, which requests does next anyway as nothing streams
+    _observe(response.status_code, seconds, len(response.content))
+    log.debug(
+        "GET %s returned %s in %.3fs",
+        response.url,
+        response.status_code,
+        seconds,
+    )
+
+
+def build_retry() -> Retry:
+    return Retry(
+        total=settings.HTTP_RETRY_TOTAL,
+        backoff_factor=settings.HTTP_RETRY_BACKOFF_FACTOR,
+        backoff_max=settings.HTTP_RETRY_BACKOFF_MAX,
+        backoff_jitter=settings.HTTP_RETRY_JITTER,
+        status_forcelist=settings.HTTP_RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def build_session() -> requests.Session:
+    """
+    Build a session with a keep-alive connection pool and retries with
+    exponential backoff that honour Retry-After.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=build_retry(),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    session.hooks["response"].append(_record_latency)
+    return session
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session shared by all Rightmove calls."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def http_get(
+    url: str,
+    params: Optional[Mapping[str, str]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> requests.Response:
+    return get_session().get(
+        url,
+        params=params,
+        headers=headers,
+        timeout=settings.HTTP_TIMEOUT,
+    )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as a date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Delay before retry number `attempt` (starting at 1): exponential backoff
+    with jitter, or the server's Retry-After if it asks for longer.
+    """
+    delay = settings.HTTP_RETRY_BACKOFF_FACTOR * (2 ** (attempt - 1))
+    delay = min(settings.HTTP_RETRY_BACKOFF_MAX, delay)
+    delay += random.uniform(0, settings.HTTP_RETRY_JITTER)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def build_async_client(
+    max_connections: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    max_connections = max_connections or settings.HTTP_POOL_MAXSIZE
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+    )
+    return httpx.AsyncClient(
+        headers={**DEFAULT_HEADERS, **(headers or {})},
+        limits=limits,
+        timeout=settings.HTTP_TIMEOUT,
+        transport=transport,
+    )
+
+
+async def async_http_get(
+    client: httpx.AsyncClient,
+    url: str,
+    params: Optional[Mapping[str, str]] = None,
+) -> httpx.Response:
+    """
+    GET with the same retry policy as the synchronous session: retry on
+    connection errors and retryable status codes with backoff and jitter.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, params=params)
+        except httpx.TransportError as e:
+            if attempt > settings.HTTP_RETRY_TOTAL:
+                raise
+            delay = backoff_delay(attempt)
+            log.warning(
+                "GET %s failed with %r, retrying in %.2fs", url, e, delay
+            )
+            await asyncio.sleep(delay)
+            continue
+
+        _observe(
+            response.status_code,
+            time.perf_counter() - start,
+            len(response.content),
+        )
+        if (
+            response.status_code not in settings.HTTP_RETRY_STATUSES
+            or attempt > settings.HTTP_RETRY_TOTAL
+        ):
+            return response
+
+        delay = backoff_delay(
+            attempt, parse_retry_after(response.headers.get("Retry-After"))
+        )
+        log.warning(
+            "GET %s returned %s, retrying in %.2fs",
+            url,
+            response.status_code,
+            delay,
+        )
+        await asyncio.sleep(delay)
@@ -2,7 +2,7 @@ import time
 from functools import lru_cache
 from importlib import metadata
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import tomlkit
 from pydantic_settings import BaseSettings
@@ -61,13 +61,105 @@ class Settings(BaseSettings):
     )
 
     SYSLOG_ADDR: Optional[Path] = None
+    # Write log files and syslog from a listener thread, see get_logger
+    LOG_QUEUE: bool = False
+    # Crawls log a summary every this many pages, each page at debug level
+    LOG_PAGE_SAMPLE: int = 10
 
     DATABASE_URL: str = "sqlite:///vortex.db"
+    UPSERT_CHUNK_SIZE: int = 500  # rows per executemany and key lookup
+    # "tuned" sets up SQLite for concurrent readers and one writer, see
+    # database.make_engine, "default" leaves SQLite's own settings
+    SQLITE_PROFILE: str = "tuned"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 30000
+    # Async access, the URL defaults to DATABASE_URL with an async driver
+    ASYNC_DATABASE_URL: Optional[str] = None
+    ASYNC_POOL_SIZE: int = 5
+    ASYNC_MAX_OVERFLOW: int = 10
 
     USE_CACHE_FOR_SEARCH: bool = True
+    RESPONSE_CACHE_BACKEND: str = "sqlite"  # "sqlite" or "none"
+    RESPONSE_CACHE_PATH: Path = Path("cache") / "responses.db"
+    RESPONSE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
     DATA_DIR: Path = Path("data")
+    LISTING_STORE_DIR: Path = Path("data") / "listings"
+    LISTING_STORE_FLUSH_SIZE: int = 5000
     RAW_LISTING_DIR: Path = Path("raw_data")
 
+    # Metrics, served on localhost:METRICS_PORT/metrics and/or written to
+    # METRICS_TEXTFILE for node_exporter when a command exits
+    METRICS_PORT: Optional[int] = None
+    METRICS_TEXTFILE: Optional[Path] = None
+
+    # HTTP transport
+    HTTP_POOL_CONNECTIONS: int = 4  # number of hosts to keep pools for
+    HTTP_POOL_MAXSIZE: int = 16  # connections kept alive per host
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_RETRY_TOTAL: int = 5
+    HTTP_RETRY_BACKOFF_FACTOR: float = 0.5
+    HTTP_RETRY_BACKOFF_MAX: float = 60.0
+    HTTP_RETRY_JITTER: float = 0.5
+    HTTP_RETRY_STATUSES: List[int] = [429, 500, 502, 503, 504]
+
+    # Parsing
+    PARSER_BACKEND: str = "lxml"  # "lxml", "bs4" or "json"
+    PARSE_WORKERS: int = 0  # crawl parsing processes, 0 parses in place
+
+    # Raw listing ingestion
+    INGEST_WORKERS: Optional[int] = None  # defaults to the number of CPUs
+    INGEST_BATCH_SIZE: int = 500
+
+    # Crawl to database pipeline
+    PIPELINE_QUEUE_SIZE: int = 5000  # listings waiting to be written
+    PIPELINE_BATCH_SIZE: int = 500
+    PIPELINE_FLUSH_INTERVAL: float = 5.0  # seconds before a partial batch
+
+    # Search planning
+    # Rightmove serves at most 42 pages of 24 results for any search
+    PLANNER_RESULT_CAP: int = 1008
+    PLANNER_MAP_PATH: Path = Path("cache") / "search_plan.json"
+
+    # Incremental crawls
+    WATERMARK_PATH: Path = Path("cache") / "watermarks.db"
+
+    # Checkpoints of crawls run with --resume
+    CHECKPOINT_PATH: Path = Path("cache") / "checkpoints.db"
+    # Pages between checkpoints. Each checkpoint flushes the sink, which
+    # for the listing store writes a segment, so not every page is one
+    CHECKPOINT_PAGES: int = 20
+    # Rightmove pages shift as listings come and go, older checkpoints
+    # are not resumed from
+    CHECKPOINT_MAX_AGE_HOURS: float = 6.0
+
+    # Analytics
+    RENT_STATS_PATH: Path = Path("cache") / "rent_stats.db"
+
+    # Crawler
+    # Rightmove location identifiers crawled unless others are passed
+    CRAWL_REGIONS: List[str] = ["REGION^87490"]
+    CRAWL_CONCURRENCY: int = 8
+    CRAWL_RATE_LIMIT: float = 2.0  # requests per second, per host
+    CRAWL_RATE_BURST: int = 4
+
+    # Work queue shared by crawl workers, see crawl_queue.CrawlQueue
+    CRAWL_QUEUE_PATH: Path = Path("cache") / "crawl_queue.db"
+    CRAWL_QUEUE_LEASE_SECONDS: float = 300.0
+    CRAWL_QUEUE_HEARTBEAT_INTERVAL: float = 30.0
+    CRAWL_QUEUE_MAX_ATTEMPTS: int = 5
+    CRAWL_QUEUE_LEASE_BATCH: int = 4  # pages leased and flushed at once
+    CRAWL_QUEUE_POLL_INTERVAL: float = 5.0  # seconds between empty leases
+
+    # Dagster assets, partitioned by day and by region and price bucket
+    DAGSTER_START_DATE: str = "2024-03-01"
+    DAGSTER_REGIONS: Dict[str, str] = {"london": "REGION^87490"}
+    # Edges of the price buckets, the last bucket has no upper limit
+    DAGSTER_PRICE_EDGES: List[int] = [0, 1000, 1500, 2000, 2500, 3000, 4000]
+    DAGSTER_MAX_CONCURRENT: int = 4  # step processes per run
+    DAGSTER_RETRIES: int = 3  # per partition step
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,8 +1,9 @@
-import datetime
+import atexit
 import logging
 import logging.handlers
+import queue
 from pathlib import Path
-from typing import ClassVar, Optional
+from typing import ClassVar, Dict, List, Optional
 
 import ujson
 from json_log_formatter import JSONFormatter
@@ -23,7 +24,10 @@ CRITICAL = BOLD_RED + "{}" + RESET
 
 
 class ColourfulFormatter(logging.Formatter):
-    """Logging Formatter to add colors and count warning / errors"""
+    """
+    Logging Formatter to add colors and count warning / errors. The
+    formatter of every level is built once, not for every record.
+    """
 
     FORMATS: ClassVar = {
         logging.DEBUG: DEBUG,
@@ -33,18 +37,25 @@ class ColourfulFormatter(logging.Formatter):
         logging.CRITICAL: CRITICAL,
     }
 
+    def __init__(
+        self, fmt: Optional[str] = None, datefmt: Optional[str] = None
+    ) -> None:
+        super().__init__(fmt, datefmt)
+        self._formatters: Dict[int, logging.Formatter] = {
+            level: logging.Formatter(log_fmt.format(self._fmt), datefmt)
+            for level, log_fmt in self.FORMATS.items()
+        }
+
     def format(self, record: logging.LogRecord) -> str:
-        _log_fmt = self.FORMATS.get(record.levelno)
-        if not _log_fmt:
+        formatter = self._formatters.get(record.levelno)
+        if formatter is None:
             raise BadLogFormatError
-        log_fmt = _log_fmt.format(self._fmt)
-        formatter = logging.Formatter(log_fmt)
         return formatter.format(record)
 
 
 class CustomisedJSONFormatter(JSONFormatter):
-    # Serialise datetime as timestamp by using ujson (which does it by default)
-    # and disable ISO8601 date mutation:
+    # Log the time as the timestamp the record was created at, which is
+    # cheaper than taking the time again and needs no ISO8601 mutation:
     json_lib = ujson
 
     def json_record(
@@ -62,12 +73,15 @@ class CustomisedJSONFormatter(JSONFormatter):
         extra["lineno"] = record.lineno
 
         if "time" not in extra:
-            extra["time"] = datetime.datetime.now()
+            extra["time"] = record.created
 
         if record.exc_info:
             extra["exc_info"] = self.formatException(record.exc_info)
         return extra
 
+    def mutate_json_record(self, json_record: dict) -> dict:
+        return json_record
+
 
 class CustomisedVerboseJSONFormatter(CustomisedJSONFormatter):
     def json_record(
@@ -81,19 +95,28 @@ class CustomisedVerboseJSONFormatter(CustomisedJSONFormatter):
         extra["pathname"] = record.pathname
         extra["process"] = record.process
         extra["processName"] = record.processName
-        if hasattr(record, "stack_info"):
-            extra["stack_info"] = record.stack_info
-        else:
-            extra["stack_info"] = None
+        extra["stack_info"] = record.stack_info
         extra["thread"] = record.thread
         extra["threadName"] = record.threadName
-        return super(CustomisedVerboseJSONFormatter).json_record(
+        return super().json_record(
             message,
             extra,
             record,
         )
 
 
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+def stop_listeners() -> None:
+    """Write out the records still queued and stop the listener threads."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_listeners)
+
+
 def get_logger(
     name: str,
     log_level: str,
@@ -101,7 +124,14 @@ def get_logger(
     sys_log: Optional[Path] = None,
     verbose: bool = False,
     as_json: bool = False,
+    use_queue: bool = False,
 ) -> logging.Logger:
+    """
+    With `use_queue` the file and syslog handlers run on a listener thread,
+    and logging only puts records on a queue, so that a hot loop does not
+    wait for disk or network I/O. Records still queued are written out at
+    exit, or by `stop_listeners`.
+    """
     log_level = log_level.upper()
     logger = logging.getLogger(name)
     level = logging.getLevelName(log_level)
@@ -116,19 +146,34 @@ def get_logger(
         fmt += "(%(name)s; %(filename)s:%(lineno)d)"
         formatter = ColourfulFormatter(fmt)  # type: ignore
 
+    io_handlers: List[logging.Handler] = []
     if log_file:
         parent_dir = log_file.parent
         parent_dir.mkdir(parents=True, exist_ok=True)
         file_handler = logging.FileHandler(filename=log_file)
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        io_handlers.append(file_handler)
 
     if sys_log:
         syslog_handler = logging.handlers.SysLogHandler(address=str(sys_log))
         syslog_handler.setLevel(level)
         syslog_handler.setFormatter(formatter)
-        logger.addHandler(syslog_handler)
+        io_handlers.append(syslog_handler)
+
+    if use_queue and io_handlers:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(
+            log_queue, *io_handlers, respect_handler_level=True
+        )
+        listener.start()
+        _listeners.append(listener)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.setLevel(level)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in io_handlers:
+            logger.addHandler(handler)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
@@ -145,4 +190,71 @@ log = get_logger(
     sys_log=settings.SYSLOG_ADDR,
     verbose=settings.VERBOSE_LOGS,
     as_json=settings.JSON_LOGS,
+    use_queue=settings.LOG_QUEUE,
 )
+
+
+class PageLog:
+    """
+    Aggregated log of a paged crawl. Every page is logged at debug level,
+    and every `every` pages one info line sums up the pages since the last
+    one, instead of several info lines per page and one per listing.
+    """
+
+    def __init__(
+        self,
+        search: str,
+        every: Optional[int] = None,
+        logger: logging.Logger = log,
+    ) -> None:
+        self.search = search
+        self.every = every or settings.LOG_PAGE_SAMPLE
+        self.logger = logger
+        self.pages = 0
+        self.listings = 0
+        self.new_listings = 0
+        self.downloads = 0
+        self._since = (0, 0, 0, 0)
+
+    def page(
+        self, index: int, listings: int, new_listings: int, downloads: int = 0
+    ) -> None:
+        self.pages += 1
+        self.listings += listings
+        self.new_listings += new_listings
+        self.downloads += downloads
+        self.logger.debug(
+            "Page at index %d of %s: %d listings, %d new, %d downloaded",
+            index,
+            self.search,
+            listings,
+            new_listings,
+            downloads,
+        )
+        if self.pages % self.every == 0:
+            self._summarise()
+
+    def close(self, reason: str) -> None:
+        """Sum up the pages not summed up yet and why the crawl stopped."""
+        if self.pages > self._since[0]:
+            self._summarise()
+        self.logger.info(
+            "%s after %d pages of %s", reason, self.pages, self.search
+        )
+
+    def _summarise(self) -> None:
+        pages, listings, new_listings, downloads = self._since
+        self.logger.info(
+            "%d pages of %s: %d listings, %d new, %d downloaded",
+            self.pages - pages,
+            self.search,
+            self.listings - listings,
+            self.new_listings - new_listings,
+            self.downloads - downloads,
+        )
+        self._since = (
+            self.pages,
+            self.listings,
+            self.new_listings,
+            self.downloads,
+        )
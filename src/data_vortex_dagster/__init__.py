@@ -1,8 +1,26 @@
 from dagster import Definitions
+from data_vortex_dagster.assets import (
+    parsed_listings,
+    rent_statistics,
+    rental_listings,
+    search_pages,
+)
+from data_vortex_dagster.jobs import (
+    crawl_job,
+    crawl_schedule,
+    executor,
+    rent_stats_job,
+    rent_stats_schedule,
+)
+from data_vortex_dagster.resources import DatabaseResource, RightmoveResource
 
 definitions = Definitions(
-    assets=[],
-    jobs=[],
-    schedules=[],
-    resources={},
+    assets=[search_pages, parsed_listings, rental_listings, rent_statistics],
+    jobs=[crawl_job, rent_stats_job],
+    schedules=[crawl_schedule, rent_stats_schedule],
+    resources={
+        "rightmove": RightmoveResource(),
+        "database": DatabaseResource(),
+    },
+    executor=executor,
 )
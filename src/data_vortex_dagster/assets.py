@@ -0,0 +1,122 @@
+import math
+from typing import List
+
+from dagster import (
+    AssetExecutionContext,
+    Backoff,
+    MaterializeResult,
+    RetryPolicy,
+    asset,
+)
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.crud import upsert_listing_batch
+from data_vortex.listing_batch import ListingBatch
+from data_vortex.rightmove_processing import get_parser, parse_search_summary
+from data_vortex.rightmove_query import RIGHTMOVE_PAGE_SIZE
+from data_vortex.utils.config import settings
+from data_vortex_dagster.partitions import crawl_partitions, search_partition
+from data_vortex_dagster.resources import DatabaseResource, RightmoveResource
+
+# A failed partition is retried on its own, backing off from a minute
+retry_policy = RetryPolicy(
+    max_retries=settings.DAGSTER_RETRIES,
+    delay=60,
+    backoff=Backoff.EXPONENTIAL,
+)
+# Caps the steps fetching from Rightmove at once across all runs, set with
+# `dagster instance concurrency set rightmove <limit>`
+RIGHTMOVE_TAGS = {"dagster/concurrency_key": "rightmove"}
+
+
+@asset(
+    partitions_def=crawl_partitions,
+    retry_policy=retry_policy,
+    op_tags=RIGHTMOVE_TAGS,
+    group_name="rightmove",
+)
+def search_pages(
+    context: AssetExecutionContext, rightmove: RightmoveResource
+) -> List[bytes]:
+    """
+    Every results page of the partition's search, as fetched on the day.
+    The number of pages comes from the result count of the first one, up
+    to the number Rightmove paginates through.
+    """
+    params = search_partition(context.partition_key).to_params()
+    first_page = rightmove.search_page(params.model_copy(update={"index": 0}))
+    summary = parse_search_summary(first_page)
+    if summary is None:
+        raise ValueError("Search page has no result count.")
+    results = min(summary.result_count, settings.PLANNER_RESULT_CAP)
+    pages = [first_page]
+    for page in range(1, math.ceil(results / RIGHTMOVE_PAGE_SIZE)):
+        pages.append(
+            rightmove.search_page(
+                params.model_copy(update={"index": page * RIGHTMOVE_PAGE_SIZE})
+            )
+        )
+    context.add_output_metadata(
+        {"pages": len(pages), "result_count": summary.result_count}
+    )
+    return pages
+
+
+@asset(
+    partitions_def=crawl_partitions,
+    retry_policy=retry_policy,
+    group_name="rightmove",
+)
+def parsed_listings(
+    context: AssetExecutionContext, search_pages: List[bytes]
+) -> ListingBatch:
+    """The distinct listings on the search pages."""
+    parser = get_parser()
+    # Featured listings show up on more than one page
+    listings = {
+        listing.property_id: listing
+        for page in search_pages
+        for listing in parser.parse_listings(page)
+    }
+    batch = ListingBatch.from_listings(listings.values())
+    context.add_output_metadata({"listings": len(batch)})
+    return batch
+
+
+@asset(
+    partitions_def=crawl_partitions,
+    retry_policy=retry_policy,
+    group_name="rightmove",
+)
+def rental_listings(
+    database: DatabaseResource, parsed_listings: ListingBatch
+) -> MaterializeResult:
+    """
+    The parsed listings upserted into the database. Loading a partition
+    again leaves unchanged listings alone, so retries are safe.
+    """
+    with database.session() as db:
+        result = upsert_listing_batch(db, parsed_listings)
+    RentStatsCache().invalidate(parsed_listings.table["postcode"].to_pylist())
+    return MaterializeResult(
+        metadata={
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+        }
+    )
+
+
+@asset(deps=[rental_listings], group_name="analytics")
+def rent_statistics(database: DatabaseResource) -> MaterializeResult:
+    """
+    Monthly rent percentiles per postcode district and number of bedrooms,
+    recomputed for the districts loaded since the last materialization.
+    """
+    with database.session() as db:
+        stats = RentStatsCache().stats(db)
+    return MaterializeResult(
+        metadata={
+            "groups": stats.num_rows,
+            "listings": sum(stats["listings"].to_pylist()),
+        }
+    )
@@ -0,0 +1,41 @@
+from dagster import (
+    AssetSelection,
+    ScheduleDefinition,
+    build_schedule_from_partitioned_job,
+    define_asset_job,
+    multiprocess_executor,
+)
+from data_vortex.utils.config import settings
+from data_vortex_dagster.assets import (
+    parsed_listings,
+    rent_statistics,
+    rental_listings,
+    search_pages,
+)
+from data_vortex_dagster.partitions import crawl_partitions
+
+# Every step runs in a process of its own, so a crash or a leak while
+# parsing one partition takes nothing else down
+executor = multiprocess_executor.configured(
+    {"max_concurrent": settings.DAGSTER_MAX_CONCURRENT}
+)
+
+# One run per partition. Backfills queue one run for every day, region and
+# price bucket; the run coordinator in dagster.yaml runs them side by side
+# and each retries on its own.
+crawl_job = define_asset_job(
+    "crawl_job",
+    selection=AssetSelection.assets(
+        search_pages, parsed_listings, rental_listings
+    ),
+    partitions_def=crawl_partitions,
+)
+rent_stats_job = define_asset_job(
+    "rent_stats_job", selection=AssetSelection.assets(rent_statistics)
+)
+
+# Runs every search bucket of the day, in place of the cron job
+crawl_schedule = build_schedule_from_partitioned_job(crawl_job, hour_of_day=3)
+rent_stats_schedule = ScheduleDefinition(
+    job=rent_stats_job, cron_schedule="0 6 * * *"
+)
@@ -0,0 +1,80 @@
+from typing import List, NamedTuple, Optional
+
+from dagster import (
+    DailyPartitionsDefinition,
+    MultiPartitionKey,
+    MultiPartitionsDefinition,
+    StaticPartitionsDefinition,
+)
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.search_planner import PriceBucket
+from data_vortex.utils.config import settings
+
+
+class SearchPartition(NamedTuple):
+    """
+    One region and price bucket, keyed like "london:1000-1500". Dagster
+    joins the keys of the dimensions of a partition with "|", so the parts
+    of this key are joined with ":" instead.
+    """
+
+    region: str
+    min_price: Optional[int]
+    max_price: Optional[int]
+
+    @property
+    def key(self) -> str:
+        return (
+            f"{self.region}:{_price_key(self.min_price)}-"
+            f"{_price_key(self.max_price)}"
+        )
+
+    @classmethod
+    def from_key(cls, key: str) -> "SearchPartition":
+        region, _, prices = key.partition(":")
+        min_price, _, max_price = prices.partition("-")
+        return cls(
+            region,
+            int(min_price) if min_price else None,
+            int(max_price) if max_price else None,
+        )
+
+    def to_params(self) -> RightmoveRentParams:
+        baseline_params = RightmoveRentParams(
+            locationIdentifier=settings.DAGSTER_REGIONS[self.region]
+        )
+        return PriceBucket(self.min_price, self.max_price).to_params(
+            baseline_params
+        )
+
+
+def _price_key(price: Optional[int]) -> str:
+    return "" if price is None else str(price)
+
+
+def search_partitions() -> List[SearchPartition]:
+    """Every configured region split at `DAGSTER_PRICE_EDGES`."""
+    edges = sorted(settings.DAGSTER_PRICE_EDGES)
+    buckets = list(zip(edges, [*edges[1:], None]))
+    return [
+        SearchPartition(region, min_price or None, max_price)
+        for region in settings.DAGSTER_REGIONS
+        for min_price, max_price in buckets
+    ]
+
+
+def search_partition(partition_key: MultiPartitionKey) -> SearchPartition:
+    return SearchPartition.from_key(partition_key.keys_by_dimension["search"])
+
+
+# A day's partition stays open until the day ends, so that it can be
+# crawled on the day
+daily_partitions = DailyPartitionsDefinition(
+    start_date=settings.DAGSTER_START_DATE, end_offset=1
+)
+search_partitions_def = StaticPartitionsDefinition(
+    [partition.key for partition in search_partitions()]
+)
+crawl_partitions = MultiPartitionsDefinition(
+    {"date": daily_partitions, "search": search_partitions_def}
+)
@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from dagster import ConfigurableResource, InitResourceContext
+from data_vortex.database.database import make_engine
+from data_vortex.database.models import Base
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_processing import check_response
+from data_vortex.rightmove_query import search_rental_properties
+from data_vortex.transport import get_session
+from data_vortex.utils.config import settings
+from pydantic import PrivateAttr
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+
+class RightmoveResource(ConfigurableResource):
+    """
+    Rightmove searches over the pooled, retrying session of
+    `data_vortex.transport`. The multiprocess executor runs every step in
+    a process of its own, which then keeps one session for all its
+    requests.
+    """
+
+    use_cache: bool = False
+    wait_time: float = 0.0  # seconds after every request
+
+    def setup_for_execution(
+        self,
+        context: InitResourceContext,  # noqa: ARG002
+    ) -> None:
+        get_session()
+
+    def search_page(self, params: RightmoveRentParams) -> bytes:
+        response = search_rental_properties(params, use_cache=self.use_cache)
+        check_response(response)
+        time.sleep(self.wait_time)
+        return response.content
+
+
+class DatabaseResource(ConfigurableResource):
+    """
+    The listings database, through a writer engine of the step's process,
+    see `data_vortex.database.database.make_engine`.
+    """
+
+    url: str = settings.DATABASE_URL
+    profile: str = settings.SQLITE_PROFILE
+
+    _engine: Engine = PrivateAttr()
+    _session_factory: sessionmaker = PrivateAttr()
+
+    def setup_for_execution(
+        self,
+        context: InitResourceContext,  # noqa: ARG002
+    ) -> None:
+        self._engine = make_engine(self.url, self.profile, writer=True)
+        Base.metadata.create_all(bind=self._engine)
+        self._session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=self._engine
+        )
+
+    def teardown_after_execution(
+        self,
+        context: InitResourceContext,  # noqa: ARG002
+    ) -> None:
+        self._engine.dispose()
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        with self._session_factory() as db:
+            yield db
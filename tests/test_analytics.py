@@ -0,0 +1,121 @@
+import statistics
+from pathlib import Path
+from typing import Generator, Optional
+
+import pyarrow as pa
+import pytest
+from data_vortex.analytics import (
+    RentStatsCache,
+    load_rent_table,
+    monthly_rent,
+    rent_stats,
+)
+from data_vortex.database.crud import upsert_listing_rows
+from data_vortex.database.models import Base
+from data_vortex.listing_batch import ListingBatch
+from data_vortex.rightmove_models import (
+    Price,
+    PriceUnit,
+    RightmoveRentalListing,
+)
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+
+def _row(
+    property_id: str,
+    price: int,
+    postcode: Optional[str] = "N1 1AA",
+    bedrooms: Optional[int] = 2,
+    per: Optional[PriceUnit] = PriceUnit.PER_MONTH,
+) -> dict:
+    return RightmoveRentalListing(
+        property_id=property_id,
+        description="",
+        price=Price(price=price, currency=None, per=per),
+        added_date="2024-03-01",
+        address=postcode,
+        postcode=postcode,
+        bedrooms=bedrooms,
+    ).to_orm_dict()
+
+
+@pytest.fixture()
+def db_session() -> Generator[Session, None, None]:
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def test_monthly_rent_normalises_units() -> None:
+    batch = ListingBatch.from_rows(
+        [
+            _row("1", 1200),
+            _row("2", 300, per=PriceUnit.PER_WEEK),
+            _row("3", 24000, per=PriceUnit.PER_YEAR),
+            _row("4", 1000, per=None),
+            _row("5", 500, per=PriceUnit.ONE_OFF),
+        ]
+    )
+    assert monthly_rent(batch.table).to_pylist() == [
+        1200.0,
+        1300.0,
+        2000.0,
+        1000.0,
+        None,
+    ]
+
+
+def test_rent_stats_per_district_and_bedrooms() -> None:
+    prices = [900, 1000, 1150, 1400, 2000]
+    rows = [_row(f"a{i}", p, "N1 1AA") for i, p in enumerate(prices)]
+    rows += [
+        _row("b1", 3000, "N1 2BB", bedrooms=6),
+        _row("b2", 4000, "N1", bedrooms=4),
+        _row("c1", 1500, "E2 7QA", bedrooms=None),
+        _row("d1", 1500, None),
+    ]
+
+    stats = rent_stats(ListingBatch.from_rows(rows).table).to_pylist()
+
+    assert [
+        (s["postcode_district"], s["bedroom_bucket"], s["listings"])
+        for s in stats
+    ] == [("E2", None, 1), ("N1", 2, 5), ("N1", 4, 2)]
+    quartiles = statistics.quantiles(prices, n=4, method="inclusive")
+    assert [stats[1][k] for k in ("rent_p25", "rent_median", "rent_p75")] == (
+        pytest.approx(quartiles)
+    )
+    assert stats[2]["rent_median"] == 3500.0
+
+
+def test_rent_stats_of_nothing() -> None:
+    stats = rent_stats(ListingBatch.from_rows([]).table)
+    assert stats.num_rows == 0
+    assert isinstance(stats, pa.Table)
+
+
+def test_cache_recomputes_invalidated_districts(
+    tmp_path: Path, db_session: Session
+) -> None:
+    upsert_listing_rows(
+        db_session, [_row("1", 1000, "N1 1AA"), _row("2", 2000, "E2 7QA")]
+    )
+    assert load_rent_table(db_session, ["N1"]).num_rows == 1
+    cache = RentStatsCache(tmp_path / "rent_stats.db")
+
+    def medians() -> dict:
+        stats = cache.stats(db_session).to_pylist()
+        return {s["postcode_district"]: s["rent_median"] for s in stats}
+
+    assert medians() == {"E2": 2000.0, "N1": 1000.0}
+
+    upsert_listing_rows(
+        db_session, [_row("1", 1200, "N1 1AA"), _row("2", 2400, "E2 7QA")]
+    )
+    # Only the district that was invalidated is recomputed
+    cache.invalidate(["N1 1AA", None])
+    assert medians() == {"E2": 2000.0, "N1": 1200.0}
+    assert cache.stats(db_session, refresh=True).num_rows == 2
+    assert medians() == {"E2": 2400.0, "N1": 1200.0}
@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex.database import async_crud
+from data_vortex.database.async_database import (
+    async_url,
+    create_database_async,
+    get_async_engine,
+    get_async_sessionmaker,
+    make_async_engine,
+    session_scope,
+)
+from data_vortex.database.crud import ListingFilter
+from data_vortex.database.models import RentalListing
+from data_vortex.utils.config import settings
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+def _row(property_id: str, price: int) -> dict:
+    return {
+        "property_id": property_id,
+        "image_url": None,
+        "description": "Flat",
+        "price_amount": price,
+        "price_per": "PER_MONTH",
+        "price_currency": "GBP",
+        "added_date": datetime.date(2024, 3, 1),
+        "address": "1 Fake Street, N1 1AA",
+        "postcode": "N1 1AA",
+        "created_date": datetime.datetime(2024, 3, 1),
+        "bedrooms": 2,
+        "bathrooms": 1,
+        "property_type": "Flat",
+    }
+
+
+def test_async_url() -> None:
+    assert async_url("sqlite:///vortex.db") == "sqlite+aiosqlite:///vortex.db"
+    assert async_url("postgresql+psycopg2://db/vortex") == (
+        "postgresql+asyncpg://db/vortex"
+    )
+    with pytest.raises(ValueError, match="No async driver"):
+        async_url("mysql://db/vortex")
+
+
+@pytest.mark.asyncio()
+async def test_default_engines_are_created_on_first_use(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'vortex.db'}"
+    )
+    monkeypatch.setattr(settings, "SQLITE_PROFILE", "tuned")
+    get_async_engine.cache_clear()
+    get_async_sessionmaker.cache_clear()
+    try:
+        writer = get_async_engine(writer=True)
+        assert writer is get_async_engine(writer=True)
+        assert writer.url.drivername == "sqlite+aiosqlite"
+        assert writer.sync_engine.pool.size() == 1
+
+        await create_database_async()
+        async with session_scope() as db:
+            assert await async_crud.count_listings(db) == 0
+        await writer.dispose()
+        await get_async_engine().dispose()
+    finally:
+        get_async_engine.cache_clear()
+        get_async_sessionmaker.cache_clear()
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_tasks_upsert_and_query(tmp_path: Path) -> None:
+    url = f"sqlite:///{tmp_path / 'vortex.db'}"
+    writer = make_async_engine(url, "tuned", writer=True, pool_size=8)
+    reader = make_async_engine(url, "tuned", pool_size=2)
+    await create_database_async(writer)
+    writer_session = async_sessionmaker(writer, expire_on_commit=False)
+    reader_session = async_sessionmaker(reader, expire_on_commit=False)
+    assert writer.sync_engine.pool.size() == 1
+
+    async def write(task: int) -> None:
+        # One session per task
+        async with session_scope(writer_session) as db:
+            rows = [_row(f"{task}-{i}", 1000 + i) for i in range(10)]
+            result = await async_crud.upsert_listing_rows(db, rows)
+            assert result.inserted == 10
+
+    await asyncio.gather(*(write(task) for task in range(4)))
+
+    async with session_scope(reader_session) as db:
+        assert await async_crud.count_listings(db) == 40
+        listing = await async_crud.get_listing(db, "2-3")
+        assert listing.price_amount == 1003
+        assert listing.postcode_district == "N1"
+
+        page = await async_crud.search_listings(
+            db, ListingFilter(postcode_district="N1", max_price=1001), limit=5
+        )
+        assert len(page.listings) == 5
+        page = await async_crud.search_listings(
+            db,
+            ListingFilter(postcode_district="N1", max_price=1001),
+            limit=5,
+            after=page.next_cursor,
+        )
+        assert len(page.listings) == 3
+        assert page.next_cursor is None
+
+    since = datetime.datetime.now()
+    async with session_scope(writer_session) as db:
+        await async_crud.upsert_listing_rows(db, [_row("0-0", 900)])
+    async with session_scope(reader_session) as db:
+        changes = await async_crud.get_price_changes(db, since)
+    assert [(c.property_id, c.previous_price_amount) for c in changes] == [
+        ("0-0", 1000)
+    ]
+
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio()
+async def test_session_scope_rolls_back_on_error(tmp_path: Path) -> None:
+    engine = make_async_engine(f"sqlite:///{tmp_path / 'vortex.db'}")
+    await create_database_async(engine)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def fail() -> None:
+        async with session_scope(session_factory) as db:
+            db.add(RentalListing(property_id="1"))
+            await db.flush()
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        await fail()
+
+    async with session_scope(session_factory) as db:
+        assert await async_crud.get_listing(db, "1") is None
+    await engine.dispose()
@@ -0,0 +1,175 @@
+from pathlib import Path
+from typing import List
+
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex import crawl_checkpoints, rightmove_query
+from data_vortex.crawl_checkpoints import (
+    Checkpoint,
+    CheckpointStore,
+    search_key,
+)
+from data_vortex.listing_store import ListingStore
+from data_vortex.rightmove_processing import parse_search_response
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_query import get_new_listings
+from data_vortex.utils.config import settings
+
+PARAMS = RightmoveRentParams(minPrice="1000", maxPrice="1500")
+
+
+class CountingSink(ListingStore):
+    flushes = 0
+
+    def flush(self) -> None:
+        self.flushes += 1
+        return super().flush()
+
+
+def test_store_saves_and_expires(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    store = CheckpointStore(tmp_path / "checkpoints.db", max_age_hours=1)
+    checkpoint = store.get(PARAMS)
+    assert checkpoint.last_index is None
+    assert checkpoint.next_index(24) == 0
+
+    checkpoint.record(0, 24, 20)
+    checkpoint.record(24, 24, 4)
+    store.save(checkpoint)
+    saved = store.get(PARAMS.model_copy(update={"index": 48}))
+    assert saved == checkpoint
+    assert saved.next_index(24) == 48
+    # Other sorting means other pages
+    assert store.get(PARAMS.model_copy(update={"sortType": "6"})) == (
+        Checkpoint(search_key(PARAMS.model_copy(update={"sortType": "6"})))
+    )
+
+    now = crawl_checkpoints.time.time()
+    monkeypatch.setattr(crawl_checkpoints.time, "time", lambda: now + 3601)
+    assert store.get(PARAMS).last_index is None
+    assert store.prune() == 0
+
+
+def test_commit_flushes_before_saving(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "CHECKPOINT_PAGES", 2)
+    store = CheckpointStore(tmp_path / "checkpoints.db")
+    sink = CountingSink(tmp_path / "listings")
+    checkpoint = store.get(PARAMS)
+
+    checkpoint.record(0, 24, 24)
+    store.commit(checkpoint, sink)
+    assert sink.flushes == 0
+    assert store.get(PARAMS).last_index is None
+
+    checkpoint.record(24, 24, 24)
+    store.commit(checkpoint, sink)
+    assert sink.flushes == 1
+    assert store.get(PARAMS).last_index == 24
+
+
+def test_get_new_listings_resumes(
+    tmp_path: Path, test_resources_root: Path, monkeypatch: MonkeyPatch
+) -> None:
+    page = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    requested: List[int] = []
+    fail = True
+
+    def search(
+        rightmove_params: RightmoveRentParams,
+        use_cache: bool = False,  # noqa: ARG001
+    ) -> requests.Response:
+        requested.append(rightmove_params.index)
+        response = requests.Response()
+        response.url = rightmove_query.RIGHTMOVE_RENT_SEARCH_URL
+        response.status_code = 200
+        response._content = b"<html></html>"
+        if rightmove_params.index == 48 and fail:
+            response.status_code = 503
+        elif rightmove_params.index < 96:
+            response._content = page
+        return response
+
+    monkeypatch.setattr(rightmove_query, "search_rental_properties", search)
+    monkeypatch.setattr(settings, "CHECKPOINT_PAGES", 1)
+    checkpoints = CheckpointStore(tmp_path / "checkpoints.db")
+
+    def crawl() -> None:
+        with ListingStore(tmp_path / "listings") as store:
+            get_new_listings(
+                PARAMS,
+                continue_search=True,
+                store=store,
+                checkpoints=checkpoints,
+            )
+
+    crawl()
+    assert requested == [0, 24, 48]
+    assert checkpoints.get(PARAMS).last_index == 24
+
+    fail = False
+    requested.clear()
+    crawl()
+    # Pages before the failure are not fetched again
+    assert requested == [48, 72, 96]
+    assert checkpoints.get(PARAMS).last_index is None
+
+
+def test_get_new_listings_resumes_past_stored_pages(
+    tmp_path: Path, test_resources_root: Path, monkeypatch: MonkeyPatch
+) -> None:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    listings = parse_search_response(response)[:24]
+    requested: List[int] = []
+    fail = True
+
+    def search(
+        rightmove_params: RightmoveRentParams,
+        use_cache: bool = False,  # noqa: ARG001
+    ) -> requests.Response:
+        requested.append(rightmove_params.index)
+        response = requests.Response()
+        response.url = rightmove_query.RIGHTMOVE_RENT_SEARCH_URL
+        response.status_code = 200
+        response._content = str(rightmove_params.index).encode()
+        if rightmove_params.index == 29 * 24 and fail:
+            response.status_code = 503
+        return response
+
+    def parse(response: requests.Response):
+        # Each of 40 pages has listings of its own
+        page = int(response.content) // 24
+        if page >= 40:
+            return []
+        return [
+            listing.model_copy(update={"property_id": f"{page}-{i}"})
+            for i, listing in enumerate(listings)
+        ]
+
+    monkeypatch.setattr(rightmove_query, "search_rental_properties", search)
+    monkeypatch.setattr(rightmove_query, "parse_search_response", parse)
+    checkpoints = CheckpointStore(tmp_path / "checkpoints.db")
+
+    def crawl() -> int:
+        with ListingStore(tmp_path / "listings") as store:
+            get_new_listings(PARAMS, store=store, checkpoints=checkpoints)
+        return len(ListingStore(tmp_path / "listings"))
+
+    # Pages after the checkpoint are stored when the store is closed
+    assert crawl() == 29 * 24
+    assert checkpoints.get(PARAMS).last_index == 19 * 24
+
+    fail = False
+    requested.clear()
+    # Those pages hold no new listings, yet the search goes on past them
+    assert crawl() == 40 * 24
+    assert requested == [24 * page for page in range(20, 41)]
+    assert checkpoints.get(PARAMS).last_index is None
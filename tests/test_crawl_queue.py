@@ -0,0 +1,142 @@
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex import crawl_queue
+from data_vortex.crawl_queue import CrawlQueue, CrawlWorker
+from data_vortex.listing_store import ListingStore
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.utils.config import settings
+
+LONDON = RightmoveRentParams(minPrice="1000", maxPrice="1500")
+MANCHESTER = RightmoveRentParams(locationIdentifier="REGION^904")
+
+
+@pytest.fixture()
+def queue(tmp_path: Path) -> CrawlQueue:
+    return CrawlQueue(tmp_path / "queue.db", lease_seconds=60, max_attempts=2)
+
+
+def test_enqueue_is_idempotent_within_a_run(queue: CrawlQueue) -> None:
+    assert queue.enqueue([LONDON, MANCHESTER], run="1") == 2
+    assert queue.enqueue([LONDON, MANCHESTER.model_copy()], run="1") == 0
+    assert queue.counts() == {
+        "pending": 2,
+        "leased": 0,
+        "done": 0,
+        "failed": 0,
+    }
+
+    for task in queue.lease("a", limit=2):
+        queue.complete("a", task, listings=24)
+    # The next run crawls the searches again
+    assert queue.enqueue([LONDON, MANCHESTER], run="2") == 2
+    assert queue.counts()["pending"] == 2
+
+
+def test_lease_complete_and_fan_out(queue: CrawlQueue) -> None:
+    queue.enqueue([LONDON, MANCHESTER])
+    first, second = queue.lease("a", limit=5)
+    assert first.region == "REGION^87490"
+    assert first.params.minPrice == "1000"
+    assert second.region == "REGION^904"
+    assert queue.lease("b") == []
+
+    queue.complete("a", first, listings=24, page_count=3)
+    assert queue.counts()["pending"] == 2
+    assert [task.page_index for task in queue.lease("b", limit=5)] == [24, 48]
+
+    # Completing the first page again after a crash changes nothing
+    assert not queue.complete("a", first, listings=24, page_count=3)
+    assert queue.counts()["pending"] == 0
+
+
+def test_expired_leases_are_taken_over(
+    queue: CrawlQueue, monkeypatch: MonkeyPatch
+) -> None:
+    queue.enqueue([LONDON])
+    (task,) = queue.lease("a")
+    assert queue.heartbeat("a", [task]) == 1
+    assert queue.heartbeat("b", [task]) == 0
+
+    now = crawl_queue.time.time()
+    monkeypatch.setattr(crawl_queue.time, "time", lambda: now + 120)
+    (taken,) = queue.lease("b")
+    assert taken.id == task.id
+    assert taken.attempts == 2
+    assert queue.heartbeat("a", [task]) == 0
+    # The first worker lost the lease, so its result is dropped
+    assert not queue.complete("a", task, listings=24, page_count=3)
+    assert queue.counts()["leased"] == 1
+
+    # Out of attempts, the next expiry fails the task
+    monkeypatch.setattr(crawl_queue.time, "time", lambda: now + 240)
+    assert queue.lease("c") == []
+    assert queue.counts()["failed"] == 1
+    assert queue.retry_failed() == 1
+    assert len(queue.lease("c")) == 1
+
+
+def test_fail_retries_until_out_of_attempts(queue: CrawlQueue) -> None:
+    queue.enqueue([LONDON])
+    (task,) = queue.lease("a")
+    queue.fail("a", task, "timeout")
+    assert queue.counts()["pending"] == 1
+    (task,) = queue.lease("a")
+    queue.fail("a", task, "timeout")
+    assert queue.counts()["failed"] == 1
+    assert queue.lease("a") == []
+
+
+def test_workers_share_the_queue(
+    tmp_path: Path,
+    test_resources_root: Path,
+    monkeypatch: MonkeyPatch,
+    queue: CrawlQueue,
+) -> None:
+    monkeypatch.setattr(settings, "CRAWL_QUEUE_POLL_INTERVAL", 0.01)
+    page = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    fetched = []
+    lock = threading.Lock()
+
+    def search(
+        params: RightmoveRentParams,
+        use_cache: bool = False,  # noqa: ARG001
+    ) -> requests.Response:
+        with lock:
+            fetched.append((params.locationIdentifier, params.index))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = page
+        return response
+
+    monkeypatch.setattr(crawl_queue, "search_rental_properties", search)
+    queue.enqueue([LONDON, MANCHESTER])
+
+    results = []
+
+    def work(worker_id: str) -> None:
+        # Stores are not shared between threads, one each like processes
+        with ListingStore(tmp_path / worker_id) as store:
+            results.append(CrawlWorker(queue, store, worker_id).run())
+
+    threads = [threading.Thread(target=work, args=(str(n),)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The page has more results than Rightmove pages through, so every
+    # search is capped at 42 pages, and no page is fetched twice
+    assert len(fetched) == len(set(fetched)) == 2 * 42
+    assert queue.counts()["done"] == 2 * 42
+    assert sum(result.pages for result in results) == 2 * 42
+    assert all(len(ListingStore(tmp_path / str(n))) for n in range(3))
+
+    # A resumed run has nothing left to do
+    assert queue.enqueue([LONDON, MANCHESTER]) == 0
+    assert queue.lease("d") == []
@@ -0,0 +1,102 @@
+import datetime
+from pathlib import Path
+
+import httpx
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex.crawl_watermarks import (
+    Watermark,
+    WatermarkStore,
+    bucket_key,
+    incremental_params,
+    max_days_since_added,
+)
+from data_vortex.listing_store import ListingStore
+from data_vortex.rightmove_crawler import AsyncCrawler
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.utils.config import settings
+
+DAY = 86400
+
+
+def test_max_days_since_added() -> None:
+    assert max_days_since_added(None, 10 * DAY) is None
+    assert max_days_since_added(10 * DAY - 3600, 10 * DAY) == 3
+    assert max_days_since_added(5 * DAY, 10 * DAY) == 7
+    assert max_days_since_added(0, 13 * DAY) == 14
+    assert max_days_since_added(0, 14 * DAY) is None
+
+
+def test_incremental_params_sort_newest_first() -> None:
+    params = RightmoveRentParams(minPrice="1000", maxPrice="1500")
+    watermark = Watermark(bucket_key(params), last_run_at=0)
+
+    incremental = incremental_params(params, watermark, now=2 * DAY)
+    assert incremental.sortType == "6"
+    assert incremental.maxDaysSinceAdded == "3"
+    assert bucket_key(incremental) == bucket_key(params)
+    assert incremental_params(params, Watermark("")).maxDaysSinceAdded == ""
+
+
+def test_store_moves_marks_forward(tmp_path: Path) -> None:
+    store = WatermarkStore(tmp_path / "watermarks.db")
+    params = RightmoveRentParams(minPrice="1000")
+    watermark = store.get(params)
+    assert watermark.newest_added_date is None
+
+    watermark.seen_newest = datetime.date(2024, 3, 18)
+    store.save(watermark, started_at=100.0)
+    saved = store.get(params)
+    assert saved.newest_added_date == datetime.date(2024, 3, 18)
+    assert saved.last_run_at == 100.0
+    assert saved.last_full_run_at is None
+
+    saved.seen_newest = datetime.date(2024, 3, 1)
+    store.save(saved, started_at=200.0, full=True)
+    saved = store.get(params)
+    assert saved.newest_added_date == datetime.date(2024, 3, 18)
+    assert saved.last_full_run_at == 200.0
+
+    saved.failed = True
+    store.save(saved, started_at=300.0)
+    assert store.get(params).last_run_at == 200.0
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(
+    ("newest_added_date", "pages"),
+    [(datetime.date(2024, 3, 19), 1), (datetime.date(2024, 3, 1), 3)],
+)
+async def test_crawl_stops_at_watermark(
+    tmp_path: Path,
+    test_resources_root: Path,
+    monkeypatch: MonkeyPatch,
+    newest_added_date: datetime.date,
+    pages: int,
+) -> None:
+    # The JSON model carries exact added dates (2024-03-01 to 2024-03-18)
+    monkeypatch.setattr(settings, "PARSER_BACKEND", "json")
+    page = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    seen_indices = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        index = request.url.params.get("index")
+        seen_indices.append(index)
+        if int(index) < 48:
+            return httpx.Response(200, content=page)
+        return httpx.Response(200, content=b"<html></html>")
+
+    crawler = AsyncCrawler(
+        concurrency=1,
+        rate_limit=1000,
+        continue_search=True,
+        transport=httpx.MockTransport(handler),
+        store=ListingStore(tmp_path),
+    )
+    watermark = Watermark("", newest_added_date=newest_added_date)
+    await crawler.crawl([RightmoveRentParams()], watermarks=[watermark])
+
+    assert len(seen_indices) == pages
+    assert watermark.seen_newest == datetime.date(2024, 3, 18)
@@ -1,20 +1,32 @@
+import datetime
 from typing import Generator
 
 import pytest
 from data_vortex.database.crud import (
+    ListingCursor,
+    ListingFilter,
+    ListingSort,
     bulk_upsert_listings,
     create_listing,
     get_listing,
+    get_price_changes,
+    get_price_history,
+    listing_search_query,
+    search_listings,
     upsert_listing,
+    upsert_listing_batch,
+    upsert_listing_rows,
+    write_listing_rows,
 )
-from data_vortex.database.models import Base, RentalListing
+from data_vortex.database.models import Base, PriceHistory, RentalListing
+from data_vortex.listing_batch import ListingBatch
 from data_vortex.rightmove_models import (
     Currency,
     Price,
     PriceUnit,
     RightmoveRentalListing,
 )
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select, text
 from sqlalchemy.orm import sessionmaker
 
 
@@ -62,6 +74,22 @@ def test_create_new_listing(db_session, rental_listing):
     assert db_session.query(RentalListing).count() == count + 1
 
 
+@pytest.mark.parametrize("rental_listing", ["123a"], indirect=True)
+def test_create_listing_writes_content_hash_and_history(
+    db_session, rental_listing
+):
+    stored = create_listing(db_session, rental_listing)
+    assert stored.property_id == "123a"
+    assert stored.content_hash is not None
+    assert stored.postcode_district == "AB12"
+    history = get_price_history(db_session, "123a")
+    assert [row.price_amount for row in history] == [1000]
+
+    # An existing listing is left as it is
+    assert create_listing(db_session, rental_listing) is stored
+    assert len(get_price_history(db_session, "123a")) == 1
+
+
 @pytest.mark.parametrize("rental_listing", ["124"], indirect=True)
 def test_return_existing_listing_on_create(db_session, rental_listing):
     db_session.add(rental_listing)
@@ -148,3 +176,196 @@ def test_bulk_upsert_inserts_new_and_updates_existing(
     assert updated.description == "Updated Description 200"
 
     assert db_session.query(RentalListing).count() == count + 1
+
+
+def _listing_row(property_id: str, description: str) -> dict:
+    return RightmoveRentalListing(
+        property_id=property_id,
+        description=description,
+        price=Price(
+            price=1000, currency=Currency.GBP, per=PriceUnit.PER_MONTH
+        ),
+        added_date="2021-01-01",
+        address=None,
+        postcode=None,
+    ).to_orm_dict()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 500])
+def test_upsert_listing_rows_counts_inserts_and_updates(
+    db_session, chunk_size
+):
+    ids = [f"3{chunk_size}{i}" for i in range(3)]
+    first = [_listing_row(i, "Old") for i in ids]
+    first[0]["created_date"] = datetime.datetime(2020, 1, 1)
+    result = upsert_listing_rows(db_session, first, chunk_size=chunk_size)
+    assert (result.inserted, result.updated) == (3, 0)
+
+    new_id = f"3{chunk_size}9"
+    second = [
+        _listing_row(ids[0], "Duplicate"),
+        _listing_row(ids[0], "New"),
+        _listing_row(ids[1], "New"),
+        _listing_row(new_id, "New"),
+    ]
+    result = upsert_listing_rows(db_session, second, chunk_size=chunk_size)
+    assert (result.inserted, result.updated) == (1, 2)
+
+    updated = get_listing(db_session, ids[0])
+    assert updated.description == "New"
+    assert updated.created_date == datetime.datetime(2020, 1, 1)
+    assert get_listing(db_session, ids[2]).description == "Old"
+    assert get_listing(db_session, new_id).description == "New"
+
+
+def test_upsert_listing_batch(db_session):
+    batch = ListingBatch.from_rows(
+        [_listing_row("400", "Old"), _listing_row("401", "Old")]
+    )
+    result = upsert_listing_batch(db_session, batch)
+    assert (result.inserted, result.updated) == (2, 0)
+    assert get_listing(db_session, "401").price_currency == "GBP"
+
+
+def test_unchanged_listings_are_not_rewritten(db_session):
+    rows = [_listing_row("500", "Old"), _listing_row("501", "Old")]
+    upsert_listing_rows(db_session, rows)
+
+    rows[1]["description"] = "New"
+    result = upsert_listing_rows(db_session, rows)
+    assert (result.inserted, result.updated, result.unchanged) == (0, 1, 1)
+    assert get_listing(db_session, "501").description == "New"
+
+
+def test_price_history_records_changes_only(db_session):
+    first_seen = datetime.datetime(2024, 3, 1)
+    row = _listing_row("600", "Flat")
+    write_listing_rows(db_session, [row], observed_at=first_seen)
+    # Not a price change
+    row["description"] = "Nice flat"
+    write_listing_rows(db_session, [row], observed_at=first_seen)
+
+    row["price_amount"] = 900
+    row["added_date"] = datetime.date(2024, 3, 10)
+    write_listing_rows(
+        db_session, [row], observed_at=datetime.datetime(2024, 3, 10)
+    )
+    write_listing_rows(
+        db_session, [row], observed_at=datetime.datetime(2024, 3, 11)
+    )
+    db_session.commit()
+
+    history = get_price_history(db_session, "600")
+    assert [(h.price_amount, h.previous_price_amount) for h in history] == [
+        (1000, None),
+        (900, 1000),
+    ]
+    changes = get_price_changes(db_session, since=first_seen)
+    assert [c.property_id for c in changes] == ["600"]
+    assert changes[0].added_date == datetime.date(2024, 3, 10)
+    assert get_price_changes(db_session, datetime.datetime(2024, 3, 11)) == []
+
+
+def _query_plan(db_session, query) -> str:
+    compiled = query.compile(
+        dialect=db_session.get_bind().dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+    plan = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return " ".join(step.detail for step in plan)
+
+
+def test_price_changes_query_uses_index(db_session):
+    query = (
+        select(PriceHistory)
+        .where(PriceHistory.observed_at >= datetime.datetime(2024, 1, 1))
+        .order_by(PriceHistory.observed_at)
+    )
+    assert "ix_price_history_observed_at" in _query_plan(db_session, query)
+
+
+@pytest.fixture()
+def district_listings(db_session) -> list:
+    rows = []
+    for i, price in enumerate([900, 1200, 1000, 1000, 1500, 1000, 800]):
+        row = _listing_row(f"70{i}", "Flat")
+        row.update(
+            price_amount=price,
+            postcode="ZZ9 9ZZ",
+            added_date=datetime.date(2024, 3, 1 + i % 3),
+        )
+        rows.append(row)
+    upsert_listing_rows(db_session, rows)
+    return rows
+
+
+@pytest.mark.parametrize("sort", list(ListingSort))
+def test_search_listings_pages_by_keyset(db_session, district_listings, sort):
+    filters = ListingFilter(postcode_district="zz9", max_price=1200)
+    pages = []
+    page = search_listings(db_session, filters, sort=sort, limit=2)
+    pages.append(page.listings)
+    while page.next_cursor is not None:
+        page = search_listings(
+            db_session, filters, sort=sort, limit=2, after=page.next_cursor
+        )
+        pages.append(page.listings)
+
+    found = [listing for listings in pages for listing in listings]
+    assert all(len(listings) <= 2 for listings in pages)
+    expected = [
+        row for row in district_listings if row["price_amount"] <= 1200
+    ]
+    if sort is ListingSort.PRICE:
+        expected.sort(
+            key=lambda row: (row["price_amount"], row["property_id"])
+        )
+    else:
+        expected.sort(
+            key=lambda row: (row["added_date"], row["property_id"]),
+            reverse=True,
+        )
+    assert [listing.property_id for listing in found] == [
+        row["property_id"] for row in expected
+    ]
+    assert {listing.postcode_district for listing in found} == {"ZZ9"}
+
+
+@pytest.mark.parametrize(
+    ("filters", "sort", "index"),
+    [
+        (
+            ListingFilter(postcode_district="N1", min_price=1000),
+            ListingSort.PRICE,
+            "ix_rental_listings_district_price",
+        ),
+        (
+            ListingFilter(
+                postcode_district="N1",
+                added_since=datetime.date(2024, 1, 1),
+            ),
+            ListingSort.NEWEST,
+            "ix_rental_listings_district_added_date",
+        ),
+        (
+            ListingFilter(min_price=1000, max_price=2000),
+            ListingSort.PRICE,
+            "ix_rental_listings_price",
+        ),
+        (ListingFilter(), ListingSort.NEWEST, "ix_rental_listings_added_date"),
+    ],
+)
+@pytest.mark.parametrize(
+    "after", [None, ListingCursor(datetime.date(2024, 1, 1), "1")]
+)
+def test_search_query_plans_use_indexes(
+    db_session, filters, sort, index, after
+):
+    if after is not None and sort is ListingSort.PRICE:
+        after = ListingCursor(1000.0, "1")
+    plan = _query_plan(
+        db_session, listing_search_query(filters, sort, after=after)
+    )
+    assert index in plan
+    # Rows come out of the index in order, without a separate sort
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+pytest.importorskip("dagster")
+
+from dagster import MultiPartitionKey, materialize  # noqa: E402
+from data_vortex.database.crud import search_listings  # noqa: E402
+from data_vortex.database.database import make_engine  # noqa: E402
+from data_vortex.rightmove_models import RightmoveRentParams  # noqa: E402
+from data_vortex.utils.config import settings  # noqa: E402
+from data_vortex_dagster.assets import (  # noqa: E402
+    parsed_listings,
+    rental_listings,
+    search_pages,
+)
+from data_vortex_dagster.partitions import (  # noqa: E402
+    SearchPartition,
+    crawl_partitions,
+    search_partitions,
+)
+from data_vortex_dagster.resources import (  # noqa: E402
+    DatabaseResource,
+    RightmoveResource,
+)
+from sqlalchemy.orm import Session  # noqa: E402
+
+
+class FakeRightmove(RightmoveResource):
+    page_path: str
+
+    def search_page(self, params: RightmoveRentParams) -> bytes:
+        assert params.minPrice == "1000"
+        return Path(self.page_path).read_bytes()
+
+
+def test_search_partition_keys() -> None:
+    partition = SearchPartition.from_key("london:1000-1500")
+    assert partition == SearchPartition("london", 1000, 1500)
+    assert partition.key == "london:1000-1500"
+    assert SearchPartition.from_key("london:4000-").max_price is None
+
+    params = partition.to_params()
+    assert params.locationIdentifier == "REGION^87490"
+    assert (params.minPrice, params.maxPrice) == ("1000", "1500")
+
+    partitions = search_partitions()
+    assert partitions[0] == SearchPartition("london", None, 1000)
+    assert partitions[-1] == SearchPartition("london", 4000, None)
+    assert all("|" not in partition.key for partition in partitions)
+
+
+def test_materialize_partition(
+    tmp_path: Path, test_resources_root: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        settings, "RENT_STATS_PATH", tmp_path / "rent_stats.db"
+    )
+    partition_key = MultiPartitionKey(
+        {"date": "2024-03-18", "search": "london:1000-1500"}
+    )
+    assert partition_key in crawl_partitions.get_partition_keys()
+    database = DatabaseResource(url=f"sqlite:///{tmp_path / 'vortex.db'}")
+
+    result = materialize(
+        [search_pages, parsed_listings, rental_listings],
+        partition_key=partition_key,
+        resources={
+            "rightmove": FakeRightmove(
+                page_path=str(
+                    test_resources_root / "rightmove_full_rental_query.xml"
+                )
+            ),
+            "database": database,
+        },
+    )
+
+    assert result.success
+    batch = result.output_for_node("parsed_listings")
+    assert len(batch) > 0
+    (load,) = result.asset_materializations_for_node("rental_listings")
+    assert load.metadata["inserted"].value == len(batch)
+    with Session(make_engine(database.url)) as db:
+        assert len(search_listings(db, limit=1000).listings) == len(batch)
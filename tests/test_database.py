@@ -0,0 +1,85 @@
+import threading
+from pathlib import Path
+
+import pytest
+from data_vortex.database.database import make_engine
+from data_vortex.database.models import Base
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture()
+def url(tmp_path: Path) -> str:
+    return f"sqlite:///{tmp_path / 'vortex.db'}"
+
+
+def _pragma(engine, name: str):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_tuned_profile_sets_pragmas(url: str) -> None:
+    engine = make_engine(url, "tuned")
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == 30000
+    assert _pragma(make_engine(url), "busy_timeout") != 30000
+
+
+def test_unknown_profile(url: str) -> None:
+    with pytest.raises(ValueError, match="Unknown SQLite profile"):
+        make_engine(url, "fast")
+
+
+def test_readers_are_not_blocked_by_the_writer(url: str) -> None:
+    writer = make_engine(url, "tuned", writer=True)
+    reader = make_engine(url, "tuned")
+    Base.metadata.create_all(bind=writer)
+    assert writer.pool.size() == 1
+
+    with sessionmaker(bind=writer)() as db:
+        db.execute(
+            text("INSERT INTO rental_listings (property_id) VALUES (1)")
+        )
+        # The write transaction holds the lock, readers still see the
+        # last commit
+        with reader.connect() as conn:
+            count = conn.exec_driver_sql(
+                "SELECT count(*) FROM rental_listings"
+            ).scalar()
+        assert count == 0
+        db.commit()
+
+    with reader.connect() as conn:
+        assert (
+            conn.exec_driver_sql(
+                "SELECT count(*) FROM rental_listings"
+            ).scalar()
+            == 1
+        )
+
+
+def test_writer_takes_the_lock_when_it_begins(url: str) -> None:
+    writer = make_engine(url, "tuned", writer=True)
+    other_writer = make_engine(url, "tuned", writer=True)
+    Base.metadata.create_all(bind=writer)
+    began = threading.Event()
+
+    with writer.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+        # BEGIN IMMEDIATE, so the other writer has to wait for the commit
+        assert conn.in_transaction()
+
+        def write() -> None:
+            with other_writer.begin() as other:
+                began.set()
+                other.exec_driver_sql(
+                    "INSERT INTO rental_listings (property_id) VALUES (2)"
+                )
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        assert not began.wait(0.2)
+        conn.commit()
+        thread.join()
+    assert began.is_set()
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from bs4 import BeautifulSoup
+from data_vortex.listing_batch import LISTING_SCHEMA, ListingBatch
+from data_vortex.listing_store import ListingStore
+from data_vortex.rightmove_processing import get_listings
+
+
+@pytest.fixture()
+def listings(test_resources_root: Path) -> list:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    return get_listings(BeautifulSoup(content, "html.parser"))
+
+
+def test_roundtrip_keeps_listings(listings: list) -> None:
+    batch = ListingBatch.from_listings(listings)
+
+    assert len(batch) == len(listings)
+    assert batch.to_listings() == listings
+    assert list(batch.iter_rows(chunk_size=7)) == [
+        listing.to_orm_dict() for listing in listings
+    ]
+
+
+def test_repeated_values_are_stored_once(listings: list) -> None:
+    batch = ListingBatch.from_listings(listings)
+
+    currency = batch.table["price_currency"].combine_chunks()
+    assert pa.types.is_dictionary(currency.type)
+    assert currency.dictionary.to_pylist() == ["GBP"]
+    # Columns can be analysed without building listings
+    assert pc.max(batch.table["price_amount"]).as_py() == max(
+        listing.price.price for listing in listings
+    )
+
+
+def test_concat_and_parquet(tmp_path: Path, listings: list) -> None:
+    batch = ListingBatch.concat(
+        [
+            ListingBatch.from_listings(listings[:10]),
+            ListingBatch.from_listings(listings[10:]),
+        ]
+    )
+    assert batch.to_listings() == listings
+
+    path = tmp_path / "listings.parquet"
+    batch.write_parquet(path)
+    assert ListingBatch.read_parquet(path).to_listings() == listings
+    assert ListingBatch.concat([]).to_table().schema == LISTING_SCHEMA
+
+
+def test_store_reads_batch(tmp_path: Path, listings: list) -> None:
+    with ListingStore(tmp_path, flush_size=10) as store:
+        store.add(listings)
+
+    assert store.read_batch().to_listings() == listings
@@ -0,0 +1,148 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from bs4 import BeautifulSoup
+from data_vortex import listing_pipeline
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.models import Base, RentalListing
+from data_vortex.listing_pipeline import DatabaseListingWriter
+from data_vortex.rightmove_processing import get_listings
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture()
+def session_factory(tmp_path: Path) -> sessionmaker:
+    # A file, as the writer thread opens its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'vortex.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture()
+def listings(test_resources_root: Path) -> list:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    return get_listings(BeautifulSoup(content, "html.parser"))
+
+
+def _count(session_factory: sessionmaker) -> int:
+    with session_factory() as db:
+        return db.query(RentalListing).count()
+
+
+def test_writes_listings_in_batches(session_factory, listings) -> None:
+    with DatabaseListingWriter(
+        session_factory, queue_size=4, batch_size=5
+    ) as writer:
+        assert writer.add(listings) == len(listings)
+        assert writer.add(listings) == 0
+        writer.flush()
+        assert _count(session_factory) == len(listings)
+    assert writer.result.inserted == len(listings)
+    assert writer.result.unchanged == len(listings)
+
+    with DatabaseListingWriter(session_factory) as writer:
+        assert writer.add(listings) == 0
+
+
+def test_writes_changes_of_stored_listings(session_factory, listings) -> None:
+    with DatabaseListingWriter(session_factory) as writer:
+        writer.add(listings)
+
+    price = listings[0].price
+    changed = listings[0].model_copy(
+        update={"price": price.model_copy(update={"price": price.price + 100})}
+    )
+    with DatabaseListingWriter(session_factory) as writer:
+        assert writer.add([changed]) == 0
+    assert writer.result.updated == 1
+
+    with session_factory() as db:
+        stored = db.get(RentalListing, changed.property_id)
+        assert stored.price_amount == changed.price.price
+
+
+@pytest.mark.asyncio()
+async def test_flush_async_commits_listings(session_factory, listings) -> None:
+    with DatabaseListingWriter(session_factory, batch_size=100) as writer:
+        writer.add(listings)
+        await writer.flush_async()
+        assert _count(session_factory) == len(listings)
+
+
+@pytest.mark.asyncio()
+async def test_add_async_puts_listings_off_the_loop(
+    session_factory, listings, monkeypatch: MonkeyPatch
+) -> None:
+    with DatabaseListingWriter(session_factory, batch_size=100) as writer:
+        threads = []
+        put = writer._put
+
+        def record_put(batch) -> None:
+            threads.append(threading.current_thread())
+            put(batch)
+
+        monkeypatch.setattr(writer, "_put", record_put)
+        assert await writer.add_async(listings) == len(listings)
+        assert await writer.add_async(listings) == 0
+        await writer.flush_async()
+        assert _count(session_factory) == len(listings)
+    assert threading.current_thread() not in threads
+
+
+def test_commits_partial_batches_after_interval(
+    session_factory, listings
+) -> None:
+    with DatabaseListingWriter(
+        session_factory, batch_size=100, flush_interval=0.05
+    ) as writer:
+        writer.add(listings[:3])
+        for _ in range(100):
+            if _count(session_factory) == 3:
+                break
+            time.sleep(0.01)
+        assert _count(session_factory) == 3
+
+
+def test_raises_writer_errors(
+    session_factory, listings, monkeypatch: MonkeyPatch
+) -> None:
+    def fail(*_args, **_kwargs):
+        raise ValueError("database is locked")
+
+    monkeypatch.setattr(listing_pipeline, "upsert_listing_rows", fail)
+    writer = DatabaseListingWriter(session_factory, queue_size=2, batch_size=2)
+    # Blocked producers are let through once the writer fails
+    writer.add(listings)
+    with pytest.raises(RuntimeError, match="writer failed"):
+        writer.flush()
+    with pytest.raises(RuntimeError):
+        writer.add(listings[:1])
+    with pytest.raises(RuntimeError):
+        writer.close()
+
+
+def test_invalidates_rent_stats_of_written_listings(
+    tmp_path: Path, session_factory, listings
+) -> None:
+    stats_cache = RentStatsCache(tmp_path / "rent_stats.db")
+    with session_factory() as db:
+        assert stats_cache.stats(db).num_rows == 0
+
+    with DatabaseListingWriter(
+        session_factory, stats_cache=stats_cache
+    ) as writer:
+        writer.add(listings)
+
+    with session_factory() as db:
+        stats = stats_cache.stats(db)
+    districts = {
+        listing.postcode.split()[0] for listing in listings if listing.postcode
+    }
+    assert districts
+    assert set(stats["postcode_district"].to_pylist()) == districts
@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+from data_vortex.listing_store import ListingStore, import_json_listings
+from data_vortex.rightmove_models import GenericListing
+from data_vortex.rightmove_processing import get_listings
+
+
+@pytest.fixture()
+def listings(test_resources_root: Path) -> list:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    return get_listings(BeautifulSoup(content, "html.parser"))
+
+
+def _dump(listing: GenericListing) -> dict:
+    return listing.model_dump(exclude={"created_date"})
+
+
+def test_add_skips_known_listings(tmp_path: Path, listings: list) -> None:
+    with ListingStore(tmp_path) as store:
+        assert store.add(listings) == len(listings)
+        assert store.add(listings) == 0
+
+    reopened = ListingStore(tmp_path)
+    assert len(reopened) == len(listings)
+    assert listings[0].property_id in reopened
+    assert reopened.add(listings) == 0
+    assert len(reopened.segments()) == 1
+
+
+def test_roundtrip_keeps_listing_fields(
+    tmp_path: Path, listings: list
+) -> None:
+    with ListingStore(tmp_path) as store:
+        store.add(listings)
+
+    stored = list(ListingStore(tmp_path).iter_listings())
+    assert [_dump(listing) for listing in stored] == [
+        _dump(listing) for listing in listings
+    ]
+
+
+def test_flushes_every_flush_size(tmp_path: Path, listings: list) -> None:
+    store = ListingStore(tmp_path, flush_size=5)
+    for listing in listings:
+        store.add([listing])
+    store.flush()
+    assert len(store.segments()) == -(-len(listings) // 5)
+    assert store.read_table(["property_id"]).num_rows == len(listings)
+
+
+def test_compact_merges_segments(tmp_path: Path, listings: list) -> None:
+    store = ListingStore(tmp_path, flush_size=5)
+    store.add(listings)
+    # A crashed run can leave rows behind that are already in a segment
+    store._write_segment(store.read_table().slice(0, 3))
+
+    assert store.compact() == 2
+    assert len(store.segments()) == 1
+    table = store.read_table(["property_id"])
+    assert sorted(table["property_id"].to_pylist()) == sorted(
+        listing.property_id for listing in listings
+    )
+
+
+def test_import_json_listings(tmp_path: Path, listings: list) -> None:
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    for i, listing in enumerate(listings[:4]):
+        content = listing.model_dump_json()
+        # Half of the files use the old double encoded format
+        if i % 2:
+            content = json.dumps(content)
+        path = json_dir / f"property_{listing.property_id}.json"
+        path.write_text(content)
+
+    store = ListingStore(tmp_path / "store")
+    assert import_json_listings(store, json_dir) == 4
+    assert import_json_listings(store, json_dir) == 0
+    assert len(ListingStore(tmp_path / "store")) == 4
@@ -0,0 +1,80 @@
+import logging
+import logging.handlers
+from pathlib import Path
+
+import pytest
+import ujson
+from data_vortex.utils.logging import (
+    ColourfulFormatter,
+    CustomisedJSONFormatter,
+    CustomisedVerboseJSONFormatter,
+    PageLog,
+    get_logger,
+    stop_listeners,
+)
+
+
+def make_record(level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(
+        "test", level, __file__, 1, "Stored %d listings", (24,), None
+    )
+
+
+def test_colourful_formatter_reuses_formatters() -> None:
+    formatter = ColourfulFormatter("%(levelname)s %(message)s")
+    formatters = dict(formatter._formatters)
+    assert formatter.format(make_record()) == (
+        "\x1b[38;21mINFO Stored 24 listings\x1b[0m"
+    )
+    assert "ERROR" in formatter.format(make_record(logging.ERROR))
+    assert formatter._formatters == formatters
+
+
+@pytest.mark.parametrize(
+    "formatter", [CustomisedJSONFormatter(), CustomisedVerboseJSONFormatter()]
+)
+def test_json_formatters_use_record_time(
+    formatter: logging.Formatter,
+) -> None:
+    record = make_record()
+    logged = ujson.loads(formatter.format(record))
+    assert logged["message"] == "Stored 24 listings"
+    assert logged["time"] == pytest.approx(record.created)
+
+
+def test_queue_mode_writes_file_from_listener(tmp_path: Path) -> None:
+    log_file = tmp_path / "logs" / "vortex.log"
+    logger = get_logger(
+        "test_queue_mode", "info", log_file=log_file, use_queue=True
+    )
+    try:
+        assert any(
+            isinstance(h, logging.handlers.QueueHandler)
+            for h in logger.handlers
+        )
+        logger.info("Stored %d listings", 24)
+        logger.debug("Not logged")
+        stop_listeners()
+        lines = log_file.read_text().splitlines()
+        assert len(lines) == 1
+        assert "Stored 24 listings" in lines[0]
+    finally:
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers.clear()
+
+
+def test_page_log_summarises_pages(caplog: pytest.LogCaptureFixture) -> None:
+    logger = logging.getLogger("test_page_log")
+    page_log = PageLog("london", every=2, logger=logger)
+    with caplog.at_level(logging.INFO, logger="test_page_log"):
+        for index in range(0, 72, 24):
+            page_log.page(index, 24, 10, 1)
+        page_log.close("No more listings retrieved, stopped")
+
+    assert [r.getMessage() for r in caplog.records] == [
+        "2 pages of london: 48 listings, 20 new, 2 downloaded",
+        "1 pages of london: 24 listings, 10 new, 1 downloaded",
+        "No more listings retrieved, stopped after 3 pages of london",
+    ]
+    assert page_log.new_listings == 30
@@ -0,0 +1,37 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+from data_vortex.rightmove_processing import get_parser, validate_listings
+from prometheus_client import REGISTRY
+
+
+def _sample(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+def test_parsing_is_instrumented(test_resources_root: Path) -> None:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    pages = _sample(
+        "data_vortex_parse_duration_seconds_count", {"backend": "json"}
+    )
+    parsed = _sample("data_vortex_listings_parsed_total")
+
+    listings = get_parser("json").parse_listings(content)
+    assert _sample(
+        "data_vortex_parse_duration_seconds_count", {"backend": "json"}
+    ) == pytest.approx(pages + 1)
+    assert _sample("data_vortex_listings_parsed_total") == pytest.approx(
+        parsed + len(listings)
+    )
+
+
+def test_validation_failures_are_counted_by_field() -> None:
+    labels = {"field": "price"}
+    failures = _sample("data_vortex_validation_failures_total", labels)
+    validate_listings([{"property_id": "1", "price": "POA"}])
+    assert _sample(
+        "data_vortex_validation_failures_total", labels
+    ) == pytest.approx(failures + 1)
@@ -8,6 +8,7 @@ from data_vortex.rightmove_models import (
     PriceUnit,
     RightmoveRentalListing,
 )
+from pydantic import ValidationError
 
 
 @pytest.mark.parametrize(
@@ -37,6 +38,52 @@ def test_date_parsing(added_date: str) -> None:
     assert l_info.added_date == datetime.date(2024, 2, 10)
 
 
+@pytest.mark.parametrize(
+    ("added_date", "days_ago"),
+    [("Added today", 0), ("Reduced today", 0), ("Reduced yesterday", 1)],
+)
+def test_relative_date_parsing(added_date: str, days_ago: int) -> None:
+    parsed = GenericListing.parse_added_date(added_date)
+    assert parsed == datetime.date.today() - datetime.timedelta(days=days_ago)
+
+
+@pytest.mark.parametrize(
+    "added_date",
+    ["", "Added on", "Added on 31/02/2024", "10.02.2024", "2024-02-10 12:00"],
+)
+def test_invalid_date_parsing(added_date: str) -> None:
+    with pytest.raises(ValueError, match="Invalid date format"):
+        GenericListing.parse_added_date(added_date)
+
+
+def test_orm_dicts_match_validated() -> None:
+    listing = RightmoveRentalListing(
+        property_id="144595010",
+        image_url="https://media.rightmove.co.uk/dir/crop/10:9-16:9/260k/259202/144595010"
+        "/259202_THECI_005196_IMG_00_0000_max_476x317.jpeg",
+        description="Lorem ipsum",
+        price="£1,000 pcm",
+        added_date="2024-02-10",
+        postcode="N1 1AA",
+        address="123 Fake Street, N1 1AA",
+        bedrooms=2,
+    )
+    row = listing.to_orm_dict()
+
+    (batched,) = RightmoveRentalListing.from_orm_dicts([row])
+    assert batched == RightmoveRentalListing.from_orm_dict(row) == listing
+    assert batched.model_dump() == listing.model_dump()
+    assert batched._default_currency == Currency.GBP
+
+    # Stored amounts are floats, and may be missing or fractional
+    row["price_amount"] = 1000.0
+    assert RightmoveRentalListing.from_orm_dicts([row]) == [listing]
+    for amount in (None, 999.5):
+        row["price_amount"] = amount
+        with pytest.raises(ValidationError):
+            RightmoveRentalListing.from_orm_dicts([row])
+
+
 @pytest.mark.parametrize(
     ("price", "expected"),
     [
@@ -76,6 +76,9 @@ def test_rightmove_to_orm_export(rightmove_rental_listing):
         "address": "123 Fake Street, N1 1AA",
         "postcode": "N1 1AA",
         "created_date": datetime.datetime(2024, 1, 10),
+        "bedrooms": None,
+        "bathrooms": None,
+        "property_type": None,
     }
 
 
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+import pytest
+from data_vortex.parse_pool import ParsePool
+from data_vortex.rightmove_processing import get_parser
+
+
+@pytest.fixture()
+def full_query(test_resources_root: Path) -> bytes:
+    return (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+
+
+def _dump(listings: list) -> list:
+    return [
+        listing.model_dump(exclude={"created_date"}) for listing in listings
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_parse_matches_in_process_parser(full_query: bytes) -> None:
+    expected = get_parser("json").parse_listings(full_query)
+    with ParsePool(workers=2, backend="json") as pool:
+        listings = await pool.parse(full_query)
+    assert _dump(listings) == _dump(expected)
@@ -0,0 +1,82 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from data_vortex.analytics import RentStatsCache
+from data_vortex.database.models import Base, RawListingIngest, RentalListing
+from data_vortex.raw_listing_ingest import ingest_raw_listings
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+
+@pytest.fixture()
+def db_session() -> Session:
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture()
+def raw_dir(tmp_path: Path, test_resources_root: Path) -> Path:
+    shutil.copy(
+        test_resources_root / "rightmove_listing_145459589.xml",
+        tmp_path / "raw_property_145459589.html",
+    )
+    (tmp_path / "raw_property_1.html").write_text("<html>Not found</html>")
+    return tmp_path
+
+
+def test_ingest_loads_listings(db_session: Session, raw_dir: Path) -> None:
+    result = ingest_raw_listings(db_session, raw_dir=raw_dir, workers=2)
+
+    assert result.scanned == 2
+    assert result.ingested == 1
+    assert result.failed == 1
+    listing = db_session.get(RentalListing, "145459589")
+    assert listing.price_amount == 3370
+    assert listing.price_per == "PER_MONTH"
+    assert listing.bedrooms == 2
+    # Only files that parsed are recorded
+    assert db_session.query(RawListingIngest).count() == 1
+
+
+def test_ingest_invalidates_rent_stats(
+    tmp_path: Path, db_session: Session, raw_dir: Path
+) -> None:
+    stats_cache = RentStatsCache(tmp_path / "rent_stats.db")
+    assert stats_cache.stats(db_session).num_rows == 0
+
+    ingest_raw_listings(
+        db_session, raw_dir=raw_dir, workers=1, stats_cache=stats_cache
+    )
+    stats = stats_cache.stats(db_session)
+    assert stats["listings"].to_pylist() == [1]
+
+
+def test_ingest_is_incremental(db_session: Session, raw_dir: Path) -> None:
+    ingest_raw_listings(db_session, raw_dir=raw_dir, workers=1)
+
+    result = ingest_raw_listings(db_session, raw_dir=raw_dir, workers=1)
+    assert result.unchanged == 1
+    assert result.ingested == 0
+    # The file that failed to parse is tried again
+    assert result.failed == 1
+
+    # Touched but identical files are caught by the content hash
+    listing_file = raw_dir / "raw_property_145459589.html"
+    stat = listing_file.stat()
+    os.utime(listing_file, (stat.st_atime, stat.st_mtime + 10))
+    result = ingest_raw_listings(db_session, raw_dir=raw_dir, workers=1)
+    assert result.unchanged == 1
+    assert result.ingested == 0
+
+    listing_file.write_bytes(
+        listing_file.read_bytes().replace(b"3,370 pcm", b"3,000 pcm")
+    )
+    result = ingest_raw_listings(db_session, raw_dir=raw_dir, workers=1)
+    assert result.ingested == 1
+    db_session.expire_all()
+    assert db_session.get(RentalListing, "145459589").price_amount == 3000
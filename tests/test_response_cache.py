@@ -0,0 +1,134 @@
+import os
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+import requests
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex import response_cache as response_cache_module
+from data_vortex.response_cache import CacheEntry, SQLiteResponseCache
+from data_vortex.rightmove_models import RequestData
+from data_vortex.rightmove_query import cache_with_ttl
+
+
+@pytest.fixture()
+def sqlite_cache(tmp_path: Path) -> SQLiteResponseCache:
+    return SQLiteResponseCache(tmp_path / "responses.db", max_bytes=10_000)
+
+
+@pytest.fixture()
+def request_data() -> RequestData:
+    return RequestData(
+        url="https://www.rightmove.co.uk/property-to-rent/find.html",
+        headers={"User-Agent": "curl/7.64.1"},
+        params={"index": "0", "minPrice": "100"},
+    )
+
+
+def _response(
+    status_code: int, body: bytes = b"", **headers
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers.update(headers)
+    response.url = "https://www.rightmove.co.uk/property-to-rent/find.html"
+    return response
+
+
+def test_cache_key_is_stable_and_matches_equality(request_data) -> None:
+    same = RequestData(
+        url=request_data.url,
+        headers={"User-Agent": "curl/7.64.1"},
+        params={"minPrice": "100", "index": "0"},
+    )
+    other = RequestData(
+        url=request_data.url,
+        headers={"User-Agent": "curl/7.64.1"},
+        params={"minPrice": "200", "index": "0"},
+    )
+    assert same == request_data
+    assert same.cache_key() == request_data.cache_key()
+    assert other.cache_key() != request_data.cache_key()
+
+
+def test_roundtrip_compresses_body(sqlite_cache) -> None:
+    body = b"<html>" + b"listing " * 1000 + b"</html>"
+    entry = CacheEntry.from_response(
+        _response(200, body, **{"Content-Type": "text/html", "ETag": "abc"}),
+        ttl_seconds=60,
+    )
+    sqlite_cache.set("key", entry)
+
+    cached = sqlite_cache.get("key")
+    assert cached.body == body
+    assert cached.etag == "abc"
+    assert cached.is_fresh()
+    assert cached.to_response().content == body
+    assert sqlite_cache.stats().total_bytes < len(body)
+
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path: Path) -> None:
+    cache = SQLiteResponseCache(tmp_path / "responses.db", max_bytes=2000)
+    for i in range(3):
+        body = os.urandom(600)  # incompressible
+        cache.set(f"key-{i}", CacheEntry("url", 200, body, expires_at=1e12))
+        time.sleep(0.01)
+    cache.get("key-0")
+    cache.set(
+        "key-3", CacheEntry("url", 200, os.urandom(600), expires_at=1e12)
+    )
+
+    assert cache.get("key-0") is not None
+    assert cache.get("key-1") is None
+    assert cache.get("key-2") is not None
+    assert cache.stats().total_bytes <= 2000
+
+
+def test_prune_removes_expired(sqlite_cache) -> None:
+    sqlite_cache.set("old", CacheEntry("url", 200, b"a", expires_at=0))
+    sqlite_cache.set("new", CacheEntry("url", 200, b"b", expires_at=1e12))
+    assert sqlite_cache.stats().expired == 1
+    assert sqlite_cache.prune() == 1
+    assert sqlite_cache.get("old") is None
+    assert sqlite_cache.get("new") is not None
+
+
+def test_decorator_revalidates_stale_entries(
+    sqlite_cache, request_data, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(response_cache_module, "_response_cache", sqlite_cache)
+    sent: List[RequestData] = []
+    responses = [
+        _response(200, b"fresh body", ETag='"v1"'),
+        _response(304),
+    ]
+
+    @cache_with_ttl(expiration_hours=1)
+    def fetch(data: RequestData) -> requests.Response:
+        sent.append(data)
+        return responses.pop(0)
+
+    assert fetch(request_data, use_cache=True).content == b"fresh body"
+    assert fetch(request_data, use_cache=True).content == b"fresh body"
+    assert len(sent) == 1
+
+    sqlite_cache.refresh(request_data.cache_key(), ttl_seconds=-1)
+    assert fetch(request_data, use_cache=True).content == b"fresh body"
+    assert len(sent) == 2
+    assert sent[1].headers["If-None-Match"] == '"v1"'
+    assert sqlite_cache.get(request_data.cache_key()).is_fresh()
+
+
+def test_decorator_skips_cache_unless_requested(
+    sqlite_cache, request_data, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(response_cache_module, "_response_cache", sqlite_cache)
+
+    @cache_with_ttl(expiration_hours=1)
+    def fetch(data: RequestData) -> requests.Response:  # noqa: ARG001
+        return _response(200, b"body")
+
+    fetch(request_data)
+    assert sqlite_cache.stats().entries == 0
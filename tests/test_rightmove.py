@@ -26,7 +26,7 @@ def _mock_response(
             (test_resources_root / "search_response.pkl").open("rb")
         )
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(requests.Session, "get", mock_get)
 
 
 @pytest.mark.usefixtures("_mock_response")
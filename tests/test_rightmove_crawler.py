@@ -0,0 +1,172 @@
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from bs4 import BeautifulSoup
+from data_vortex.listing_store import ListingStore
+from data_vortex.rightmove_crawler import AsyncCrawler
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_processing import get_listings
+from data_vortex.seen_index import SeenIdIndex
+from data_vortex.utils.config import settings
+from data_vortex.utils.rate_limiting import TokenBucket
+
+
+@pytest.fixture()
+def store_dir(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "LISTING_STORE_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture()
+def full_query(test_resources_root: Path) -> bytes:
+    return (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+
+
+def _search_transport(first_page: bytes, seen_indices: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        index = request.url.params.get("index")
+        seen_indices.append((request.url.params.get("minPrice"), index))
+        if index == "0":
+            return httpx.Response(200, content=first_page)
+        return httpx.Response(200, content=b"<html></html>")
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio()
+async def test_crawl_saves_same_listings_as_serial_path(
+    store_dir: Path, full_query: bytes
+) -> None:
+    seen_indices = []
+    crawler = AsyncCrawler(
+        concurrency=4,
+        rate_limit=1000,
+        transport=_search_transport(full_query, seen_indices),
+    )
+    new = await crawler.crawl([RightmoveRentParams()])
+
+    expected = get_listings(BeautifulSoup(full_query, "html.parser"))
+    saved = {
+        listing.property_id: listing
+        for listing in ListingStore(store_dir).iter_listings()
+    }
+    assert new == len(expected)
+    assert len(saved) == len(expected)
+    for listing in expected:
+        from_disk = saved[listing.property_id]
+        assert from_disk.model_dump(exclude={"created_date"}) == (
+            listing.model_dump(exclude={"created_date"})
+        )
+    assert seen_indices == [("", "0"), ("", "24")]
+
+
+@pytest.mark.asyncio()
+async def test_crawl_with_parse_pool_saves_same_listings(
+    store_dir: Path, full_query: bytes
+) -> None:
+    crawler = AsyncCrawler(
+        concurrency=4,
+        rate_limit=1000,
+        transport=_search_transport(full_query, []),
+        parse_workers=2,
+    )
+    new = await crawler.crawl([RightmoveRentParams()])
+
+    expected = get_listings(BeautifulSoup(full_query, "html.parser"))
+    assert new == len(expected)
+    assert {
+        listing.property_id
+        for listing in ListingStore(store_dir).iter_listings()
+    } == {listing.property_id for listing in expected}
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("store_dir")
+async def test_crawl_runs_all_buckets_and_stops_on_known_listings(
+    full_query: bytes,
+) -> None:
+    seen_indices = []
+    crawler = AsyncCrawler(
+        concurrency=4,
+        rate_limit=1000,
+        transport=_search_transport(full_query, seen_indices),
+    )
+    buckets = [RightmoveRentParams(minPrice=str(p)) for p in (100, 200, 300)]
+    await crawler.crawl(buckets)
+    # All buckets return the same page, so at most one of them gets past it
+    assert {price for price, _ in seen_indices} == {"100", "200", "300"}
+    assert len(seen_indices) == 4
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("store_dir")
+async def test_crawl_downloads_each_raw_listing_once(
+    tmp_path: Path, full_query: bytes, monkeypatch: MonkeyPatch
+) -> None:
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    monkeypatch.setattr(settings, "RAW_LISTING_DIR", raw_dir)
+    downloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/properties/"):
+            downloads.append(request.url.path)
+            return httpx.Response(200, content=b"<html></html>")
+        if request.url.params.get("index") == "0":
+            return httpx.Response(200, content=full_query)
+        return httpx.Response(200, content=b"<html></html>")
+
+    crawler = AsyncCrawler(
+        concurrency=4,
+        rate_limit=1000,
+        continue_search=True,
+        download_raw_listings=True,
+        transport=httpx.MockTransport(handler),
+    )
+    buckets = [RightmoveRentParams(minPrice=str(p)) for p in (100, 200)]
+    await crawler.crawl(buckets)
+
+    expected = get_listings(BeautifulSoup(full_query, "html.parser"))
+    assert len(downloads) == len(set(downloads)) == len(expected)
+    assert len(list(raw_dir.glob("raw_property_*.html"))) == len(expected)
+    assert len(SeenIdIndex(raw_dir / "seen_ids.db")) == len(expected)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures("store_dir")
+async def test_failed_raw_downloads_are_not_marked_seen(
+    tmp_path: Path, full_query: bytes, monkeypatch: MonkeyPatch
+) -> None:
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    monkeypatch.setattr(settings, "RAW_LISTING_DIR", raw_dir)
+    monkeypatch.setattr(settings, "HTTP_RETRY_TOTAL", 0)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.startswith("/properties/"):
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return httpx.Response(200, content=full_query)
+
+    crawler = AsyncCrawler(
+        concurrency=4,
+        rate_limit=1000,
+        download_raw_listings=True,
+        transport=httpx.MockTransport(handler),
+    )
+    with pytest.raises(httpx.ConnectTimeout):
+        await crawler.crawl([RightmoveRentParams()])
+    assert len(SeenIdIndex(raw_dir / "seen_ids.db")) == 0
+
+
+@pytest.mark.asyncio()
+async def test_token_bucket_limits_rate() -> None:
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
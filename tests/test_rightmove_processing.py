@@ -5,8 +5,13 @@ import pytest
 from bs4 import BeautifulSoup
 from data_vortex.rightmove_models import Currency, Price, PriceUnit
 from data_vortex.rightmove_processing import (
+    LxmlParser,
+    extract_json_model,
     get_detailed_listing,
     get_listings,
+    get_parser,
+    parse_detailed_listing,
+    validate_listings,
 )
 from pydantic import HttpUrl
 
@@ -45,3 +50,125 @@ def test_get_listings(rightmove_sample: BeautifulSoup) -> None:
 def test_get_detailed_listing(rightmove_listing_sample: BeautifulSoup):
     listing = get_detailed_listing(rightmove_listing_sample)
     assert listing.property_id == "145459589"
+    assert listing.price == Price(
+        price=3370, currency=Currency.GBP, per=PriceUnit.PER_MONTH
+    )
+    assert listing.address == "Sycamore Street, London, EC1Y 0SR, UK"
+    assert listing.postcode == "EC1Y 0SR"
+    assert listing.bedrooms == 2
+    assert listing.bathrooms == 2
+    assert listing.property_type == "Apartment"
+    assert listing.description.startswith("We offer custom pricing")
+    assert "<p>" not in listing.description
+    assert listing.image_url == HttpUrl(
+        "https://media.rightmove.co.uk/79k/78429/145459589/78429_LON-489_IMG_08_0000.jpeg"
+    )
+
+
+def test_detailed_listing_dates_are_relative_to_download(
+    test_resources_root: Path,
+) -> None:
+    content = (
+        test_resources_root / "rightmove_listing_145459589.xml"
+    ).read_bytes()
+    # The fixture was "Reduced today" when it was downloaded
+    listing = parse_detailed_listing(content, datetime.date(2024, 3, 18))
+    assert listing.added_date == datetime.date(2024, 3, 18)
+
+
+def test_detailed_listing_without_page_model() -> None:
+    with pytest.raises(ValueError, match="Page model not found"):
+        parse_detailed_listing(b"<html><body></body></html>")
+
+
+@pytest.mark.parametrize(
+    "sample",
+    [
+        "rightmove_sampe.xml",
+        "rightmove_full_rental_query.xml",
+        "cleaner_rightmove_sample.xml",
+    ],
+)
+def test_parser_backends_return_identical_listings(
+    test_resources_root: Path, sample: str
+) -> None:
+    content = (test_resources_root / sample).read_bytes()
+    from_bs4 = get_parser("bs4").parse_listings(content)
+    from_lxml = get_parser("lxml").parse_listings(content)
+
+    assert len(from_lxml) > 0
+    assert [
+        listing.model_dump(exclude={"created_date"}) for listing in from_lxml
+    ] == [listing.model_dump(exclude={"created_date"}) for listing in from_bs4]
+
+
+def test_lxml_parser_selected_by_default() -> None:
+    assert isinstance(get_parser(), LxmlParser)
+
+
+def test_unknown_parser_backend() -> None:
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        get_parser("regex")
+
+
+def test_json_parser_reads_embedded_model(test_resources_root: Path) -> None:
+    content = (test_resources_root / "rightmove_sampe.xml").read_bytes()
+    listings = get_parser("json").parse_listings(content)
+
+    assert len(listings) == 1
+    assert listings[0].property_id == "144595010"
+    assert listings[0].price == Price(
+        price=260, currency=Currency.GBP, per=PriceUnit.PER_WEEK
+    )
+    assert listings[0].added_date == datetime.date(2024, 2, 10)
+    assert listings[0].postcode == "N19"
+    assert listings[0].bedrooms == 0
+    assert listings[0].property_type == "House Share"
+
+
+def test_json_parser_finds_same_listings_as_dom(
+    test_resources_root: Path,
+) -> None:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    from_json = get_parser("json").parse_listings(content)
+    from_dom = get_parser("lxml").parse_listings(content)
+
+    assert [listing.property_id for listing in from_json] == [
+        listing.property_id for listing in from_dom
+    ]
+    for json_listing, dom_listing in zip(from_json, from_dom):
+        assert json_listing.address == dom_listing.address
+        assert json_listing.image_url == dom_listing.image_url
+
+
+def test_json_parser_falls_back_to_dom(test_resources_root: Path) -> None:
+    content = (
+        test_resources_root / "cleaner_rightmove_sample.xml"
+    ).read_bytes()
+    assert extract_json_model(content) is None
+
+    from_json = get_parser("json").parse_listings(content)
+    assert [listing.property_id for listing in from_json] == ["144595010"]
+
+
+def test_validate_listings_skips_invalid_ones() -> None:
+    fields = [
+        {
+            "property_id": property_id,
+            "description": "Lorem ipsum",
+            "price": price,
+            "added_date": "Added on 10/02/2024",
+            "address": "123 Fake Street, N1 1AA",
+            "postcode": "N1 1AA",
+        }
+        for property_id, price in [("1", "£1,000 pcm"), ("2", "POA")]
+    ]
+
+    assert [listing.property_id for listing in validate_listings(fields)] == [
+        "1"
+    ]
+    assert validate_listings(fields[:1])[0].price == Price(
+        price=1000, currency=Currency.GBP, per=PriceUnit.PER_MONTH
+    )
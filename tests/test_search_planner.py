@@ -0,0 +1,100 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+from data_vortex.rightmove_models import RightmoveRentParams
+from data_vortex.rightmove_processing import (
+    SearchSummary,
+    parse_search_summary,
+)
+from data_vortex.search_planner import SearchPlanner
+
+PRICE_OPTIONS = [100, 500, 1000, 1250, 1500, 1750, 2000, 3000, 5000, 10000]
+# Dense between 1000 and 2000, sparse elsewhere
+PRICES = [1001 + i * 19 for i in range(50)] + [150, 4000, 7000]
+
+
+class FakeSearch:
+    """Answers probes from a fixed list of listing prices."""
+
+    def __init__(self, prices: List[int]) -> None:
+        self.prices = prices
+
+    def __call__(self, params: RightmoveRentParams) -> SearchSummary:
+        low = int(params.minPrice) if params.minPrice else 0
+        high = int(params.maxPrice) if params.maxPrice else 10**9
+        count = sum(low <= price <= high for price in self.prices)
+        return SearchSummary(count, PRICE_OPTIONS)
+
+
+def _covered(params_list: List[RightmoveRentParams], price: int) -> bool:
+    return any(
+        (not params.minPrice or int(params.minPrice) <= price)
+        and (not params.maxPrice or price <= int(params.maxPrice))
+        for params in params_list
+    )
+
+
+@pytest.fixture()
+def map_path(tmp_path: Path) -> Path:
+    return tmp_path / "search_plan.json"
+
+
+def test_splits_dense_ranges_and_merges_sparse_ones(map_path: Path) -> None:
+    search = FakeSearch(PRICES)
+    planner = SearchPlanner(probe=search, result_cap=20, map_path=map_path)
+
+    params_list = planner.plan(RightmoveRentParams())
+
+    counts = [search(params).result_count for params in params_list]
+    assert all(count <= 20 for count in counts)
+    assert all(_covered(params_list, price) for price in PRICES)
+    # The sparse ends are merged into the buckets next to them
+    assert [(p.minPrice, p.maxPrice) for p in params_list] == [
+        ("", "1250"),
+        ("1250", "1500"),
+        ("1500", "1750"),
+        ("1750", ""),
+    ]
+
+
+def test_next_plan_starts_from_saved_partition(map_path: Path) -> None:
+    first = SearchPlanner(
+        probe=FakeSearch(PRICES), result_cap=20, map_path=map_path
+    )
+    first_plan = first.plan(RightmoveRentParams())
+
+    search = FakeSearch(PRICES)
+    second = SearchPlanner(probe=search, result_cap=20, map_path=map_path)
+    assert second.plan(RightmoveRentParams()) == first_plan
+    assert second.probes == len(first_plan) < first.probes
+
+    # Other searches are planned from scratch
+    other = SearchPlanner(
+        probe=FakeSearch(PRICES), result_cap=20, map_path=map_path
+    )
+    other.plan(RightmoveRentParams(minBedrooms="2", maxBedrooms="2"))
+    assert other.probes == first.probes
+
+
+def test_empty_search_needs_no_buckets(map_path: Path) -> None:
+    planner = SearchPlanner(
+        probe=FakeSearch([]), result_cap=20, map_path=map_path
+    )
+    assert planner.plan(RightmoveRentParams()) == []
+    assert planner.probes == 1
+
+
+def test_parse_search_summary(test_resources_root: Path) -> None:
+    content = (
+        test_resources_root / "rightmove_full_rental_query.xml"
+    ).read_bytes()
+    summary = parse_search_summary(content)
+    assert summary.result_count == 29341
+    assert summary.price_options[:3] == [100, 150, 200]
+    assert summary.price_options[-1] == 40000
+
+    sample = (
+        test_resources_root / "cleaner_rightmove_sample.xml"
+    ).read_bytes()
+    assert parse_search_summary(sample) is None
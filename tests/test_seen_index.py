@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from data_vortex.seen_index import SeenIdIndex, open_raw_listing_index
+
+
+def test_ids_are_persisted_on_flush(tmp_path: Path) -> None:
+    path = tmp_path / "seen_ids.db"
+    index = SeenIdIndex(path)
+    assert index.add("1")
+    assert not index.add("1")
+    assert index.update(["1", "2", "3"]) == 2
+    assert "2" in index
+
+    assert len(SeenIdIndex(path)) == 0
+    assert index.flush() == 3
+    assert index.flush() == 0
+    reopened = SeenIdIndex(path)
+    assert len(reopened) == 3
+    assert "3" in reopened
+
+
+def test_discard_only_forgets_unflushed_ids(tmp_path: Path) -> None:
+    with SeenIdIndex(tmp_path / "seen_ids.db") as index:
+        index.add("1")
+        index.flush()
+        index.add("2")
+        index.discard("1")
+        index.discard("2")
+    assert "1" in index
+    assert "2" not in index
+    assert len(SeenIdIndex(tmp_path / "seen_ids.db")) == 1
+
+
+def test_raw_listing_index_is_seeded_from_directory(tmp_path: Path) -> None:
+    for listing_id in ("123", "456"):
+        (tmp_path / f"raw_property_{listing_id}.html").write_text("<html>")
+    (tmp_path / "notes.txt").write_text("")
+
+    index = open_raw_listing_index(tmp_path)
+    assert len(index) == 2
+    assert "123" in index
+    assert "456" in index
@@ -0,0 +1,113 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Iterator, List
+
+import httpx
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from data_vortex.transport import (
+    async_http_get,
+    backoff_delay,
+    build_async_client,
+    build_session,
+    latency_stats,
+    parse_retry_after,
+)
+from data_vortex.utils.config import settings
+
+
+@pytest.fixture(autouse=True)
+def _fast_retries(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "HTTP_RETRY_BACKOFF_FACTOR", 0.001)
+    monkeypatch.setattr(settings, "HTTP_RETRY_JITTER", 0.001)
+    monkeypatch.setattr(settings, "HTTP_RETRY_TOTAL", 3)
+
+
+@pytest.fixture()
+def flaky_server() -> Iterator[str]:
+    """Server failing with 503 twice before answering every path."""
+    statuses: List[int] = [503, 503]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:  # noqa: N802
+            status = statuses.pop(0) if statuses else 200
+            body = b"ok" if status == 200 else b"busy"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_session_retries_on_503(flaky_server: str) -> None:
+    latency_stats.reset()
+    response = build_session().get(f"{flaky_server}/search")
+    assert response.status_code == 200
+    assert response.text == "ok"
+    assert latency_stats.count == 1
+    assert latency_stats.status_codes[200] == 1
+
+
+def test_session_negotiates_compression() -> None:
+    session = build_session()
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+
+@pytest.mark.asyncio()
+async def test_async_get_retries_and_respects_retry_after() -> None:
+    statuses = [429, 502, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:  # noqa: ARG001
+        return httpx.Response(statuses.pop(0), headers={"Retry-After": "0"})
+
+    latency_stats.reset()
+    async with build_async_client(
+        transport=httpx.MockTransport(handler)
+    ) as client:
+        response = await async_http_get(client, "https://example.com")
+    assert response.status_code == 200
+    assert latency_stats.count == 3
+
+
+@pytest.mark.asyncio()
+async def test_async_get_gives_up_after_total_retries() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503)
+
+    async with build_async_client(
+        transport=httpx.MockTransport(handler)
+    ) as client:
+        response = await async_http_get(client, "https://example.com")
+    assert response.status_code == 503
+    assert len(calls) == settings.HTTP_RETRY_TOTAL + 1
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("5", 5.0), ("0", 0.0), (None, None), ("nonsense", None)],
+)
+def test_parse_retry_after(value, expected) -> None:
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date_in_the_past() -> None:
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_delay_prefers_longer_retry_after() -> None:
+    assert backoff_delay(1, retry_after=10) == 10
+    assert backoff_delay(3) <= 0.004 + settings.HTTP_RETRY_JITTER